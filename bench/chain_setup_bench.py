@@ -0,0 +1,98 @@
+"""체인 구성 비용 마이크로 벤치마크.
+
+호출마다 프롬프트/체인/히스토리 래퍼를 새로 만드는 방식(before)과
+모듈 단위로 한 번 만든 체인에 변수만 넘기는 방식(after)의 호출당 오버헤드를 비교합니다.
+실제 API 대신 stub LLM(FakeListChatModel)을 사용하므로 네트워크 없이 실행됩니다.
+
+    python bench/chain_setup_bench.py --calls 300
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("HISTORY_BACKEND", "memory")
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+import llm_prev
+
+# RunnableWithMessageHistory 지원 중단 예고 경고가 측정 출력을 가리지 않도록 숨김
+warnings.filterwarnings("ignore", category=PendingDeprecationWarning)
+
+STUB_LLM = FakeListChatModel(responses=["안녕하세요, 저는 굿리치 상담사입니다."])
+CONSULTANT_NAME = "홍길동"
+SELECTED_POINTS = list(llm_prev.POINT_DESCRIPTIONS)[:2]
+COMPLAINT_INFO = "- 고객 이름: 김민지\n- 해지 요청 내용: 보험료 부담\n- 해지 의사 강도: 중"
+
+
+def build_before():
+    # 이전 구현: 강조 포인트 dict, f-string 프롬프트, 템플릿, 히스토리 래퍼를 매번 생성
+    point_descriptions = dict(llm_prev.POINT_DESCRIPTIONS)
+    selected_descriptions = "\n".join(
+        f"- {point_descriptions[point]}" for point in SELECTED_POINTS if point in point_descriptions
+    )
+    dynamic_prompt = (
+        f"\n    [상담원 정보]\n    - 상담원 이름: {CONSULTANT_NAME}\n\n    [고객 정보]\n    {COMPLAINT_INFO}\n"
+        f"\n    [선택된 강조 포인트]\n    {selected_descriptions}\n"
+        f"\n{llm_prev.SYSTEM_PROMPT_SCRIPT}"
+    )
+    chain = RunnableWithMessageHistory(
+        ChatPromptTemplate.from_messages([
+            ("system", dynamic_prompt),
+            MessagesPlaceholder("chat_history"),
+            ("human", "{complaint_info}")
+        ]) | STUB_LLM | StrOutputParser(),
+        llm_prev.get_session_history,
+        input_messages_key="complaint_info",
+        history_messages_key="chat_history",
+    )
+    return chain, {"complaint_info": COMPLAINT_INFO}
+
+
+def build_after():
+    # 현재 구현: 미리 만든 체인을 재사용하고 입력 변수만 구성
+    inputs = {
+        "consultant_name": CONSULTANT_NAME,
+        "complaint_info": COMPLAINT_INFO,
+        "emphasis_section": llm_prev.build_emphasis_section(SELECTED_POINTS),
+    }
+    return llm_prev.get_script_chain(), inputs
+
+
+def measure(build, calls, invoke):
+    start = time.perf_counter()
+    for i in range(calls):
+        chain, inputs = build()
+        if invoke:
+            session_id = f"bench-{i}"
+            chain.invoke(inputs, config={"configurable": {"session_id": session_id}})
+            llm_prev.release_session(session_id)
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="체인 구성 비용 before/after 비교")
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args()
+
+    # stub LLM으로 모듈 체인을 구성
+    llm_prev.get_llm = lambda *a, **k: STUB_LLM
+    llm_prev.get_script_chain.cache_clear()
+    build_after()
+
+    print(f"호출 {args.calls}회 평균 (ms/call)")
+    for label, invoke in (("구성만", False), ("구성 + stub 호출", True)):
+        before = measure(build_before, args.calls, invoke)
+        after = measure(build_after, args.calls, invoke)
+        print(f"- {label:<14} before {before:8.3f}  after {after:8.3f}  ({before / max(after, 1e-9):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""카카오톡용 누적 대화 요약 점검.
+
+1) 제안 멘트 추출: 프롬프트가 실제로 내는 "👉 보완 멘트 예시" 형식, 들여쓰기·목록·중첩 인용,
+   여러 종류의 따옴표를 모두 잡는지 (예전 요약 방식과 비교)
+2) 턴마다 누적한 요약이 처음부터 다시 만든 요약과 같고, 턴당 비용이 대화 길이와 무관한지
+3) 실제 화면 스크립트를 가짜 모델로 실행해 대화 요약이 세션에 누적되고 대화 로그(.jsonl)에
+   함께 저장되며, 저장된 로그를 읽으면 다시 추출하지 않고 같은 요약이 나오는지
+확인합니다. 네트워크 없이 실행됩니다.
+
+    python bench/conversation_summary_check.py
+"""
+import contextlib
+import copy
+import io
+import json
+import os
+import time
+
+from load_test import PageSession, install_mock_runtime
+
+import conversation_summary
+from conversation_log import ConversationLog
+from conversation_summary import build_summary, extract_suggestions, new_summary, update_summary
+from fake_llm import SAMPLE_AI, FakeStreamingChatModel, install_fake_llm
+from message_format import make_message
+
+EXTRACT_CASES = [
+    ('**👉 보완 멘트 예시**\n> "고객님, 지금 해지하시면 손해가 큽니다."', ["고객님, 지금 해지하시면 손해가 큽니다."]),
+    ("  > “납입 유예도 가능합니다.”\n설명", ["납입 유예도 가능합니다."]),
+    ("- > '감액 완납을 안내드릴게요.'\n1. > 두 번째 멘트", ["감액 완납을 안내드릴게요.", "두 번째 멘트"]),
+    (">> > **중첩 인용 멘트**", ["중첩 인용 멘트"]),
+    ('> "여기에 실제 상담 멘트를 작성하세요."\n>\n본문 > 인용 아님', []),
+]
+
+
+def legacy_summary(message_list):
+    # 이번 변경 전의 요약 방식 (표시 문구가 달라 제안 멘트를 놓쳤음)
+    points = []
+    for message in message_list:
+        if message["role"] == "user":
+            points.append(f"- 상담원 요청: {message['content']}")
+        elif message["role"] == "ai" and "👉 상담 멘트 예시" in message["content"]:
+            points.extend(f"- 제안 멘트: {line[2:]}" for line in message["content"].split("\n") if line.startswith("> "))
+    return "\n".join(points)
+
+
+def conversation(turns):
+    messages = [make_message("ai", "▶️ 방어 스크립트\n" + SAMPLE_AI)]
+    for i in range(turns):
+        messages.append(make_message("user", f"{i + 1}번째 질문입니다."))
+        messages.append(make_message("ai", f"{SAMPLE_AI}\n> \"{i + 1}번째 추가 멘트\""))
+    return messages
+
+
+def plain(messages):
+    # 저장된 요약 줄이 없는 메시지 (예전 로그를 불러온 상태)
+    return [{"role": m["role"], "content": m["content"]} for m in messages]
+
+
+def check_extract():
+    for text, expected in EXTRACT_CASES:
+        assert extract_suggestions(text) == expected, (text, extract_suggestions(text))
+    messages = [make_message("user", "고객이 화를 내요"), make_message("ai", SAMPLE_AI)]
+    assert "- 제안 멘트:" in build_summary(plain(messages)) and "제안 멘트" not in legacy_summary(messages)
+    print(f"✅ 제안 멘트 추출             {len(EXTRACT_CASES)}개 형식, 예전 방식이 놓친 '보완 멘트 예시' 포함")
+
+
+def check_incremental():
+    per_turn = {}
+    for turns in (10, 1000):
+        messages = conversation(turns)
+        summary = new_summary()
+        update_summary(summary, messages)
+        assert summary["text"] == build_summary(plain(messages))
+
+        # 질문/답변 한 쌍을 더할 때 요약 갱신 비용 (200회 평균)
+        start = time.perf_counter()
+        for i in range(200):
+            messages.append(make_message("user", f"추가 질문 {i}"))
+            update_summary(summary, messages)
+            messages.append(make_message("ai", SAMPLE_AI))
+            update_summary(summary, messages)
+        per_turn[turns] = (time.perf_counter() - start) / 200 * 1000
+        assert summary["text"] == build_summary(plain(messages))
+
+    assert per_turn[1000] < per_turn[10] * 5 + 0.05, per_turn
+    print(f"✅ 누적 요약 = 전체 재요약      턴당 갱신 {per_turn[10]:.3f}ms(10턴) / {per_turn[1000]:.3f}ms(1000턴)")
+
+
+def check_page(model):
+    page = PageSession(0, step_timeout=60)
+    page.rerun()
+    page.widget("text_input", "ID").set_value("요약점검")
+    page.widget("text_input", "Password").set_value("0000")
+    page.click("로그인")
+    page.widget("text_input", "고객 이름").set_value("김요약")
+    page.widget("text_area", "청약 철회").set_value("보험료 부담으로 해지를 원함")
+    page.click("🚀 방어 스크립트 생성하기")
+    for question in ("고객이 화를 내요", "납입 유예가 가능한지 물어봐요"):
+        page.chat(question)
+
+    messages = page.state["message_list"]
+    summary = page.state["conversation_summary"]
+    assert summary["count"] == len(messages) == 5, (summary["count"], len(messages))
+    assert summary["text"] == build_summary(plain(messages)) and "- 제안 멘트:" in summary["text"]
+
+    # 저장된 로그에는 메시지마다 요약 줄이 함께 있어, 읽은 뒤 다시 추출하지 않음
+    path = os.path.join(os.environ["HISTORY_ROOT"], page.state["user_folder"], page.state["current_file"])
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    assert all("summary" in r for r in records if r["type"] == "message"), records
+    loaded = ConversationLog(path).read()["message_list"]
+    extract = conversation_summary.extract_suggestions
+    conversation_summary.extract_suggestions = None
+    try:
+        assert build_summary(copy.deepcopy(loaded)) == summary["text"]
+    finally:
+        conversation_summary.extract_suggestions = extract
+    print(f"✅ 화면 누적·대화 로그 저장     메시지 {summary['count']}개, 요약 {len(summary['text'].splitlines())}줄")
+
+    # 카카오톡 요청은 누적 요약을 그대로 사용 → 같은 대화면 캐시 적중
+    before = model.calls
+    page.click("💬 카카오톡 발송용 문자 생성하기")
+    calls = model.calls - before
+    page.click("💬 카카오톡 발송용 문자 생성하기")
+    assert page.state["kakao_text"].strip() and model.calls == before + calls
+    print(f"✅ 카카오톡 문자 생성           호출 {calls}회, 재요청 캐시 적중")
+
+
+def main():
+    check_extract()
+    check_incremental()
+    install_mock_runtime()
+    model = FakeStreamingChatModel(ttft=0.05, tokens_per_second=2000, output_tokens=120)
+    install_fake_llm(model)
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        try:
+            check_page(model)
+        finally:
+            results = [line for line in log.getvalue().splitlines() if line.startswith("✅")]
+    print("\n".join(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""벤치마크/부하 테스트용 가짜 채팅 모델 (네트워크 불필요).
+
+첫 토큰까지 ttft초를 기다린 뒤 tokens_per_second 속도로 답변을 스트리밍합니다.
+jitter를 주면 첫 토큰 지연은 로그정규, 초당 토큰 수와 응답 길이는 정규분포로 흔들어
+실제 API와 비슷한 지연 분포를 흉내냅니다 (seed로 재현 가능).
+랜덤 상황 요청에는 요청한 조합 수만큼 유효한 JSON 배열을 돌려줍니다.
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+import streamlit
+from streamlit.runtime.scriptrunner import ScriptRunContext, add_script_run_ctx
+from streamlit.runtime.state import SafeSessionState, SessionState
+from streamlit.runtime.uploaded_file_manager import UploadedFileManager
+
+import llm_prev
+
+COMBO_PATTERN = re.compile(r"사유 유형 (\d)번, 해지 강도 (하|중|상)")
+SAMPLE_AI = """📌 상담 요약:
+고객님은 보험료 부담으로 해지를 고민하고 계십니다.
+
+- **핵심 포인트**
+- 납입 유예 제도 안내
+• 감액 완납 제안
+
+**👉 보완 멘트 예시**
+> "고객님, 지금 해지하시면 그동안 납입하신 보험료 대비 환급금이 적어 손해가 클 수 있습니다."
+
+▶️ 활용 팁: 고객의 감정을 먼저 인정한 뒤 대안을 제시하세요.
+"""
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """지연 시간을 조절할 수 있는 결정적 가짜 모델."""
+
+    model_name: str = "fake"
+    ttft: float = 0.02
+    tokens_per_second: float = 2000.0
+    output_tokens: int = 200
+    jitter: float = 0.0
+    seed: int = 0
+    # 지정하면 첫 토큰 대기 뒤 이 메시지로 실패 (오류 처리 점검용)
+    error: str = ""
+
+    _random: random.Random = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self):
+        return "fake-streaming"
+
+    @property
+    def calls(self):
+        # 모델이 실제로 호출된 횟수 (요청 합류/캐시 확인용)
+        return self._calls
+
+    def _sample(self):
+        # (첫 토큰 지연, 토큰 간격, 응답 토큰 수)
+        with self._lock:
+            self._calls += 1
+        if not self.jitter:
+            return self.ttft, 1 / self.tokens_per_second, self.output_tokens
+        with self._lock:
+            if self._random is None:
+                self._random = random.Random(self.seed)
+            ttft = self.ttft * math.exp(self._random.gauss(0, self.jitter))
+            tps = max(self.tokens_per_second * (1 + self._random.gauss(0, self.jitter / 2)), 1.0)
+            tokens = max(int(self.output_tokens * (1 + self._random.gauss(0, self.jitter / 2))), 1)
+        return ttft, 1 / tps, tokens
+
+    def _reply(self, messages, tokens):
+        combos = COMBO_PATTERN.findall(messages[-1].content)
+        if combos:
+            return [json.dumps([
+                {"name": f"벤치{i}", "situation": f"{reason}번 사유로 해지를 요청합니다.",
+                 "cancel_strength": strength, "reason_type": int(reason)}
+                for i, (reason, strength) in enumerate(combos)
+            ], ensure_ascii=False)]
+        words = (SAMPLE_AI.replace("\n", "\n ").split(" ") * tokens)[:tokens]
+        return [word + " " for word in words]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        ttft, interval, tokens = self._sample()
+        time.sleep(ttft)
+        if self.error:
+            raise RuntimeError(self.error)
+        for i, token in enumerate(self._reply(messages, tokens)):
+            if i:
+                time.sleep(interval)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        ttft, interval, tokens = self._sample()
+        reply = self._reply(messages, tokens)
+        time.sleep(ttft + (len(reply) - 1) * interval)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(reply)))])
+
+
+def attach_script_context(session_values):
+    # 진입점이 st.session_state를 읽으므로 현재 스레드에 스크립트 실행 컨텍스트를 붙임
+    session_state = SessionState()
+    ctx = ScriptRunContext(
+        session_id="bench", _enqueue=lambda msg: None, query_string="",
+        session_state=SafeSessionState(session_state), uploaded_file_mgr=UploadedFileManager(),
+        page_script_hash="", user_info={"email": None},
+    )
+    add_script_run_ctx(threading.current_thread(), ctx)
+    for key, value in session_values.items():
+        streamlit.session_state[key] = value
+
+
+def install_fake_llm(model):
+    # get_llm()을 가짜 모델로 바꾸고, 이미 만들어진 체인을 버림
+    llm_prev.get_llm = lambda *args, **kwargs: model
+    for getter in (llm_prev.get_script_chain, llm_prev.get_chatbot_chain, llm_prev.get_kakao_chain,
+                   llm_prev.get_scenario_chain):
+        getter.cache_clear()
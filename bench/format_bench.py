@@ -0,0 +1,133 @@
+"""메시지 서식 처리 벤치마크 (200개 메시지 합성 세션).
+
+before: rerun마다 모든 메시지에 format_markdown(매번 정규식 컴파일 조회)을 실행하고,
+        추가 질문 답변은 저장 전에 한 번 더 서식 처리하던 이전 방식
+after : 메시지 생성 시 한 번만 서식 처리해 rendered로 저장하고, rerun에서는 저장된 값을 사용
+        (불러온 대화는 내용 해시 캐시로 한 번만 처리)
+
+    python bench/format_bench.py --messages 200 --reruns 50
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import message_format
+from message_format import ensure_rendered, format_markdown, make_message
+
+SAMPLE_AI = """📌 상담 요약:
+고객님은 보험료 부담으로 해지를 고민하고 계십니다.
+
+- **핵심 포인트**
+- 납입 유예 제도 안내
+• 감액 완납 제안
+
+**👉 보완 멘트 예시**
+> "고객님, 지금 해지하시면 그동안 납입하신 보험료 대비 환급금이 적어 손해가 클 수 있습니다."
+
+▶️ 활용 팁: 고객의 감정을 먼저 인정한 뒤 대안을 제시하세요.
+✅ 체크: 재상담 일정을 잡아 두세요.
+"""
+
+
+def legacy_format_markdown(text: str) -> str:
+    # 변경 전 구현 (패턴을 매번 re 모듈에 넘김)
+    lines = text.strip().splitlines()
+    formatted_lines = []
+    indent_next = False
+    for line in lines:
+        line = line.strip()
+        if not line:
+            formatted_lines.append("")
+            indent_next = False
+            continue
+        if re.match(r"^(▶️|✅|📌|❗|📝|📍)\s*[^:：]+[:：]?", line):
+            title = re.sub(r"[:：]\s*$", "", line.strip())
+            formatted_lines.append(f"**{title}**\n")
+            indent_next = False
+            continue
+        if re.match(r"^[-•]\s*\*\*.*\*\*", line):
+            formatted_lines.append(re.sub(r"^[-•]\s*", "- ", line))
+            indent_next = True
+            continue
+        if re.match(r"^[-•]\s*", line):
+            if indent_next:
+                formatted_lines.append("    " + re.sub(r"^[-•]\s*", "- ", line))
+            else:
+                formatted_lines.append(re.sub(r"^[-•]\s*", "- ", line))
+            continue
+        formatted_lines.append(line)
+        indent_next = False
+    return "\n".join(formatted_lines).strip() + "\n"
+
+
+def synthetic_session(count):
+    messages = []
+    for i in range(count):
+        if i % 2 == 0:
+            messages.append(("user", f"{i}번째 질문입니다. 고객이 다시 해지를 요청해요."))
+        else:
+            messages.append(("ai", f"{SAMPLE_AI}\n📝 메모 {i}: 추가 확인 필요"))
+    return messages
+
+
+def bench_before(session, reruns):
+    # 저장 시 1회 + rerun마다 전체 메시지 1회
+    start = time.perf_counter()
+    stored = [{"role": role, "content": legacy_format_markdown(text) if role == "ai" else text} for role, text in session]
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(reruns):
+        for message in stored:
+            if message["role"] == "ai":
+                legacy_format_markdown(message["content"])
+    return build, (time.perf_counter() - start) / reruns
+
+
+def bench_after(session, reruns):
+    start = time.perf_counter()
+    stored = [make_message(role, text) for role, text in session]
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(reruns):
+        for message in stored:
+            ensure_rendered(message)
+    return build, (time.perf_counter() - start) / reruns
+
+
+def bench_load(session):
+    # 저장된 대화를 다시 불러올 때 (rendered 없음 → 해시 캐시 조회)
+    loaded = [{"role": role, "content": text} for role, text in session]
+    start = time.perf_counter()
+    for message in loaded:
+        ensure_rendered(message)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="메시지 서식 처리 before/after 비교")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    session = synthetic_session(args.messages)
+    for _, text in session:
+        assert format_markdown(text) == legacy_format_markdown(text), "서식 결과가 이전 구현과 다릅니다."
+
+    before_build, before_rerun = bench_before(session, args.reruns)
+    message_format._render_cache.clear()
+    after_build, after_rerun = bench_after(session, args.reruns)
+    load = bench_load(session)
+
+    print(f"메시지 {args.messages}개 세션, rerun {args.reruns}회")
+    print(f"- 메시지 생성 시 서식 처리   before {before_build * 1000:8.3f}ms  after {after_build * 1000:8.3f}ms")
+    print(f"- rerun 1회 서식 처리 비용   before {before_rerun * 1000:8.3f}ms  after {after_rerun * 1000:8.3f}ms")
+    print(f"- 저장된 대화 불러오기 (캐시) {load * 1000:8.3f}ms")
+    print(f"- 렌더링 캐시 {message_format.get_render_stats()}")
+
+
+if __name__ == "__main__":
+    main()
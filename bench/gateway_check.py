@@ -0,0 +1,202 @@
+"""LLM 게이트웨이(llm_gateway.py) 점검.
+
+게이트웨이를 가짜 모델로 별도 프로세스에 띄우고, 이 프로세스는 화면과 같은 얇은 클라이언트
+(gateway_client.py, llm_prev를 가져오지 않음)로 여러 상담원 화면을 흉내 내어
+1) 스크립트가 청크 단위로 스트리밍되는지,
+2) 다른 화면(세션)의 같은 카카오톡 요청이 게이트웨이에서 한 번만 생성되고 이후에는 공유 캐시로 끝나는지,
+3) 세션 히스토리 복원/해제가 게이트웨이 쪽에 반영되는지,
+4) 빈 풀에 동시에 들어온 랜덤 상황 요청이 묶여 한두 번의 생성으로 처리되는지,
+5) 화면이 스트림을 중간에 닫으면 게이트웨이도 중계를 멈추는지, 잘못된 요청은 400인지
+확인합니다. 네트워크 없이 실행됩니다.
+
+    python bench/gateway_check.py
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SESSIONS = ("gateway-a", "gateway-b")
+SCRIPT_ARGS = ("김게이트", "보험료 부담으로 해지 요청", "중")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(port):
+    # 게이트웨이 프로세스: get_llm()을 가짜 모델로 바꾼 뒤 uvicorn으로 실행
+    import uvicorn
+
+    import llm_gateway
+    from fake_llm import FakeStreamingChatModel, install_fake_llm
+
+    install_fake_llm(FakeStreamingChatModel(ttft=0.3, tokens_per_second=200, output_tokens=120))
+    uvicorn.run(llm_gateway.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_gateway():
+    port = _free_port()
+    work_dir = tempfile.mkdtemp(prefix="stayon_gateway_")
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-check"),
+        "HISTORY_BACKEND": "memory",
+        "RESPONSE_CACHE_PATH": os.path.join(work_dir, "response_cache.db"),
+        "SCENARIO_POOL_PATH": os.path.join(work_dir, "scenario_pool.json"),
+        "TELEMETRY_PORT": "0",
+        "TELEMETRY_JSON_LOG": "0",
+        "LLM_REQUESTS_PER_MINUTE": "0",
+        "LLM_TOKENS_PER_MINUTE": "0",
+        # 묶음 처리 효과가 잘 보이도록 요청을 조금 더 오래 모음
+        "GATEWAY_SCENARIO_BATCH_WINDOW": "0.1",
+    }
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+def wait_ready(client, process, timeout=60.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"게이트웨이가 종료되었습니다:\n{process.stderr.read().decode()}")
+        try:
+            if client.get("/healthz").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("게이트웨이가 준비되지 않았습니다.")
+
+
+def concurrently(count, fn):
+    results = [None] * count
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, fn(i))) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def check_streaming(gateway_client):
+    start = time.perf_counter()
+    chunks, first = [], None
+    for chunk in gateway_client.get_script_response(*SCRIPT_ARGS, regenerate=True, session_id=SESSIONS[0],
+                                                    consultant_name="홍길동", selected_points=[]):
+        first = first or time.perf_counter() - start
+        chunks.append(chunk)
+    total = time.perf_counter() - start
+    assert len(chunks) > 5 and "❌" not in chunks[0], chunks[:3]
+    assert first < total / 2, (first, total)
+    print(f"✅ 스크립트 스트리밍            청크 {len(chunks)}개, 첫 청크 {first * 1000:.0f}ms / 전체 {total * 1000:.0f}ms")
+    return "".join(chunks)
+
+
+def check_shared_kakao(gateway_client, script):
+    before = gateway_client.get_gateway_stats()
+    summary = "- 상담원 요청: 고객이 화를 내요"
+    texts = concurrently(2, lambda i: "".join(gateway_client.get_kakao_response(
+        script, conversation_summary=summary, mode="single", session_id=SESSIONS[i],
+    )))
+    cached = "".join(gateway_client.get_kakao_response(
+        script, conversation_summary=summary, mode="single", session_id=SESSIONS[1],
+    ))
+    after = gateway_client.get_gateway_stats()
+    leaders = after["single_flight"]["leaders"] - before["single_flight"]["leaders"]
+    coalesced = after["single_flight"]["coalesced"] - before["single_flight"]["coalesced"]
+    hits = after["response_cache"]["hits"] - before["response_cache"]["hits"]
+    assert texts[0] == texts[1] == cached and texts[0].strip(), "화면마다 다른 카카오톡 문자를 받았습니다."
+    assert leaders == 1 and coalesced == 1 and hits == 1, (leaders, coalesced, hits)
+    print(f"✅ 화면 간 카카오톡 공유        생성 {leaders}회, 합류 {coalesced}회, 공유 캐시 적중 {hits}회")
+
+
+def check_sessions(gateway_client, script):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    answer = "".join(gateway_client.get_chatbot_response("고객이 화를 내요", script, SESSIONS[0]))
+    assert answer.strip() and "❌" not in answer
+    result = gateway_client._post("/v1/sessions/restore", {
+        "session_id": SESSIONS[1],
+        "messages": [{"role": "user", "content": "질문"}, {"role": "ai", "content": "답변"}],
+    })
+    assert result["messages"] == 2, result
+    gateway_client.restore_session_history(SESSIONS[1], [HumanMessage(content="질문"), AIMessage(content="답변")])
+    gateway_client.release_session(SESSIONS[1])
+    print(f"✅ 세션 히스토리 복원·해제      추가 질문 답변 {len(answer)}자")
+
+
+def check_scenarios(gateway_client):
+    before = gateway_client.get_gateway_stats()
+    results = concurrently(16, lambda i: gateway_client.get_random_cancel_info())
+    after = gateway_client.get_gateway_stats()
+    assert all(result.get("name") and result.get("situation") for result in results), results
+    batches = after["scenario_batches"]["batches"] - before["scenario_batches"]["batches"]
+    empty_pops = after["scenario_pool"]["empty_pops"] - before["scenario_pool"]["empty_pops"]
+    assert batches < 16 and empty_pops <= 2, (batches, empty_pops)
+    print(f"✅ 랜덤 상황 묶음 처리          요청 16건 → 풀 호출 {batches}회, 빈 풀 직접 생성 {empty_pops}회 "
+          f"(최대 묶음 {after['scenario_batches']['largest_batch']}건)")
+
+
+def check_disconnect_and_errors(client, gateway_client):
+    stream = gateway_client.get_script_response("김중단", "타사 설계와 비교 중", "상", regenerate=True,
+                                                session_id=SESSIONS[1], consultant_name="홍길동", selected_points=[])
+    next(stream)
+    stream.close()
+    deadline = time.monotonic() + 10
+    while gateway_client.get_gateway_stats()["streams"]["active"]:
+        assert time.monotonic() < deadline, "끊긴 스트림이 게이트웨이에 남아 있습니다."
+        time.sleep(0.05)
+    streams = gateway_client.get_gateway_stats()["streams"]
+    assert streams["cancelled"] >= 1, streams
+
+    assert client.post("/v1/chatbot", json={"user_message": "세션 없음"}).status_code == 400
+    assert client.post("/v1/scenarios", content=b"not json").status_code == 400
+    assert client.get("/v1/unknown").status_code == 404
+    print(f"✅ 중간 종료·잘못된 요청        {streams}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 게이트웨이 점검")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+        return
+
+    process, url = start_gateway()
+    os.environ["LLM_GATEWAY_URL"] = url
+    import httpx
+
+    import gateway_client
+    assert "llm_prev" not in sys.modules, "화면 쪽 클라이언트가 llm_prev를 가져왔습니다."
+
+    try:
+        with httpx.Client(base_url=url) as client:
+            wait_ready(client, process)
+            script = check_streaming(gateway_client)
+            check_shared_kakao(gateway_client, script)
+            check_sessions(gateway_client, script)
+            check_scenarios(gateway_client)
+            check_disconnect_and_errors(client, gateway_client)
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+if __name__ == "__main__":
+    main()
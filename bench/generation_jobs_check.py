@@ -0,0 +1,181 @@
+"""백그라운드 생성 작업 점검.
+
+실제 화면 스크립트(chatbot_prev.py)를 가짜 모델로 실행하면서, 스크립트·추가 질문·카카오톡 생성 도중
+실행이 끊기거나(탭 이동) 다른 위젯 입력으로 rerun되어도 결과가 버려지지 않고 다음 실행에서
+message_list / kakao_text에 한 번만 반영되는지, 실패한 생성은 결과로 반영되지 않고 화면에 오류로
+표시되는지 확인합니다. 대기열 상한과 작업 정리도 함께 확인합니다.
+네트워크 없이 실행됩니다.
+
+    python bench/generation_jobs_check.py
+"""
+import contextlib
+import io
+import threading
+import time
+
+from load_test import PageSession, install_mock_runtime
+
+from fake_llm import FakeStreamingChatModel, install_fake_llm
+from generation_jobs import DISCARDED, FAILED, QUEUED, RUNNING, JobQueueFull, JobRunner, job_runner
+from streamlit.runtime.scriptrunner import RerunData
+
+
+def wait_until(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("조건을 기다리다 시간이 초과되었습니다.")
+        time.sleep(0.02)
+
+
+def streaming(session_id, kind, need_text=True):
+    # 해당 작업이 실행 중인지 (need_text면 청크를 내보내기 시작했는지까지)
+    jobs = job_runner.active(session_id, kind)
+    return bool(jobs) and jobs[0].status == RUNNING and (bool(jobs[0].text) or not need_text)
+
+
+def error_messages(node):
+    # 이 버전의 테스트 트리는 st.error를 일반 요소(alert)로 두므로 proto에서 직접 찾음
+    proto = getattr(node, "proto", None)
+    if proto is not None and hasattr(proto, "alert") and proto.HasField("alert") and proto.alert.format == proto.alert.ERROR:
+        yield proto.alert.body
+    for child in getattr(node, "children", {}).values():
+        yield from error_messages(child)
+
+
+def check_page(model):
+    page = PageSession(0, step_timeout=60)
+    page.rerun()
+    page.widget("text_input", "ID").set_value("작업점검")
+    page.widget("text_input", "Password").set_value("0000")
+    page.click("로그인")
+    session_id = page.state["session_id"]
+
+    # 1) 스크립트 생성 도중 실행이 끊김 → 작업은 계속되고, 다음 실행에서 결과가 반영되어 챗봇 화면으로 전환
+    page.widget("text_input", "고객 이름").set_value("김작업")
+    page.widget("text_area", "청약 철회").set_value("보험료 부담으로 해지를 원함")
+    runner = page.click("🚀 방어 스크립트 생성하기", wait=False)
+    wait_until(lambda: streaming(session_id, "script"))
+    runner.request_stop()
+    page.finish(runner)
+    assert page.state["page"] == "input" and job_runner.active(session_id, "script"), "작업이 실행과 함께 멈췄습니다."
+    wait_until(lambda: not job_runner.active(session_id, "script"))
+    page.rerun()
+    assert page.state["page"] == "chatbot", "끝난 스크립트가 다음 실행에 반영되지 않았습니다."
+    assert len(page.state["message_list"]) == 1 and page.state["script_context"]
+    assert model.calls == 1
+    print(f"✅ 스크립트 실행 중단 후 반영   호출 {model.calls}회, page={page.state['page']}")
+
+    # 2) 추가 질문 답변 도중 다른 위젯 입력으로 rerun → 이어서 출력한 뒤 대화에 한 번만 추가
+    runner = page.chat("고객이 화를 내요", wait=False)
+    wait_until(lambda: streaming(session_id, "chatbot"))
+    runner.request_rerun(RerunData(widget_states=page.tree.get_widget_states()))
+    page.finish(runner)
+    roles = [message["role"] for message in page.state["message_list"]]
+    assert roles == ["ai", "user", "ai"], roles
+    assert model.calls == 2
+    print(f"✅ 추가 질문 중 rerun 후 반영   대화 {len(roles)}개 ({'/'.join(roles)})")
+
+    # 3) 카카오톡 문자 생성 도중 rerun → kakao_text에 반영 (병렬 모드는 유형별로 끝나야 청크가 나옴)
+    runner = page.click("💬 카카오톡 발송용 문자 생성하기", wait=False)
+    wait_until(lambda: streaming(session_id, "kakao", need_text=False))
+    runner.request_rerun(RerunData(widget_states=page.tree.get_widget_states()))
+    page.finish(runner)
+    assert page.state["kakao_text"].strip(), "카카오톡 문자가 반영되지 않았습니다."
+    assert not job_runner.jobs(session_id)
+    print(f"✅ 카카오톡 생성 중 rerun 후 반영 {len(page.state['kakao_text'])}자, 남은 작업 0건")
+
+    # 대화가 그대로면 다시 눌러도 저장된 문자, '새로 생성'은 캐시를 건너뛰고 다시 작성
+    before = model.calls
+    page.click("💬 카카오톡 발송용 문자 생성하기")
+    assert model.calls == before and page.state["kakao_text"].strip()
+    page.click("🔄 새로 생성")
+    assert model.calls > before, "'새로 생성'이 캐시를 건너뛰지 않았습니다."
+    print(f"✅ 카카오톡 재요청 캐시 적중      '새로 생성' 시 호출 {model.calls - before}회")
+
+    # 추가 질문 답변 실패 → 답 없는 질문이 대화에 남지 않고 오류만 표시
+    count = len(page.state["message_list"])
+    model.error = "모델 호출 실패"
+    try:
+        page.chat("답변이 실패할 질문")
+    finally:
+        model.error = ""
+    errors = list(error_messages(page.tree))
+    assert len(page.state["message_list"]) == count, [m["role"] for m in page.state["message_list"]]
+    assert any("추가 질문" in error for error in errors), errors
+    print(f"✅ 답변 실패 시 질문 미추가     대화 {count}개 유지")
+
+    # 4) 생성 도중 새 상황 입력 → 작업 결과를 버리고 이전 대화에 섞지 않음
+    runner = page.chat("타사 설계와 비교해 달래요", wait=False)
+    wait_until(lambda: streaming(session_id, "chatbot"))
+    runner.request_stop()
+    page.finish(runner)
+    page.click("🆕 새로운 청철 상황 입력하기")
+    assert page.state["page"] == "input" and page.state["message_list"] == []
+    assert not job_runner.jobs(session_id)
+    print(f"✅ 새 상황 입력 시 작업 정리     {job_runner.stats()}")
+
+    # 5) 스크립트 생성 실패 → 오류 문구가 스크립트로 저장되거나 챗봇 화면으로 넘어가지 않고 오류만 표시
+    model.error = "모델 호출 실패"
+    try:
+        page.widget("text_input", "고객 이름").set_value("김실패")
+        page.widget("text_area", "청약 철회").set_value("보험료 부담으로 해지를 원함")
+        page.click("🚀 방어 스크립트 생성하기")
+    finally:
+        model.error = ""
+    errors = list(error_messages(page.tree))
+    assert page.state["page"] == "input" and "script_context" not in page.state or not page.state["script_context"], page.state["page"]
+    assert page.state["message_list"] == [] and any("방어 스크립트" in error for error in errors), errors
+    print(f"✅ 생성 실패 시 반영하지 않음   {errors[0]}")
+
+
+def check_bounds():
+    release = threading.Event()
+
+    def produce():
+        release.wait(5)
+        yield "끝"
+
+    runner = JobRunner(workers=1, queue_size=1, session_limit=1, result_ttl=60)
+    first = runner.submit("a", "chatbot", produce)
+    wait_until(lambda: first.status == RUNNING)
+    queued = runner.submit("b", "chatbot", produce)
+    assert queued.status == QUEUED and runner.position(queued) == 0
+    for session_id in ("a", "c"):
+        # a: 세션별 상한, c: 전체 대기열 상한
+        with contextlib.suppress(JobQueueFull):
+            runner.submit(session_id, "chatbot", produce)
+            raise AssertionError(f"{session_id} 작업이 상한을 넘어 접수되었습니다.")
+    runner.discard("b")
+    assert queued.status == DISCARDED
+    release.set()
+    wait_until(lambda: first.finished)
+    assert runner.take(first) and not runner.take(first) and first.text == "끝"
+
+    def broken():
+        # 제너레이터가 아니라 호출 자체가 실패하는 생산자
+        raise RuntimeError("생산자 호출 실패")
+
+    failed = runner.submit("d", "chatbot", broken)
+    wait_until(lambda: failed.finished)
+    assert failed.status == FAILED and not runner.active("d"), failed.status
+    stats = runner.stats()
+    assert stats["rejected"] == 2 and stats["delivered"] == 1, stats
+    print(f"✅ 대기열 상한·정리             {stats}")
+
+
+def main():
+    install_mock_runtime()
+    model = FakeStreamingChatModel(ttft=0.3, tokens_per_second=300, output_tokens=120)
+    install_fake_llm(model)
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        try:
+            check_page(model)
+            check_bounds()
+        finally:
+            results = [line for line in log.getvalue().splitlines() if line.startswith("✅")]
+    print("\n".join(results))
+
+
+if __name__ == "__main__":
+    main()
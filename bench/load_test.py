@@ -0,0 +1,332 @@
+"""동시 상담원 부하 테스트 (가짜 LLM, 로컬 전용).
+
+한 프로세스(= `streamlit run chatbot_prev.py` 컨테이너 하나)에서 N명의 가상 상담원이 동시에
+로그인 → 상황 입력 → 스크립트 생성 → 추가 질문 N회 → 카카오톡 문자 → 대화 저장을 진행합니다.
+각 단계는 실제 화면 스크립트를 위젯 입력(버튼 클릭, 채팅 입력)으로 실행하므로 rerun 비용까지 포함됩니다.
+Streamlit 1.25에는 AppTest가 없어 streamlit.testing.LocalScriptRunner로 세션마다 스크립트를 실행합니다.
+
+동시 인원을 단계적으로 늘리며 단계별 p50/p95/p99, 처리량, llm_prev.store 메모리 증가,
+프로세스 RSS, 스레드 수를 보고해 처리 한계(knee)를 찾습니다.
+
+    python bench/load_test.py --sessions 1 5 10 20 --turns 3
+    python bench/load_test.py --sessions 10 --ttft 0.8 --tokens-per-second 50 --output load.json
+"""
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORK_DIR = tempfile.mkdtemp(prefix="stayon_load_")
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+os.environ.setdefault("OPENAI_API_KEY", "sk-load")
+os.environ["HISTORY_ROOT"] = os.path.join(WORK_DIR, "history")
+os.environ["HISTORY_CATALOG_DIR"] = os.path.join(WORK_DIR, "catalog")
+os.environ["RESPONSE_CACHE_PATH"] = os.path.join(WORK_DIR, "response_cache.db")
+os.environ["SCENARIO_POOL_PATH"] = os.path.join(WORK_DIR, "scenario_pool.json")
+os.environ["HISTORY_DB_PATH"] = os.path.join(WORK_DIR, "chat_history.db")
+os.environ["TELEMETRY_PORT"] = "0"
+os.environ["TELEMETRY_JSON_LOG"] = "0"
+if "--keep-rate-limit" not in sys.argv:
+    # 가짜 모델이라 공급자 한도 대기는 빼고 컨테이너 자체의 한계만 봄
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = "0"
+    os.environ["LLM_TOKENS_PER_MINUTE"] = "0"
+
+from streamlit import config as st_config
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner import RerunData, ScriptRunnerEvent
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.state import SessionState
+from streamlit.testing.element_tree import parse_tree_from_messages
+from streamlit.testing.local_script_runner import LocalScriptRunner
+
+import llm_prev
+from fake_llm import FakeStreamingChatModel, install_fake_llm
+
+warnings.filterwarnings("ignore", category=PendingDeprecationWarning)
+
+SCRIPT_PATH = os.path.join(ROOT, "chatbot_prev.py")
+STEPS = ("login", "script", "followup", "kakao", "save")
+SCRIPT_CACHE = ScriptCache()
+QUESTIONS = ["고객이 화를 내요", "타사 설계와 비교해 달래요", "납입 유예가 가능한지 물어봐요", "가족 보험도 같이 보고 싶대요"]
+
+
+# ======================== 화면 실행 ========================
+class PageSession:
+    """가상 상담원 한 명의 브라우저 탭: 직전 실행의 위젯/세션 상태를 이어 받아 다음 rerun을 실행."""
+
+    def __init__(self, index, step_timeout):
+        self.index = index
+        self.step_timeout = step_timeout
+        self.tree = None
+        self.state = SessionState()
+
+    def start(self, widget_states=None):
+        # 실행만 시작하고 돌아옴 (생성 중 다른 위젯 입력으로 끊기는 상황을 재현할 때 사용)
+        runner = LocalScriptRunner(SCRIPT_PATH, self.state)
+        runner._session_id = f"load-{self.index}"
+        # 실제 서버처럼 모든 세션이 컴파일된 스크립트 하나를 공유
+        runner._script_cache = SCRIPT_CACHE
+        # 화면이 스스로 rerun하면 브라우저처럼 마지막 실행의 화면만 남김
+        runner.on_event.connect(self._clear_on_start, weak=False)
+        runner.request_rerun(RerunData(widget_states=widget_states))
+        runner.start()
+        return runner
+
+    def finish(self, runner):
+        runner._script_thread.join(self.step_timeout)
+        if runner._script_thread.is_alive():
+            runner.request_stop()
+            raise TimeoutError(f"세션 {self.index}: {self.step_timeout}s 안에 rerun이 끝나지 않았습니다.")
+        if runner.script_thread_exceptions or ScriptRunnerEvent.SCRIPT_STOPPED_WITH_SUCCESS not in runner.events:
+            raise RuntimeError(f"세션 {self.index}: 화면 실행 실패 {runner.script_thread_exceptions or runner.event_data[-2:]}")
+        tree = parse_tree_from_messages(runner.forward_msgs())
+        tree.script_path = SCRIPT_PATH
+        tree._session_state = runner.session_state
+        self.tree, self.state = tree, runner.session_state
+        return tree
+
+    def rerun(self, widget_states=None):
+        return self.finish(self.start(widget_states))
+
+    @staticmethod
+    def _clear_on_start(runner, event, **kwargs):
+        if event == ScriptRunnerEvent.SCRIPT_STARTED:
+            runner.forward_msg_queue.clear()
+
+    def widget(self, kind, label):
+        for node in self.tree.get(kind):
+            if node.label.startswith(label):
+                return node
+        raise LookupError(f"세션 {self.index}: '{label}' {kind}가 화면에 없습니다 (page={self.state['page']}).")
+
+    def click(self, label, wait=True):
+        # wait=False면 실행을 시작한 runner를 돌려줌 (finish로 마무리)
+        self.widget("button", label).click()
+        widget_states = self.tree.get_widget_states()
+        return self.rerun(widget_states) if wait else self.start(widget_states)
+
+    def chat(self, text, wait=True):
+        widget_states = self.tree.get_widget_states()
+        chat_input = self.tree.get("chat_input")[0].proto.chat_input
+        state = WidgetState(id=chat_input.id)
+        state.string_trigger_value.data = text
+        widget_states.widgets.append(state)
+        return self.rerun(widget_states) if wait else self.start(widget_states)
+
+
+def install_mock_runtime():
+    # 서버 없이 화면 스크립트를 실행하는 데 필요한 최소한의 Streamlit 런타임
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    st_config.set_option("runner.postScriptGC", False)
+
+
+def consultant_flow(index, turns, think_time, step_timeout, timings):
+    page = PageSession(index, step_timeout)
+
+    def step(name, action):
+        start = time.perf_counter()
+        action()
+        timings.setdefault(name, []).append(time.perf_counter() - start)
+        if think_time:
+            time.sleep(think_time)
+
+    page.rerun()
+
+    def login():
+        page.widget("text_input", "ID").set_value(f"부하{index}")
+        page.widget("text_input", "Password").set_value(f"{index:04d}")
+        page.click("로그인")
+    step("login", login)
+
+    def script():
+        page.widget("text_input", "고객 이름").set_value(f"고객{index}")
+        page.widget("text_area", "청약 철회").set_value("보험료 부담으로 해지를 원하며, 대안 제시에 일부 관심을 보임")
+        page.click("🚀 방어 스크립트 생성하기")
+        assert page.state["page"] == "chatbot", "스크립트 생성 후 챗봇 화면으로 넘어가지 않았습니다."
+    step("script", script)
+
+    for turn in range(turns):
+        # 상담원마다 질문이 달라야 카카오톡 문자가 다른 세션의 캐시로 끝나지 않음
+        step("followup", lambda: page.chat(f"{QUESTIONS[turn % len(QUESTIONS)]} (상담 {index})"))
+    step("kakao", lambda: page.click("💬 카카오톡 발송용 문자 생성하기"))
+    step("save", lambda: page.click("💾 대화 저장하기"))
+
+
+# ======================== 자원 측정 ========================
+def rss_bytes():
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ResourceSampler:
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append({"threads": threading.active_count(), "rss": rss_bytes()})
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * q
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+# ======================== 실행 ========================
+def run_level(sessions, offset, args):
+    timings = {}
+    errors = []
+    store_before = llm_prev.store.stats()
+    rss_before = rss_bytes()
+
+    started = time.perf_counter()
+    with ResourceSampler() as sampler, contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="consultant") as pool:
+            futures = [
+                pool.submit(consultant_flow, offset + i, args.turns, args.think_time, args.step_timeout, timings)
+                for i in range(sessions)
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(f"{type(e).__name__}: {e}")
+    elapsed = time.perf_counter() - started
+    store_after = llm_prev.store.stats()
+
+    steps = {}
+    for name in STEPS:
+        values = [v * 1000 for v in timings.get(name, [])]
+        steps[name] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.50), 1),
+            "p95_ms": round(percentile(values, 0.95), 1),
+            "p99_ms": round(percentile(values, 0.99), 1),
+            "max_ms": round(max(values), 1) if values else 0.0,
+        }
+    completed = sessions - len(errors)
+    return {
+        "sessions": sessions,
+        "elapsed_s": round(elapsed, 2),
+        "completed": completed,
+        "errors": errors[:5],
+        "throughput": {
+            "sessions_per_min": round(completed / elapsed * 60, 2),
+            "steps_per_s": round(sum(len(v) for v in timings.values()) / elapsed, 2),
+        },
+        "steps": steps,
+        "store": {
+            "live_sessions": store_after.get("live_sessions"),
+            "approx_bytes_delta": (store_after.get("approx_bytes", 0) or 0) - (store_before.get("approx_bytes", 0) or 0),
+            "approx_bytes": store_after.get("approx_bytes"),
+        },
+        "process": {
+            "rss_delta_mb": round((rss_bytes() - rss_before) / 2**20, 1),
+            "rss_peak_mb": round(max(s["rss"] for s in sampler.samples) / 2**20, 1) if sampler.samples else None,
+            "threads_peak": max((s["threads"] for s in sampler.samples), default=threading.active_count()),
+            "threads_after": threading.active_count(),
+        },
+    }
+
+
+def print_level(result):
+    print(f"\n👥 동시 상담원 {result['sessions']}명 — {result['elapsed_s']}s, "
+          f"완료 {result['completed']}/{result['sessions']}, "
+          f"{result['throughput']['sessions_per_min']} 세션/분, {result['throughput']['steps_per_s']} 단계/초")
+    print(f"   {'단계':<9} {'횟수':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} (ms)")
+    for name, s in result["steps"].items():
+        print(f"   {name:<10} {s['count']:>5} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+    store, process = result["store"], result["process"]
+    print(f"   store: 세션 {store['live_sessions']}개, +{store['approx_bytes_delta'] / 1024:.1f}KB "
+          f"(누적 {(store['approx_bytes'] or 0) / 1024:.1f}KB) | RSS +{process['rss_delta_mb']}MB "
+          f"(최대 {process['rss_peak_mb']}MB) | 스레드 최대 {process['threads_peak']}, 종료 후 {process['threads_after']}")
+    for error in result["errors"]:
+        print(f"   🔥 {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 상담원 부하 테스트")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 20], help="단계별 동시 상담원 수")
+    parser.add_argument("--turns", type=int, default=3, help="세션당 추가 질문 수")
+    parser.add_argument("--think-time", type=float, default=0.0, help="단계 사이 대기(초)")
+    parser.add_argument("--step-timeout", type=float, default=300.0)
+    parser.add_argument("--ttft", type=float, default=0.4, help="가짜 모델 첫 토큰 지연 중앙값(초)")
+    parser.add_argument("--tokens-per-second", type=float, default=120.0)
+    parser.add_argument("--output-tokens", type=int, default=300)
+    parser.add_argument("--jitter", type=float, default=0.4, help="지연 분포 폭 (0이면 고정)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep-rate-limit", action="store_true", help="LLM_*_PER_MINUTE 한도를 그대로 적용")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    install_fake_llm(FakeStreamingChatModel(
+        ttft=args.ttft, tokens_per_second=args.tokens_per_second, output_tokens=args.output_tokens,
+        jitter=args.jitter, seed=args.seed,
+    ))
+    install_mock_runtime()
+
+    # 모듈 로딩/이미지 준비 비용이 첫 단계에 섞이지 않도록 한 번 실행해 둠
+    with contextlib.redirect_stdout(io.StringIO()):
+        PageSession(-1, args.step_timeout).rerun()
+
+    results = []
+    offset = 0
+    for sessions in args.sessions:
+        result = run_level(sessions, offset, args)
+        offset += sessions
+        print_level(result)
+        results.append(result)
+
+    if args.output:
+        report = {"config": vars(args), "levels": results}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""진입점별 모델 경로(LLM_ROUTES) 점검.
+
+경로마다 다른 모델·파라미터를 지정한 뒤
+1) 경로를 번갈아 호출해도 모델 클라이언트가 조합마다 한 번만 만들어지는지(get_llm 캐시),
+2) 각 클라이언트에 temperature / max_tokens / timeout이 적용되는지,
+3) 진입점 호출이 경로의 모델로 기록되고 get_route_stats()와 /latency에 경로별 지연이 나오는지
+확인합니다. 3)은 모델마다 지연이 다른 가짜 모델을 사용하므로 네트워크 없이 실행됩니다.
+
+    python bench/model_routes_check.py
+"""
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import warnings
+from functools import lru_cache
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = _free_port()
+WORK_DIR = tempfile.mkdtemp(prefix="stayon_routes_")
+os.environ.setdefault("OPENAI_API_KEY", "sk-check")
+os.environ["HISTORY_BACKEND"] = "memory"
+os.environ["RESPONSE_CACHE_PATH"] = os.path.join(WORK_DIR, "response_cache.db")
+os.environ["SCENARIO_POOL_PATH"] = os.path.join(WORK_DIR, "scenario_pool.json")
+os.environ["TELEMETRY_JSON_LOG"] = "0"
+os.environ["LLM_ROUTES"] = json.dumps({
+    "scenario": {"model": "gpt-4.1-nano", "max_tokens": 800, "temperature": 1.0},
+    "kakao": {"model": "gpt-4.1-nano", "temperature": 0.5, "timeout": 30},
+})
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import llm_prev
+import httpx
+from fake_llm import FakeStreamingChatModel, attach_script_context
+from telemetry import telemetry
+
+warnings.filterwarnings("ignore", category=PendingDeprecationWarning)
+
+# 모델별 가짜 지연 (nano가 더 빠르다고 가정)
+FAKE_TTFT = {"gpt-4.1-mini": 0.12, "gpt-4.1-nano": 0.04}
+
+
+def check_client_cache():
+    routes = ("scenario", "script", "chatbot", "kakao") * 25
+    llms = {route: llm_prev.get_route_llm(route) for route in routes}
+    info = llm_prev.get_llm.cache_info()
+    # script/chatbot은 같은 설정이라 클라이언트 하나를 공유 → 조합 3개
+    assert info.misses == 3 and info.currsize == 3, info
+    assert llms["script"] is llms["chatbot"]
+    assert llms["scenario"].model_name == "gpt-4.1-nano" and llms["scenario"].max_tokens == 800
+    assert llms["kakao"].temperature == 0.5 and llms["kakao"].request_timeout == 30
+    assert llms["script"].model_name == "gpt-4.1-mini"
+    print(f"✅ 경로 100회 번갈아 조회       클라이언트 생성 {info.misses}회, 캐시 적중 {info.hits}회")
+
+
+def check_route_latency():
+    @lru_cache(maxsize=None)
+    def fake_llm(model, **params):
+        return FakeStreamingChatModel(model_name=model, ttft=FAKE_TTFT[model], tokens_per_second=4000)
+
+    llm_prev.get_llm = fake_llm
+    for getter in (llm_prev.get_script_chain, llm_prev.get_chatbot_chain, llm_prev.get_kakao_chain,
+                   llm_prev.get_scenario_chain):
+        getter.cache_clear()
+
+    attach_script_context({"session_id": "routes-session", "user_name": "홍길동", "selected_points": []})
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(3):
+            script = "".join(llm_prev.get_script_response(f"김경로{i}", "보험료 부담", "중", regenerate=True))
+            "".join(llm_prev.get_chatbot_response("고객이 화를 내요", script))
+            "".join(llm_prev.get_kakao_response(script, [], mode="single", regenerate=True))
+            llm_prev.generate_scenario_batch([(6, "중")])
+
+    stats = llm_prev.get_route_stats()
+    for route, expected in (("scenario", "gpt-4.1-nano"), ("script", "gpt-4.1-mini"),
+                            ("chatbot", "gpt-4.1-mini"), ("kakao", "gpt-4.1-nano")):
+        latency = stats[route]["latency"]
+        assert [entry["model"] for entry in latency] == [expected], (route, latency)
+        entry = latency[0]
+        assert entry["calls"] == 3 and entry["p50_s"] > 0, entry
+        print(f"✅ {route:<9} {expected:<13} 호출 {entry['calls']}회  p50 {entry['p50_s']:.3f}s  "
+              f"p95 {entry['p95_s']:.3f}s  첫 토큰 p50 {entry['ttft_p50_s']}s")
+
+    report = httpx.get(f"http://127.0.0.1:{PORT}/latency").json()
+    assert {(entry["entry_point"], entry["model"]) for entry in report} >= {
+        ("script", "gpt-4.1-mini"), ("kakao", "gpt-4.1-nano"), ("scenario_batch", "gpt-4.1-nano"),
+    }, report
+    print(f"✅ /latency 노출 확인 ({len(report)}개 진입점·모델)")
+
+
+def main():
+    telemetry.serve(port=PORT)
+    check_client_cache()
+    check_route_latency()
+
+
+if __name__ == "__main__":
+    main()
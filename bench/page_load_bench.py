@@ -0,0 +1,167 @@
+"""화면 이미지 로딩 측정 (첫 방문 / 재방문).
+
+before: GitHub blob URL(?raw=true) → 302 → raw 원본 (최대 4400px, 아바타 1.2MB), Cache-Control max-age=300
+after : ui_assets가 축소한 사본을 Streamlit 정적 경로(app/static/...?v=해시)로 제공 → 10년 Cache-Control
+        (정적 서빙을 끈 경우 data URI로 인라인 → 이미지 요청 0회, 대신 페이지 본문이 커짐)
+
+로컬 tornado 서버 두 개로 두 방식을 재현하고, max-age를 따르는 단순한 브라우저 캐시 모델로
+요청 수·전송 바이트·소요 시간을 잽니다. --rtt-ms로 요청당 왕복 지연을 흉내낼 수 있습니다.
+
+    python bench/page_load_bench.py --rtt-ms 40
+    python bench/page_load_bench.py --github   # 네트워크가 되면 실제 GitHub URL도 측정
+"""
+import argparse
+import asyncio
+import os
+import re
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import tornado.httpserver
+import tornado.ioloop
+import tornado.web
+from streamlit.web.server.app_static_file_handler import AppStaticFileHandler
+
+import ui_assets
+
+GITHUB_BASE = "https://github.com/jssoleey/goodrich-chatbot-prevent/blob/main/image/"
+
+
+class _DelayMixin:
+    rtt = 0.0
+
+    async def prepare(self):
+        if self.rtt:
+            await asyncio.sleep(self.rtt)
+
+
+class BlobRedirectHandler(_DelayMixin, tornado.web.RequestHandler):
+    # github.com/.../blob/...?raw=true 와 같은 동작 (캐시되지 않는 302)
+    def get(self, filename):
+        self.set_header("Cache-Control", "no-cache")
+        self.redirect(f"/raw/{filename}", status=302)
+
+
+class RawHandler(_DelayMixin, tornado.web.StaticFileHandler):
+    # raw.githubusercontent.com 과 같은 5분 캐시
+    def set_extra_headers(self, path):
+        self.set_header("Cache-Control", "max-age=300")
+
+
+class StaticHandler(_DelayMixin, AppStaticFileHandler):
+    pass
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(static_dir, rtt):
+    _DelayMixin.rtt = rtt
+    app = tornado.web.Application([
+        (r"/blob/(.*)", BlobRedirectHandler),
+        (r"/raw/(.*)", RawHandler, {"path": ui_assets.ASSET_SOURCE_DIR}),
+        (r"/app/static/(.*)", StaticHandler, {"path": static_dir}),
+    ])
+    port = _free_port()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        server = tornado.httpserver.HTTPServer(app)
+        server.listen(port, "127.0.0.1")
+        ready.set()
+        tornado.ioloop.IOLoop.current().start()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{port}"
+
+
+class BrowserCache:
+    """Cache-Control max-age만 따르는 단순 모델 (302 응답은 캐시하지 않음)."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def fresh(self, url):
+        expires = self.entries.get(url)
+        return expires is not None and expires > time.time()
+
+    def store(self, url, response):
+        match = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+        if response.status_code == 200 and match:
+            self.entries[url] = time.time() + int(match.group(1))
+
+
+def load_images(client, cache, urls):
+    # 페이지 한 번 로딩 시 이미지 요청을 순서대로 따라감 (리다이렉트 포함)
+    requests = transferred = 0
+    start = time.perf_counter()
+    for url in dict.fromkeys(urls):
+        if url.startswith("data:"):
+            continue
+        while url and not cache.fresh(url):
+            response = client.get(url)
+            requests += 1
+            transferred += len(response.content)
+            cache.store(url, response)
+            location = response.headers.get("location")
+            url = str(response.url.join(location)) if response.is_redirect and location else None
+    return requests, transferred, (time.perf_counter() - start) * 1000
+
+
+def measure(label, urls, client):
+    cache = BrowserCache()
+    for visit in ("첫 방문", "재방문"):
+        requests, transferred, elapsed = load_images(client, cache, urls)
+        print(f"{label:<22} {visit:<5} 요청 {requests:>3}회  {transferred / 1024:>8.1f}KB  {elapsed:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    parser.add_argument("--github", action="store_true")
+    args = parser.parse_args()
+
+    static_dir = tempfile.mkdtemp(prefix="stayon_static_")
+    ui_assets.ASSET_STATIC_DIR = static_dir
+    try:
+        base = start_server(static_dir, args.rtt_ms / 1000)
+        # 화면에서 쓰는 이미지: 아이콘, 상단/하단 배너, 로고, 아바타 2종
+        names = list(ui_assets.ASSETS)
+        before = [f"{base}/blob/{ui_assets.ASSETS[name][0]}?raw=true" for name in names]
+        after = [f"{base}/{url}" for url in ui_assets.build_asset_urls(True).values()]
+        inline = ui_assets.build_asset_urls(False)
+
+        with httpx.Client(follow_redirects=False) as client:
+            measure("before (GitHub 방식)", before, client)
+            measure("after (정적 서빙)", after, client)
+
+            response = client.get(after[0])
+            print(f"\n정적 서빙 Cache-Control: {response.headers.get('cache-control')}")
+
+            if args.github:
+                try:
+                    urls = [GITHUB_BASE + ui_assets.ASSETS[name][0] + "?raw=true" for name in names]
+                    measure("실제 GitHub", urls, client)
+                except httpx.HTTPError as e:
+                    print("⚠️ GitHub에 접속할 수 없어 건너뜀:", e)
+
+        inline_kb = sum(len(url) for url in dict.fromkeys(inline.values())) / 1024
+        print(f"data URI 모드: 이미지 요청 0회, 페이지 본문 +{inline_kb:.1f}KB (프로세스당 한 번 인코딩)")
+    finally:
+        shutil.rmtree(static_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
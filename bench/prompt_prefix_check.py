@@ -0,0 +1,140 @@
+"""프롬프트 접두부(prefix) 고정 여부 점검.
+
+공급자 프롬프트 캐시는 요청의 앞부분이 바이트 단위로 같아야 적중합니다.
+각 진입점(랜덤 상황, 스크립트, 추가 질문, 카카오톡 3종/통합)에 서로 다른 요청을 두 번씩 보내
+OpenAI로 전송될 메시지 중 고정 지침 부분이 완전히 같은지 확인하고,
+usage의 cached_tokens가 호출마다 기록되는지도 가짜 응답으로 확인합니다.
+실제 API 대신 가짜 모델을 사용하므로 네트워크 없이 실행됩니다.
+
+    python bench/prompt_prefix_check.py
+"""
+import json
+import os
+import sys
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-check")
+os.environ.setdefault("HISTORY_BACKEND", "memory")
+
+from langchain_community.adapters.openai import convert_message_to_dict
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import llm_prev
+from llm_runtime import UsageRecorder, UsageRecordingCompletions
+
+warnings.filterwarnings("ignore", category=PendingDeprecationWarning)
+
+
+class RecordingChatModel(BaseChatModel):
+    """받은 메시지 목록을 기록하고 고정 응답을 돌려주는 가짜 모델."""
+
+    calls: list = []
+
+    @property
+    def _llm_type(self):
+        return "recording-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="[]"))])
+
+
+def payload_bytes(messages):
+    # OpenAI로 전송되는 messages 배열과 같은 형태로 직렬화
+    return [json.dumps(convert_message_to_dict(m), ensure_ascii=False).encode("utf-8") for m in messages]
+
+
+def check(label, first, second, static_count):
+    a, b = payload_bytes(first), payload_bytes(second)
+    assert a[:static_count] == b[:static_count], f"{label}: 고정 접두부가 요청마다 다릅니다."
+    assert a != b, f"{label}: 두 요청이 같아 비교가 의미 없습니다."
+    prefix = sum(len(part) for part in a[:static_count])
+    prefix_tokens = sum(llm_prev.count_tokens(m.content) for m in first[:static_count])
+    print(f"✅ {label:<16} 고정 접두부 {prefix:6d} bytes (~{prefix_tokens} tokens)")
+
+
+def run_entry_points(model):
+    calls = model.calls
+
+    calls.clear()
+    llm_prev.generate_scenario_batch([(1, "하"), (2, "중")])
+    llm_prev.generate_scenario_batch([(6, "상")])
+    check("랜덤 상황", calls[0], calls[1], 1)
+
+    calls.clear()
+    for name, consultant, points in (("김민지", "홍길동", []), ("이서준", "박상담", list(llm_prev.POINT_DESCRIPTIONS)[:2])):
+        request = llm_prev.build_script_request(
+            name, f"{name} 고객 해지 요청", "중", session_id=f"check-{name}",
+            consultant_name=consultant, selected_points=points,
+        )
+        "".join(request["chain"].stream(request["inputs"], config=request["config"]))
+    check("스크립트", calls[0], calls[1], 1)
+
+    calls.clear()
+    for session_id, question in (("check-a", "고객이 화를 내요"), ("check-b", "타사 비교를 원해요")):
+        request = llm_prev.build_chatbot_request(question, f"{session_id} 스크립트", session_id)
+        "".join(request["chain"].stream(request["inputs"], config=request["config"]))
+    check("추가 질문", calls[0], calls[1], 1)
+
+    calls.clear()
+    for script in ("첫 번째 스크립트", "두 번째 스크립트"):
+        list(llm_prev.stream_kakao_variants(script, "- 상담원 요청: 안내"))
+    # 세 유형은 고정 지침을, 같은 유형끼리는 유형 형식까지 공유
+    by_format = {}
+    for messages in calls:
+        by_format.setdefault(messages[1].content, []).append(messages)
+    for i, (first, second) in enumerate(by_format.values(), 1):
+        check(f"카카오톡 유형 {i}", first, second, 2)
+    check("카카오톡 유형 간", calls[0], calls[-1], 1)
+
+    calls.clear()
+    for session_id in ("check-a", "check-b"):
+        request = llm_prev.build_kakao_request(f"{session_id} 스크립트", [], session_id)
+        "".join(request["chain"].stream(request["inputs"]))
+    check("카카오톡 통합", calls[0], calls[1], 2)
+
+
+class FakeCompletions:
+    # 스트림 마지막 청크에 usage를 담아 보내는 OpenAI chat.completions 흉내
+    def __init__(self):
+        self.kwargs = None
+
+    def create(self, **kwargs):
+        self.kwargs = kwargs
+        usage = {"prompt_tokens": 1800, "completion_tokens": 20, "prompt_tokens_details": {"cached_tokens": 1536}}
+        if not kwargs.get("stream"):
+            return {"choices": [], "usage": usage}
+        return iter([{"choices": [{"delta": {"content": "안녕"}}], "usage": None}, {"choices": [], "usage": usage}])
+
+
+def check_usage_recording():
+    recorder = UsageRecorder()
+    fake = FakeCompletions()
+    completions = UsageRecordingCompletions(fake, recorder)
+
+    list(completions.create(model="gpt-4.1-mini", messages=[], stream=True))
+    assert fake.kwargs["stream_options"] == {"include_usage": True}, "스트리밍 요청에 usage가 요청되지 않았습니다."
+    completions.create(model="gpt-4.1-mini", messages=[])
+
+    stats = recorder.stats()
+    assert stats["calls"] == 2 and stats["cached_tokens"] == 3072, stats
+    print(f"✅ cached_tokens 기록  {stats['cached_tokens']}/{stats['prompt_tokens']} (ratio {stats['cache_hit_ratio']:.2f})")
+
+
+def main():
+    model = RecordingChatModel()
+    llm_prev.get_llm = lambda *a, **k: model
+    for factory in (llm_prev.get_scenario_chain, llm_prev.get_script_chain, llm_prev.get_chatbot_chain,
+                    llm_prev.get_kakao_chain):
+        factory.cache_clear()
+
+    run_entry_points(model)
+    check_usage_recording()
+    print("모든 진입점의 고정 접두부가 요청 간 동일합니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""오프라인 벤치마크 모음 (가짜 LLM, 네트워크 불필요).
+
+get_llm()을 지연 시간·첫 토큰 시간·초당 토큰 수를 조절할 수 있는 결정적 가짜 모델로 바꾼 뒤
+진입점(get_script_response, get_chatbot_response, get_kakao_response, get_random_cancel_info),
+format_markdown, chatbot_prev.py 전체 화면 rerun을 대화 길이별로 잽니다.
+결과는 JSON으로 저장하고, 저장된 기준값(baseline)과 비교해 느려진 항목이 있으면 종료 코드 1을 반환합니다.
+
+Streamlit 1.25에는 AppTest가 없으므로 화면 rerun은 같은 런타임 경로를 쓰는
+streamlit.testing.LocalScriptRunner로 실행하고, 스크립트 실행 시간과 전송 메시지 크기를 기록합니다.
+
+    python bench/run_bench.py --output bench_output.json
+    python bench/run_bench.py --baseline bench/baseline.json
+    python bench/run_bench.py --save-baseline bench/baseline.json
+"""
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from unittest.mock import MagicMock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 앱 모듈을 불러오기 전에 모든 저장소를 임시 폴더로 돌림
+WORK_DIR = tempfile.mkdtemp(prefix="stayon_bench_")
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ["HISTORY_BACKEND"] = "memory"
+os.environ["HISTORY_ROOT"] = os.path.join(WORK_DIR, "history")
+os.environ["HISTORY_CATALOG_DIR"] = os.path.join(WORK_DIR, "catalog")
+os.environ["RESPONSE_CACHE_PATH"] = os.path.join(WORK_DIR, "response_cache.db")
+os.environ["SCENARIO_POOL_PATH"] = os.path.join(WORK_DIR, "scenario_pool.json")
+os.environ["LLM_REQUESTS_PER_MINUTE"] = "1000000"
+os.environ["LLM_TOKENS_PER_MINUTE"] = "1000000000"
+os.environ["TELEMETRY_PORT"] = "0"
+os.environ["TELEMETRY_JSON_LOG"] = "0"
+
+import streamlit
+from langchain_core.messages import AIMessage, HumanMessage
+from streamlit import config as st_config
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+from streamlit.runtime.state import SessionState
+from streamlit.testing.local_script_runner import LocalScriptRunner
+
+import llm_prev
+from fake_llm import SAMPLE_AI, FakeStreamingChatModel, attach_script_context, install_fake_llm
+from message_format import format_markdown, make_message
+
+warnings.filterwarnings("ignore", category=PendingDeprecationWarning)
+
+SCRIPT_PATH = os.path.join(ROOT, "chatbot_prev.py")
+
+
+# ======================== 측정 도우미 ========================
+def conversation(turns):
+    messages = [make_message("ai", "▶️ 방어 스크립트\n" + SAMPLE_AI * 3)]
+    for i in range(turns):
+        messages.append(make_message("user", f"{i + 1}번째 질문입니다. 고객이 다시 해지를 요청해요."))
+        messages.append(make_message("ai", f"{SAMPLE_AI}\n📝 메모 {i + 1}: 추가 확인 필요"))
+    return messages
+
+
+def history_messages(messages):
+    return [HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
+            for m in messages]
+
+
+def time_stream(make_stream):
+    start = time.perf_counter()
+    first = None
+    for _ in make_stream():
+        if first is None:
+            first = time.perf_counter()
+    end = time.perf_counter()
+    return {"ttft_ms": ((first or end) - start) * 1000, "total_ms": (end - start) * 1000}
+
+
+def summarize(samples):
+    return {key: round(statistics.median(s[key] for s in samples), 3) for key in samples[0]}
+
+
+def repeat(fn, times):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return summarize([fn() for _ in range(times)])
+
+
+# ======================== 진입점 ========================
+def bench_script(repeat_count):
+    def run():
+        return time_stream(lambda: llm_prev.get_script_response("김벤치", "보험료 부담으로 해지 요청", "중", regenerate=True))
+    return {"turns=0": repeat(run, repeat_count)}
+
+
+def bench_chatbot(turn_counts, repeat_count):
+    results = {}
+    for turns in turn_counts:
+        messages = conversation(turns)
+        script = messages[0]["content"]
+
+        def run():
+            llm_prev.restore_session_history(streamlit.session_state.session_id, history_messages(messages))
+            return time_stream(lambda: llm_prev.get_chatbot_response("고객이 다시 전화를 안 받아요", script))
+        results[f"turns={turns}"] = repeat(run, repeat_count)
+    return results
+
+
+def bench_kakao(turn_counts, repeat_count):
+    results = {}
+    for mode in ("parallel", "single"):
+        for turns in turn_counts:
+            messages = conversation(turns)
+
+            def run():
+                # 응답 캐시를 건너뛰어 매번 실제 생성 시간을 잼
+                return time_stream(lambda: llm_prev.get_kakao_response(
+                    messages[0]["content"], messages, mode=mode, regenerate=True
+                ))
+            results[f"{mode}.turns={turns}"] = repeat(run, repeat_count)
+    return results
+
+
+def bench_random_cancel_info(repeat_count):
+    pool = llm_prev.scenario_pool
+
+    def timed_pop(empty):
+        if empty:
+            with pool._lock:
+                pool._scenarios.clear()
+        start = time.perf_counter()
+        pool.pop()
+        return {"total_ms": (time.perf_counter() - start) * 1000}
+
+    cold = repeat(lambda: timed_pop(True), repeat_count)
+    pool.refill()
+    warm = repeat(lambda: timed_pop(False), repeat_count)
+    return {"pool_empty": cold, "pool_ready": warm}
+
+
+def bench_format_markdown(turn_counts, repeat_count):
+    results = {}
+    for turns in turn_counts:
+        # 서식 처리 캐시를 거치지 않도록 매번 다른 원문을 직접 처리
+        texts = [f"{SAMPLE_AI}\n📝 메모 {i}" for i in range(max(turns, 1))]
+
+        def run():
+            start = time.perf_counter()
+            for text in texts:
+                format_markdown(text)
+            return {"total_ms": (time.perf_counter() - start) * 1000}
+        results[f"messages={len(texts)}"] = repeat(run, repeat_count)
+    return results
+
+
+# ======================== 화면 rerun ========================
+class _MockRuntime:
+    """LocalScriptRunner가 이미지 등 미디어 파일을 등록할 수 있도록 최소한의 런타임을 둠."""
+
+    def __enter__(self):
+        runtime = MagicMock(spec=Runtime)
+        runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+        runtime.cache_storage_manager = MemoryCacheStorageManager()
+        Runtime._instance = runtime
+        st_config.set_option("runner.postScriptGC", False)
+        return self
+
+    def __exit__(self, *exc):
+        Runtime._instance = None
+
+
+def run_page(session_values):
+    state = SessionState()
+    for key, value in session_values.items():
+        state[key] = value
+    runner = LocalScriptRunner(SCRIPT_PATH, prev_session_state=state)
+    start = time.perf_counter()
+    runner.start()
+    runner.join()
+    elapsed = (time.perf_counter() - start) * 1000
+    if ScriptRunnerEvent.SCRIPT_STOPPED_WITH_SUCCESS not in runner.events:
+        raise RuntimeError(f"화면 실행 실패: {runner.script_thread_exceptions or runner.events}")
+    messages = runner.forward_msgs()
+    return {
+        "rerun_ms": elapsed,
+        "payload_kb": sum(msg.ByteSize() for msg in messages) / 1024,
+        "deltas": sum(1 for msg in messages if msg.HasField("delta")),
+    }
+
+
+def bench_page(turn_counts, repeat_count):
+    results = {}
+    with _MockRuntime():
+        for turns in turn_counts:
+            messages = conversation(turns)
+            session_values = {
+                "page": "chatbot",
+                "user_folder": "벤치_0000",
+                "user_name": "벤치",
+                "session_id": "bench-page",
+                "customer_name": "김벤치",
+                "cancel_strength": "중 (고민 중)",
+                "customer_situation": "보험료 부담으로 해지 요청",
+                "script_context": messages[0]["content"],
+                "message_list": messages,
+            }
+            if not results:
+                # 첫 실행은 모듈 로딩·이미지 준비 비용이 섞이므로 버림
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run_page(session_values)
+            results[f"turns={turns}"] = repeat(lambda: run_page(session_values), repeat_count)
+    return results
+
+
+# ======================== 기준값 비교 ========================
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    # 시간 지표만 비교 (기준값보다 tolerance 비율 이상, 그리고 min_delta_ms 이상 느려지면 회귀)
+    regressions = []
+    base = flatten(baseline["results"])
+    for key, value in flatten(current["results"]).items():
+        if not key.endswith("_ms") or key not in base:
+            continue
+        before = base[key]
+        ratio = value / before if before else float("inf")
+        flag = value > before * (1 + tolerance) and value - before > min_delta_ms
+        print(f"{'❌' if flag else '✅'} {key:<45} {before:>10.2f} → {value:>10.2f} ms ({ratio:>5.2f}x)")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 LLM으로 진입점/화면 rerun 성능 측정")
+    parser.add_argument("--turns", type=int, nargs="+", default=[0, 10, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ttft", type=float, default=0.02, help="가짜 모델 첫 토큰 지연(초)")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--output-tokens", type=int, default=200)
+    parser.add_argument("--only", nargs="+", help="일부 항목만 측정 (예: chatbot page)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (기본: 표준 출력)")
+    parser.add_argument("--baseline", help="비교할 기준값 JSON")
+    parser.add_argument("--save-baseline", help="이번 결과를 기준값으로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    model = FakeStreamingChatModel(
+        ttft=args.ttft, tokens_per_second=args.tokens_per_second, output_tokens=args.output_tokens
+    )
+    install_fake_llm(model)
+    attach_script_context({"session_id": "bench-session", "user_name": "벤치", "selected_points": []})
+
+    suites = {
+        "script_response": lambda: bench_script(args.repeat),
+        "chatbot_response": lambda: bench_chatbot(args.turns, args.repeat),
+        "kakao_response": lambda: bench_kakao(args.turns, args.repeat),
+        "random_cancel_info": lambda: bench_random_cancel_info(args.repeat),
+        "format_markdown": lambda: bench_format_markdown(args.turns, args.repeat),
+        "page_rerun": lambda: bench_page(args.turns, args.repeat),
+    }
+    selected = args.only or list(suites)
+    results = {}
+    for name in selected:
+        started = time.perf_counter()
+        results[name] = suites[name]()
+        print(f"⏱️ {name} 측정 완료 ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "turns": args.turns,
+            "repeat": args.repeat,
+            "fake_llm": {"ttft": args.ttft, "tokens_per_second": args.tokens_per_second,
+                         "output_tokens": args.output_tokens},
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    elif not args.baseline:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("fake_llm") != report["meta"]["fake_llm"]:
+            print("⚠️ 기준값과 가짜 모델 설정이 달라 비교 결과가 의미 없을 수 있습니다.")
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"❌ 기준값 대비 느려진 항목 {len(regressions)}개")
+            sys.exit(1)
+        print("✅ 기준값 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
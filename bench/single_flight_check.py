@@ -0,0 +1,106 @@
+"""동일 요청 합류(single-flight) 점검.
+
+가짜 모델로 더블 클릭(같은 요청 동시 2회)과 요청 중 rerun(첫 호출자가 스트림 도중 중단된 뒤
+같은 요청이 다시 들어옴)을 재현해, LLM 호출이 한 번만 일어나고 세션 히스토리에도 한 번만
+기록되는지, 합류 횟수가 집계되는지 확인합니다. 네트워크 없이 실행됩니다.
+
+    python bench/single_flight_check.py
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORK_DIR = tempfile.mkdtemp(prefix="stayon_flight_")
+os.environ.setdefault("OPENAI_API_KEY", "sk-check")
+os.environ["HISTORY_BACKEND"] = "memory"
+os.environ["RESPONSE_CACHE_PATH"] = os.path.join(WORK_DIR, "response_cache.db")
+os.environ["SCENARIO_POOL_PATH"] = os.path.join(WORK_DIR, "scenario_pool.json")
+os.environ["TELEMETRY_PORT"] = "0"
+os.environ["TELEMETRY_JSON_LOG"] = "0"
+
+import llm_prev
+from fake_llm import FakeStreamingChatModel, attach_script_context, install_fake_llm
+
+warnings.filterwarnings("ignore", category=PendingDeprecationWarning)
+
+SESSION = {"session_id": "flight-session", "user_name": "홍길동", "selected_points": []}
+SCRIPT_ARGS = ("김합류", "보험료 부담으로 해지 요청", "중")
+
+
+def concurrently(count, fn):
+    results = [None] * count
+
+    def run(i):
+        attach_script_context(SESSION)
+        results[i] = "".join(fn())
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def history_length(session_id):
+    return len(llm_prev.get_session_history(session_id).messages)
+
+
+def main():
+    model = FakeStreamingChatModel(ttft=0.2, tokens_per_second=500, output_tokens=100)
+    install_fake_llm(model)
+    attach_script_context(SESSION)
+    log = io.StringIO()
+
+    with contextlib.redirect_stdout(log):
+        # 1) 더블 클릭: 같은 스크립트 요청 두 번 → 호출 1회, 히스토리 1회 기록
+        results = concurrently(2, lambda: llm_prev.get_script_response(*SCRIPT_ARGS, regenerate=True))
+    assert results[0] == results[1] and results[0], "두 호출자가 같은 스크립트를 받지 못했습니다."
+    assert model.calls == 1, f"스크립트가 {model.calls}번 생성되었습니다."
+    assert history_length(SESSION["session_id"]) == 2, "히스토리에 스크립트 교환이 중복 기록되었습니다."
+    print(f"✅ 스크립트 더블 클릭     호출 {model.calls}회, 히스토리 {history_length(SESSION['session_id'])}개")
+
+    with contextlib.redirect_stdout(log):
+        # 2) 요청 중 rerun: 첫 호출자가 청크 하나만 받고 중단 → 다시 들어온 요청이 합류해 끝까지 받음
+        llm_prev.release_session(SESSION["session_id"])
+        first = llm_prev.get_script_response(*SCRIPT_ARGS, regenerate=True)
+        next(first)
+        first.close()
+        rerun_text = "".join(llm_prev.get_script_response(*SCRIPT_ARGS, regenerate=True))
+    assert model.calls == 2 and rerun_text == results[0], (model.calls, len(rerun_text))
+    assert history_length(SESSION["session_id"]) == 2
+    print(f"✅ 스크립트 요청 중 rerun  호출 {model.calls - 1}회, 중단 후 합류한 쪽이 전체 {len(rerun_text)}자 수신")
+
+    with contextlib.redirect_stdout(log):
+        # 3) 카카오톡 병렬(3유형)·통합 더블 클릭
+        script = results[0]
+        before = model.calls
+        parallel = concurrently(2, lambda: llm_prev.get_kakao_response(script, [], mode="parallel"))
+        parallel_calls = model.calls - before
+        combined = concurrently(2, lambda: llm_prev.get_kakao_response(script, [], mode="single"))
+        combined_calls = model.calls - before - parallel_calls
+    assert parallel[0] == parallel[1] and parallel_calls == 3, parallel_calls
+    assert combined[0] == combined[1] and combined_calls == 1, combined_calls
+    assert f"{SESSION['session_id']}_kakao" not in llm_prev.store, "카카오톡 생성이 세션 히스토리를 남겼습니다."
+    print(f"✅ 카카오톡 더블 클릭      병렬 호출 {parallel_calls}회(3유형), 통합 호출 {combined_calls}회")
+
+    with contextlib.redirect_stdout(log):
+        # 4) 완료 후 같은 요청은 합류 대신 응답 캐시, '새로 생성'은 새로 호출
+        before = model.calls
+        cached = "".join(llm_prev.get_kakao_response(script, [], mode="single"))
+        "".join(llm_prev.get_kakao_response(script, [], mode="single", regenerate=True))
+    assert cached == combined[0] and model.calls == before + 1, "완료된 요청이 다음 호출에 합류했습니다."
+
+    stats = llm_prev.get_single_flight_stats()
+    assert stats["coalesced"] == 4 and stats["inflight"] == 0, stats
+    print(f"✅ 합류 집계               {stats}")
+
+
+if __name__ == "__main__":
+    main()
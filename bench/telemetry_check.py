@@ -0,0 +1,145 @@
+"""LLM 호출 지표(telemetry) 점검.
+
+가짜 OpenAI chat.completions(스트림 마지막 청크에 usage 포함)를 실제 ChatOpenAI에 연결해
+스크립트·추가 질문·카카오톡(병렬/통합)·랜덤 상황·비동기 경로(다른 이벤트 루프 포함)·오류 경로를 한 번씩 호출하고,
+/metrics 엔드포인트의 진입점별 히스토그램/토큰/비용 지표와 호출별 JSON 로그 줄을 확인합니다.
+네트워크 없이 실행됩니다.
+
+    python bench/telemetry_check.py
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = _free_port()
+os.environ.setdefault("OPENAI_API_KEY", "sk-check")
+os.environ["HISTORY_BACKEND"] = "memory"
+os.environ["RESPONSE_CACHE_PATH"] = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".telemetry_cache.db")
+os.environ["SCENARIO_POOL_PATH"] = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".telemetry_pool.json")
+
+import httpx
+from langchain_community.chat_models import ChatOpenAI
+
+import llm_prev
+from telemetry import telemetry
+from llm_runtime import AsyncUsageRecordingCompletions, UsageRecordingCompletions, runtime, usage_recorder
+
+warnings.filterwarnings("ignore", category=PendingDeprecationWarning)
+
+USAGE = {"prompt_tokens": 1800, "completion_tokens": 40, "prompt_tokens_details": {"cached_tokens": 1536}}
+SCENARIOS = json.dumps([{"name": "김점검", "situation": "보험료 부담", "cancel_strength": "중", "reason_type": 6}],
+                       ensure_ascii=False)
+
+
+class FakeCompletions:
+    fail = False
+
+    def _content(self, kwargs):
+        return SCENARIOS if "JSON" in kwargs["messages"][0]["content"] else "안녕하세요 상담원님"
+
+    def create(self, **kwargs):
+        if self.fail:
+            raise RuntimeError("가짜 API 오류")
+        time.sleep(0.01)
+        content = self._content(kwargs)
+        if not kwargs.get("stream"):
+            return {"choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": USAGE}
+        return iter([
+            {"choices": [{"delta": {"content": content[:3]}}], "usage": None},
+            {"choices": [{"delta": {"content": content[3:]}, "finish_reason": "stop"}], "usage": None},
+            {"choices": [], "usage": USAGE},
+        ])
+
+
+class AsyncFakeCompletions(FakeCompletions):
+    async def create(self, **kwargs):
+        result = FakeCompletions.create(self, **kwargs)
+        if not kwargs.get("stream"):
+            return result
+
+        async def stream():
+            for chunk in result:
+                yield chunk
+        return stream()
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def main():
+    telemetry.serve(port=PORT)
+    fake, afake = FakeCompletions(), AsyncFakeCompletions()
+    model = ChatOpenAI(
+        model="gpt-4.1-mini",
+        client=UsageRecordingCompletions(fake, usage_recorder),
+        async_client=AsyncUsageRecordingCompletions(afake, usage_recorder),
+    )
+    llm_prev.get_llm = lambda *a, **k: model
+    for factory in (llm_prev.get_scenario_chain, llm_prev.get_script_chain, llm_prev.get_chatbot_chain,
+                    llm_prev.get_kakao_chain):
+        factory.cache_clear()
+
+    session = {"session_id": "check-session", "consultant_name": "홍길동", "selected_points": []}
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        list(runtime.iterate(llm_prev.aget_script_response("김점검", "해지 요청", "중", regenerate=True, **session)))
+        # 다른 이벤트 루프(asyncio.run)에서 받아도 runtime 루프에서 실행되고 같은 구간에 기록되는지
+        asyncio.run(collect(llm_prev.aget_chatbot_response("고객이 화를 내요", "스크립트", "check-session")))
+        list(runtime.iterate(llm_prev.aget_kakao_response("스크립트", [], mode="parallel", session_id="check-session")))
+        list(runtime.iterate(llm_prev.aget_kakao_response("스크립트", [], mode="single", session_id="check-session")))
+        llm_prev.generate_scenario_batch([(6, "중")])
+        fake.fail = afake.fail = True
+        list(runtime.iterate(llm_prev.aget_chatbot_response("오류 경로", "스크립트", "check-session")))
+
+    records = [json.loads(line) for line in log.getvalue().splitlines() if line.startswith('{"event": "llm_call"')]
+    by_entry = {(r["entry_point"], r["outcome"]): r for r in records}
+    for key in (("script", "ok"), ("chatbot", "ok"), ("kakao", "ok"), ("scenario_batch", "ok"), ("chatbot", "error")):
+        assert key in by_entry, f"JSON 로그에 {key} 호출이 없습니다: {list(by_entry)}"
+    kakao_parallel = [r for r in records if r["entry_point"] == "kakao"][0]
+    assert kakao_parallel["requests"] == 3 and kakao_parallel["prompt_tokens"] == 3 * 1800, kakao_parallel
+    assert by_entry[("script", "ok")]["session_id"] == "check-session"
+    assert by_entry[("chatbot", "ok")]["requests"] == 1, by_entry[("chatbot", "ok")]
+    assert by_entry[("script", "ok")]["cached_tokens"] == 1536 and by_entry[("script", "ok")]["cost_usd"] > 0
+    for record in records:
+        print(f"✅ {record['entry_point']:<15} {record['outcome']:<6} {record['wall_ms']:>7.1f}ms "
+              f"ttft={record['ttft_ms']} 요청 {record['requests']}건 토큰 {record['prompt_tokens']}"
+              f"/{record['cached_tokens']}/{record['completion_tokens']} ${record['cost_usd']}")
+
+    metrics = httpx.get(f"http://127.0.0.1:{PORT}/metrics").text
+    for needle in (
+        'stayon_llm_call_seconds_bucket{entry_point="chatbot",model="gpt-4.1-mini",outcome="ok",le="+Inf"} 1',
+        'stayon_llm_time_to_first_token_seconds_count{entry_point="script",model="gpt-4.1-mini"} 1',
+        'stayon_llm_request_seconds_count{entry_point="kakao",model="gpt-4.1-mini"} 4',
+        'stayon_llm_tokens_total{entry_point="kakao",model="gpt-4.1-mini",kind="cached"} 6144',
+        'stayon_llm_calls_total{entry_point="chatbot",model="gpt-4.1-mini",outcome="error"} 1',
+        "stayon_llm_cost_usd_total",
+    ):
+        assert needle in metrics, f"/metrics에 없음: {needle}"
+    print(f"✅ /metrics 노출 확인 ({len(metrics.splitlines())}줄)")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        for path in (os.environ["SCENARIO_POOL_PATH"], os.environ["RESPONSE_CACHE_PATH"]):
+            for suffix in ("", "-wal", "-shm"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path + suffix)
@@ -0,0 +1,89 @@
+"""대화 화면 rerun 비용 측정 (대화 길이별).
+
+before: rerun마다 모든 메시지를 말풍선 HTML + 마크다운으로 다시 보냄
+after : 스크립트 + 최근 TRANSCRIPT_RECENT_TURNS개 질문만 그리고, 이전 질문은 선택한 구간 하나만 펼침
+
+Streamlit 런타임 없이 화면에 보내는 요소 수와 본문 바이트(말풍선 HTML + 서식 처리된 내용)를 셉니다.
+
+    python bench/transcript_bench.py --turns 10 100 500 --open-group
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_format import ensure_rendered, make_message, split_transcript
+
+SAMPLE_AI = """📌 상담 요약:
+고객님은 보험료 부담으로 해지를 고민하고 계십니다.
+
+- **핵심 포인트**
+- 납입 유예 제도 안내
+
+**👉 보완 멘트 예시**
+> "고객님, 지금 해지하시면 그동안 납입하신 보험료 대비 환급금이 적어 손해가 클 수 있습니다."
+"""
+AVATAR = "app/static/ai_avatar.png?v=0123456789ab"
+
+
+def synthetic_session(turns):
+    messages = [make_message("ai", "▶️ 방어 스크립트\n" + SAMPLE_AI * 4)]
+    for i in range(turns):
+        messages.append(make_message("user", f"{i + 1}번째 질문입니다. 고객이 다시 해지를 요청해요."))
+        messages.append(make_message("ai", f"{SAMPLE_AI}\n📝 메모 {i + 1}: 추가 확인 필요"))
+    return messages
+
+
+def emit(messages):
+    # display_message와 같은 요소 구성: 사용자 1개, AI 3개(여는 HTML, 본문, 닫는 HTML)
+    elements = payload = 0
+    for message in messages:
+        content = ensure_rendered(message)
+        html = f'<div class="message-container {message["role"]}"><img src="{AVATAR}" class="avatar">'
+        elements += 1 if message["role"] == "user" else 3
+        payload += len((html + content + "</div></div>").encode("utf-8"))
+    return elements, payload
+
+
+def rerun_before(messages):
+    return emit(messages)
+
+
+def rerun_after(messages, open_group):
+    script, groups, recent = split_transcript(messages)
+    elements, payload = emit(script)
+    if groups:
+        elements += 1  # 구간 선택 위젯
+        if open_group:
+            e, p = emit(groups[0][2])
+            elements, payload = elements + e, payload + p
+    e, p = emit(recent)
+    return elements + e, payload + p
+
+
+def timed(fn, *args, reruns=200):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) / reruns * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대화 화면 before/after 비교")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--open-group", action="store_true", help="이전 구간 하나를 펼친 상태로 측정")
+    args = parser.parse_args()
+
+    print(f"{'질문 수':>6} | {'before 요소':>10} {'KB':>8} {'ms':>7} | {'after 요소':>10} {'KB':>8} {'ms':>7}")
+    for turns in args.turns:
+        messages = synthetic_session(turns)
+        (b_elements, b_payload), b_ms = timed(rerun_before, messages)
+        (a_elements, a_payload), a_ms = timed(rerun_after, messages, args.open_group)
+        print(f"{turns:>8} | {b_elements:>12} {b_payload / 1024:>8.1f} {b_ms:>7.3f} | "
+              f"{a_elements:>11} {a_payload / 1024:>8.1f} {a_ms:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,39 @@
 import streamlit as st
-from llm_prev import get_chatbot_response, get_script_response, get_kakao_response, get_random_cancel_info
-import re
-import os, json
+import os
+if os.getenv("LLM_GATEWAY_URL"):
+    # LLM 게이트웨이(llm_gateway.py)를 쓰면 화면은 얇은 클라이언트로만 동작 (모델·캐시·세션 히스토리는 게이트웨이에)
+    from gateway_client import get_chatbot_response, get_script_response, get_kakao_response, get_random_cancel_info
+    from gateway_client import release_session, restore_session_history
+else:
+    from llm_prev import get_chatbot_response, get_script_response, get_kakao_response, get_random_cancel_info
+    from llm_prev import release_session, restore_session_history
+    from telemetry import telemetry
+    # 이 프로세스가 LLM을 직접 호출하므로 지표 서버를 띄움 (프로세스당 한 번, TELEMETRY_PORT)
+    telemetry.serve()
 from datetime import datetime, timedelta, timezone
 import uuid
-from langchain_community.chat_message_histories import ChatMessageHistory
-from llm_prev import store
+from langchain_core.messages import AIMessage, HumanMessage
+from generation_jobs import FAILED, QUEUED, JobQueueFull, job_runner
+from history_catalog import HISTORY_PAGE_SIZE, get_history_manifest
+from conversation_log import CONVERSATION_LOG_SUFFIX, ConversationLog, load_conversation, meta_record, message_record
+from conversation_summary import new_summary, update_summary
+from message_format import ensure_rendered, make_message, render_markdown, split_transcript
+from ui_assets import build_asset_urls, page_icon_image
 
 # ----------------- 전역 변수 -------------------
 CHATBOT_TYPE = "prevent"
-URLS = {
-    "page_icon":"https://github.com/jssoleey/goodrich-chatbot-prevent/blob/main/image/logo.png?raw=true",
-    "top_image": "https://github.com/jssoleey/goodrich-chatbot-prevent/blob/main/image/top_box.png?raw=true",
-    "bottom_image": "https://github.com/jssoleey/goodrich-chatbot-prevent/blob/main/image/bottom_box.png?raw=true",
-    "logo": "https://github.com/jssoleey/goodrich-chatbot-prevent/blob/main/image/logo.png?raw=true",
-    "user_avatar": "https://github.com/jssoleey/goodrich-chatbot-prevent/blob/main/image/user_avatar.png?raw=true",
-    "ai_avatar": "https://github.com/jssoleey/goodrich-chatbot-prevent/blob/main/image/ai_avatar.png?raw=true"
-}
+# 상담원별 대화 기록 폴더의 상위 경로
+HISTORY_ROOT = os.getenv("HISTORY_ROOT", f"/data/{CHATBOT_TYPE}/history")
+# 화면 이미지는 번들된 image/에서 제공 (정적 서빙 + 장기 캐시 헤더, 불가하면 data URI)
+URLS = build_asset_urls(st.get_option("server.enableStaticServing"))
+# 백그라운드 생성 작업의 진행 상황을 다시 그리는 간격(초)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+JOB_LABELS = {"script": "방어 스크립트", "chatbot": "추가 질문 답변", "kakao": "카카오톡 문자"}
 
 # ----------------- config -------------------
 st.set_page_config( 
     page_title="스테이온(StayOn)",
-    page_icon=URLS["page_icon"]
+    page_icon=page_icon_image()
 )
 
 # ----------------- CSS -------------------
@@ -171,42 +183,6 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# ----------------- 마크다운 자동 정리 함수 -------------------
-def format_markdown(text: str) -> str:
-    lines = text.strip().splitlines()
-    formatted_lines = []
-    indent_next = False
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            formatted_lines.append("")
-            indent_next = False
-            continue
-
-        if re.match(r"^(▶️|✅|📌|❗|📝|📍)\s*[^:：]+[:：]?", line):
-            title = re.sub(r"[:：]\s*$", "", line.strip())
-            formatted_lines.append(f"**{title}**\n")
-            indent_next = False
-            continue
-
-        if re.match(r"^[-•]\s*\*\*.*\*\*", line):
-            formatted_lines.append(re.sub(r"^[-•]\s*", "- ", line))
-            indent_next = True
-            continue
-
-        if re.match(r"^[-•]\s*", line):
-            if indent_next:
-                formatted_lines.append("    " + re.sub(r"^[-•]\s*", "- ", line))
-            else:
-                formatted_lines.append(re.sub(r"^[-•]\s*", "- ", line))
-            continue
-
-        formatted_lines.append(line)
-        indent_next = False
-
-    return "\n".join(formatted_lines).strip() + "\n"
-
 # ----------------- 사이드바 설정 -------------------
 def render_sidebar():
     # 현재 날짜 표시
@@ -223,21 +199,34 @@ def render_sidebar():
 
     st.sidebar.markdown("<hr style='margin-top:20px; margin-bottom:34px;'>", unsafe_allow_html=True)
 
-    user_path = f"/data/{CHATBOT_TYPE}/history/{st.session_state['user_folder']}"
-    if not os.path.exists(user_path):
-        os.makedirs(user_path)
+    user_path = f"{HISTORY_ROOT}/{st.session_state['user_folder']}"
 
-    history_files = sorted(
-        os.listdir(user_path),
-        key=lambda x: x.split('_')[-1].replace('.json', ''),
-        reverse=True
-    )
+    # 폴더를 매번 읽지 않고, 폴더 mtime이 바뀌거나 저장/삭제가 있을 때만 갱신되는 목록 캐시에서 조회
+    manifest = get_history_manifest(st.session_state['user_folder'], user_path)
 
-    if history_files:
-        search_keyword = st.sidebar.text_input("🔎 고객명으로 검색", placeholder="고객명 입력 후 ENTER", key="search_input")        
-        filtered_files = [f for f in history_files if search_keyword.lower() in f.lower()]
+    if manifest.has_entries():
+        search_keyword = st.sidebar.text_input("🔎 고객명·상황·스크립트 검색", placeholder="검색어 입력 후 ENTER", key="search_input")
+        if st.session_state.get('history_keyword') != search_keyword:
+            st.session_state['history_keyword'] = search_keyword
+            st.session_state['history_page'] = 0
+        page = st.session_state.get('history_page', 0)
+        entries, has_next = manifest.page(search_keyword, page, HISTORY_PAGE_SIZE)
+        filtered_files = [entry['filename'] for entry in entries]
         selected_chat = st.sidebar.selectbox("📂 저장된 대화 기록", filtered_files)
 
+        if page > 0 or has_next:
+            prev_col, page_col, next_col = st.sidebar.columns([1, 1, 1])
+            with prev_col:
+                if st.button("◀ 이전", disabled=page == 0, use_container_width=True):
+                    st.session_state['history_page'] = page - 1
+                    st.experimental_rerun()
+            with page_col:
+                st.markdown(f"<div style='text-align:center; padding-top:6px;'>{page + 1} 페이지</div>", unsafe_allow_html=True)
+            with next_col:
+                if st.button("다음 ▶", disabled=not has_next, use_container_width=True):
+                    st.session_state['history_page'] = page + 1
+                    st.experimental_rerun()
+
         col1, col2 = st.sidebar.columns(2)
 
         with col1:
@@ -262,41 +251,56 @@ def render_sidebar():
     if st.sidebar.button("🆕 새로운 청철 상황 입력하기", use_container_width=True):
         reset_session_for_new_case()
 
+    render_job_status()
+
     if st.sidebar.button("로그아웃", use_container_width=True):
+        job_runner.discard(st.session_state.session_id)
+        release_session(st.session_state.session_id)
         st.session_state.page = "login"
-        st.session_state.message_list = []
+        set_message_list([])
         st.experimental_rerun()
 
 # ----------------- 대화 불러오기 -------------------        
 def load_chat_history(user_path, selected_chat):
-    with open(f"{user_path}/{selected_chat}", "r", encoding="utf-8") as f:
-        loaded_data = json.load(f)
-        if isinstance(loaded_data, list):
-            st.session_state['script_context'] = ""
-            st.session_state.message_list = loaded_data
-            st.session_state['customer_name'] = "고객명미입력"
-        elif isinstance(loaded_data, dict):
-            st.session_state['script_context'] = loaded_data.get("script_context", "")
-            st.session_state.message_list = loaded_data.get("message_list", [])
-            st.session_state['customer_name'] = loaded_data.get("customer_name", selected_chat.split('_')[0])
-            st.session_state['cancel_strength'] = loaded_data.get("cancel_strength", "")
-            st.session_state['customer_situation'] = loaded_data.get("customer_situation", "")
-            st.session_state['selected_points'] = loaded_data.get("selected_points", [])
-        else:
-            st.error("❌ 불러온 파일 형식이 잘못되었습니다.")
-            st.stop()
+    # .jsonl 대화 로그는 처음부터 재생해 복원하고, 예전 .json 스냅샷도 그대로 읽음
+    loaded_data = load_conversation(f"{user_path}/{selected_chat}")
+    if isinstance(loaded_data, list):
+        st.session_state['script_context'] = ""
+        set_message_list(loaded_data)
+        st.session_state['customer_name'] = "고객명미입력"
+    elif isinstance(loaded_data, dict):
+        st.session_state['script_context'] = loaded_data.get("script_context", "")
+        # 저장된 요약 줄이 있으면 그대로 쓰고, 예전 로그는 불러올 때 한 번만 요약
+        set_message_list(loaded_data.get("message_list", []))
+        st.session_state['customer_name'] = loaded_data.get("customer_name") or selected_chat.split('_')[0]
+        st.session_state['cancel_strength'] = loaded_data.get("cancel_strength", "")
+        st.session_state['customer_situation'] = loaded_data.get("customer_situation", "")
+        st.session_state['selected_points'] = loaded_data.get("selected_points", [])
+    else:
+        st.error("❌ 불러온 파일 형식이 잘못되었습니다.")
+        st.stop()
 
-    # ⭐ chat_history 복원
-    chat_history = ChatMessageHistory()
+    # 이전 대화에 걸려 있던 생성 작업은 불러온 대화에 섞이지 않도록 버림
+    job_runner.discard(st.session_state.session_id)
+
+    # ⭐ chat_history 복원 (설정된 히스토리 백엔드에 한 번에 기록)
+    restored_messages = []
     for msg in st.session_state.message_list:
         if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
+            # 화면용 서식은 불러올 때 한 번만 (같은 내용은 해시 캐시 재사용)
+            ensure_rendered(msg)
             if msg['role'] == 'user':
-                chat_history.add_user_message(msg['content'])
+                restored_messages.append(HumanMessage(content=msg['content']))
             elif msg['role'] == 'ai':
-                chat_history.add_ai_message(msg['content'])
-    store[st.session_state.session_id] = chat_history
+                restored_messages.append(AIMessage(content=msg['content']))
+    restore_session_history(st.session_state.session_id, restored_messages)
 
     st.session_state['current_file'] = selected_chat
+    st.session_state['persisted_count'] = len(st.session_state.message_list)
+    st.session_state['persisted_meta'] = meta_record(loaded_data) if isinstance(loaded_data, dict) else None
+    if isinstance(loaded_data, dict) and loaded_data.get("needs_compaction"):
+        # 잘린 줄이나 중복 meta가 있던 로그는 불러온 김에 정리
+        autosave_conversation(compact=True)
     st.session_state.page = "chatbot"
     st.experimental_rerun()
     
@@ -306,6 +310,10 @@ def delete_chat_history(user_path, selected_chat):
     if os.path.exists(file_path):
         try:
             os.remove(file_path)
+            get_history_manifest(st.session_state['user_folder'], user_path).record_deleted(selected_chat)
+            if st.session_state.get('current_file') == selected_chat:
+                # 보고 있던 대화를 지웠다면 다음 자동 저장은 새 파일로 기록
+                st.session_state['current_file'] = ""
             st.sidebar.success(f"{selected_chat} 삭제 완료!")
             st.experimental_rerun()
         except Exception as e:
@@ -313,10 +321,91 @@ def delete_chat_history(user_path, selected_chat):
     else:
         st.sidebar.warning("이미 삭제된 파일입니다.")
 
+# ----------------- 대화 목록/요약 -------------------
+def set_message_list(messages):
+    # 대화를 통째로 바꿀 때는 카카오톡용 대화 요약도 새로 만듦
+    st.session_state.message_list = messages
+    st.session_state['conversation_summary'] = new_summary()
+    update_summary(st.session_state['conversation_summary'], messages)
+
+
+def append_message(role, content):
+    # 메시지를 추가하면서 요약에는 그 메시지만 덧붙임 (대화 길이와 무관)
+    st.session_state.message_list.append(make_message(role, content))
+    return current_conversation_summary()
+
+
+def current_conversation_summary():
+    # 턴마다 누적한 대화 요약 (반영 안 된 메시지가 있으면 그만큼만 추가)
+    if 'conversation_summary' not in st.session_state:
+        st.session_state['conversation_summary'] = new_summary()
+    return update_summary(st.session_state['conversation_summary'], st.session_state.message_list)
+
+# ----------------- 대화 자동 저장 -------------------
+def autosave_conversation(compact=False):
+    # 매 턴마다 새 메시지만 대화 로그(.jsonl)에 이어 쓰고 사이드바 카탈로그를 갱신
+    messages = st.session_state.get('message_list') or []
+    if not messages:
+        return None
+
+    user_path = f"{HISTORY_ROOT}/{st.session_state['user_folder']}"
+    if not os.path.exists(user_path):
+        os.makedirs(user_path)
+
+    KST = timezone(timedelta(hours=9))
+    saved_at = datetime.now(KST).strftime('%y%m%d-%H%M%S')
+    customer_name = st.session_state.get('customer_name') or '고객명미입력'
+    data = {
+        "customer_name": customer_name,
+        "cancel_strength": st.session_state.get('cancel_strength', ''),
+        "customer_situation": st.session_state.get('customer_situation', ''),
+        "script_context": st.session_state.get('script_context', ''),
+        "selected_points": st.session_state.get('selected_points') or [],
+        "message_list": messages,
+    }
+    meta = meta_record(data)
+    current_file = st.session_state.get('current_file') or ""
+    persisted_count = st.session_state.get('persisted_count', 0)
+    manifest = get_history_manifest(st.session_state['user_folder'], user_path)
+
+    try:
+        if (
+            not compact
+            and current_file.endswith(CONVERSATION_LOG_SUFFIX)
+            and os.path.exists(f"{user_path}/{current_file}")
+            and persisted_count <= len(messages)
+        ):
+            records = [] if meta == st.session_state.get('persisted_meta') else [meta]
+            records.extend(message_record(message) for message in messages[persisted_count:])
+            ConversationLog(f"{user_path}/{current_file}").append(records)
+            replaced = None
+        else:
+            # 새 대화, 예전 형식(.json) 파일, 수동 저장은 전체를 임시 파일에 쓴 뒤 원자적으로 교체
+            filename = (
+                current_file if current_file.endswith(CONVERSATION_LOG_SUFFIX)
+                else f"{customer_name}_{saved_at}{CONVERSATION_LOG_SUFFIX}"
+            )
+            ConversationLog(f"{user_path}/{filename}").compact(data)
+            replaced = current_file
+            if current_file and current_file != filename:
+                # 예전 형식 파일은 새 로그가 완성된 뒤에 정리
+                if os.path.exists(f"{user_path}/{current_file}"):
+                    os.remove(f"{user_path}/{current_file}")
+            current_file = filename
+            st.session_state['current_file'] = filename
+
+        st.session_state['persisted_count'] = len(messages)
+        st.session_state['persisted_meta'] = meta
+        manifest.record_saved(current_file, data, saved_at=saved_at, replaced=replaced)
+        return current_file
+    except Exception as e:
+        print("🔥 대화 자동 저장 실패:", e)
+        return None
+
 # ----------------- 세션 초기화 -------------------        
 def reset_session_for_new_case():
     st.session_state.page = "input"
-    st.session_state.message_list = []
+    set_message_list([])
     st.session_state.script_context = ""
     st.session_state.kakao_text = ""
     st.session_state['current_file'] = ""
@@ -328,7 +417,8 @@ def reset_session_for_new_case():
     st.session_state['customer_situation_input'] = ''
     st.session_state['cancel_strength_input'] = '중 (고민 중)'  # 기본값
     
-    store[st.session_state.session_id] = ChatMessageHistory()
+    job_runner.discard(st.session_state.session_id)
+    release_session(st.session_state.session_id)
     st.experimental_rerun()
     
 # ----------------- 메시지 표시 함수 -------------------
@@ -355,9 +445,151 @@ def display_message(role, content, avatar_url):
             <div class="{message_class}">
         """
         st.markdown(display_html, unsafe_allow_html=True)
-        st.markdown(format_markdown(content), unsafe_allow_html=False)
+        # AI 메시지는 이미 서식 처리된(rendered) 내용을 받음
+        st.markdown(content, unsafe_allow_html=False)
         st.markdown("</div></div>", unsafe_allow_html=True)
-        
+
+# ----------------- 대화 목록 표시 함수 -------------------
+def render_messages(messages, user_avatar, ai_avatar):
+    for message in messages:
+        if isinstance(message, dict) and "role" in message and "content" in message:
+            role = message["role"]
+            content = ensure_rendered(message)
+            avatar = user_avatar if role == "user" else ai_avatar
+            display_message(role, content, avatar)
+        else:
+            st.warning("⚠️ 불러온 메시지 형식이 잘못되었습니다.")
+
+
+def render_transcript(messages, user_avatar, ai_avatar):
+    # 스크립트와 최근 질문만 매번 그리고, 이전 질문은 선택한 구간 하나만 펼침
+    # (대화 길이와 무관하게 rerun마다 보내는 메시지 수가 일정)
+    script, groups, recent = split_transcript(messages)
+    render_messages(script, user_avatar, ai_avatar)
+
+    if groups:
+        labels = ["접어 두기"] + [f"{start}~{end}번째 질문" for start, end, _ in groups]
+        # 다른 대화를 불러와 구간이 사라졌다면 선택을 초기화 (위젯 생성 전이라 변경 가능)
+        if st.session_state.get("transcript_open_group") not in labels:
+            st.session_state.pop("transcript_open_group", None)
+        selected = st.selectbox(
+            f"🗂️ 이전 질문 {groups[-1][1]}개는 접어 두었습니다. 펼쳐 볼 구간을 선택하세요.",
+            labels,
+            key="transcript_open_group"
+        )
+        if selected != labels[0]:
+            render_messages(groups[labels.index(selected) - 1][2], user_avatar, ai_avatar)
+            st.divider()
+
+    render_messages(recent, user_avatar, ai_avatar)
+
+# ----------------- 스트리밍 메시지 표시 함수 -------------------
+def display_streaming_message(chunks, avatar_url):
+    # AI 말풍선을 먼저 그린 뒤, 도착하는 청크를 같은 자리에 이어서 출력
+    avatar_html = f'<img src="{avatar_url}" class="avatar">'
+    display_html = f"""
+    <div class="message-container ai">
+        {avatar_html}
+        <div class="ai-message">
+    """
+    st.markdown(display_html, unsafe_allow_html=True)
+    placeholder = st.empty()
+
+    full_text = ""
+    for chunk in chunks:
+        full_text += chunk
+        placeholder.markdown(full_text + "▌", unsafe_allow_html=False)
+
+    # 스트림 종료 후 최종 서식으로 교체 (결과는 캐시되어 메시지 저장 시 재사용)
+    placeholder.markdown(render_markdown(full_text), unsafe_allow_html=False)
+    st.markdown("</div></div>", unsafe_allow_html=True)
+    return full_text
+
+# ----------------- 백그라운드 생성 작업 -------------------
+def submit_job(kind, produce, **payload):
+    # 생성은 작업 스레드에서 실행되므로 생성 중 rerun이 일어나도 결과가 남음
+    try:
+        job_runner.submit(st.session_state.session_id, kind, produce, **payload)
+        return True
+    except JobQueueFull as e:
+        print("⏳ 작업 대기열 초과:", e)
+        st.warning("⏳ 지금은 요청이 많아 바로 처리할 수 없습니다. 잠시 후 다시 시도해 주세요.")
+        return False
+
+
+def submit_kakao_job(regenerate=False):
+    # 생성은 작업 스레드에서, 출력은 문자 영역에서 실시간으로
+    # 대화 요약은 턴마다 누적해 두었으므로 대화 전체를 다시 훑지 않음
+    script_context = st.session_state['script_context']
+    conversation_summary = current_conversation_summary()
+    session_id = st.session_state.session_id
+    if submit_job("kakao", lambda: get_kakao_response(
+        script_context=script_context, conversation_summary=conversation_summary,
+        session_id=session_id, regenerate=regenerate,
+    )):
+        st.experimental_rerun()
+
+
+def job_status_text(job):
+    label = JOB_LABELS.get(job.kind, job.kind)
+    if job.status == QUEUED:
+        return f"⏳ {label} 대기 중 (앞에 {job_runner.position(job)}건)"
+    return f"✍️ {label} 생성 중... {job.elapsed():.1f}초"
+
+
+def follow_job(job):
+    # 작업이 끝날 때까지 새로 도착한 텍스트를 청크로 내보냄 (rerun 후 다시 호출하면 처음부터 이어 봄)
+    # 기다리는 동안 상태 문구를 갱신하므로, 그 사이 위젯을 누르면 바로 rerun으로 넘어감
+    status = st.empty()
+    sent, seen = 0, -1
+    while True:
+        text, seen, finished = job.wait(seen, JOB_POLL_INTERVAL)
+        if len(text) > sent:
+            yield text[sent:]
+            sent = len(text)
+        if finished:
+            break
+        status.caption(job_status_text(job))
+    status.empty()
+
+
+def deliver_finished_jobs():
+    # 끝난 작업 결과를 요청 순서대로 세션 상태에 한 번만 반영 (요청 뒤 rerun이 있었어도 여기서 받음)
+    for job in job_runner.jobs(st.session_state.session_id):
+        if not job.finished:
+            break
+        if not job_runner.take(job):
+            continue
+        if job.status == FAILED:
+            st.error(f"🔥 {JOB_LABELS.get(job.kind, job.kind)} 생성 중 오류가 발생했습니다. 콘솔 로그를 확인해 주세요.")
+            continue
+        text = job.text
+        if job.kind == "script":
+            st.session_state['script_context'] = text
+            set_message_list([make_message("ai", text)])
+            st.session_state['persisted_count'] = 0
+            autosave_conversation()
+            st.session_state.page = "chatbot"
+        elif job.kind == "chatbot":
+            # 질문은 답변이 끝났을 때 함께 추가 (실패하면 답 없는 질문이 대화·로그에 남지 않음)
+            append_message("user", job.payload["question"])
+            append_message("ai", text)
+            # 질문/답변 한 쌍을 대화 로그에 바로 추가
+            autosave_conversation()
+        elif job.kind == "kakao":
+            st.session_state['kakao_text'] = text
+            st.session_state['kakao_notice'] = True
+
+
+def render_job_status():
+    # 사이드바에 이 세션의 진행 중인 생성 작업 표시
+    jobs = job_runner.active(st.session_state.session_id)
+    if jobs:
+        st.sidebar.markdown("**🧵 진행 중인 작업**")
+        for job in jobs:
+            st.sidebar.caption(job_status_text(job))
+
+
 # ----------------- 고객 정보 요약 함수 -------------------
 def render_customer_info():
     customer_name = st.session_state.get('customer_name', '고객명미입력')
@@ -413,6 +645,7 @@ def initialize_session():
     defaults = {
         'page': 'login',
         'message_list': [],
+        'conversation_summary': new_summary(),
         'sidebar_mode': 'default'
     }
     for key, value in defaults.items():
@@ -422,6 +655,10 @@ def initialize_session():
 # 호출
 initialize_session()
 
+# 이전 실행 이후 끝난 생성 작업 결과 반영
+if st.session_state.get('session_id'):
+    deliver_finished_jobs()
+
 # ----------------- 로그인 화면 -------------------
 if st.session_state.page == "login":
     name = st.text_input(label = "ID", placeholder="이름(홍길동)")
@@ -484,7 +721,9 @@ if st.session_state.page == "input":
         ],
         default=[],
     )
+    regenerate = st.checkbox("🔄 저장된 스크립트를 사용하지 않고 새로 생성하기", value=False)
     st.caption("")
+    script_jobs = job_runner.active(st.session_state.session_id, "script")
 
     # 버튼
     col1, col2 = st.columns([1, 1])
@@ -493,20 +732,20 @@ if st.session_state.page == "input":
         if st.button("🎲 랜덤 청철 상황 생성하기", use_container_width=True):
             with st.spinner("랜덤 청철 상황 생성 중입니다..."):
                 random_info = get_random_cancel_info()
-                st.session_state['customer_name_input'] = random_info['name']
-                st.session_state['customer_situation_input'] = random_info['situation']
+                st.session_state['customer_name_input'] = random_info.get('name', '')
+                st.session_state['customer_situation_input'] = random_info.get('situation', '')
                 # 해지 강도는 세션에 "하 (설득 여지 있음)" 같은 형식으로 저장
                 strength_map = {
                     "하": "하 (설득 여지 있음)",
                     "중": "중 (고민 중)",
                     "상": "상 (매우 완고)"
                 }
-                st.session_state['cancel_strength_input'] = strength_map.get(random_info['cancel_strength'], "중 (고민 중)")
+                st.session_state['cancel_strength_input'] = strength_map.get(random_info.get('cancel_strength'), "중 (고민 중)")
                 
             st.experimental_rerun()
                 
     with col2:
-        if st.button("🚀 방어 스크립트 생성하기", use_container_width=True):
+        if st.button("🚀 방어 스크립트 생성하기", use_container_width=True, disabled=bool(script_jobs)):
             if name and situation:
                 # 1️⃣ 세션 저장
                 st.session_state['customer_name'] = name
@@ -518,22 +757,25 @@ if st.session_state.page == "input":
                 st.session_state.kakao_text = ""
                 st.session_state['current_file'] = ""
 
-                # 3️⃣ 방어 스크립트 생성
-                with st.spinner("청약 철회/해지 방어 스크립트를 생성 중입니다..."):
-                    ai_response = get_script_response(name, situation, cancel_strength)
-                    script_text = "".join(ai_response)
-
-                    # 4️⃣ 생성된 스크립트를 세션에 저장
-                    st.session_state['script_context'] = script_text
-                    st.session_state.message_list = []
-                    st.session_state.message_list.append({"role": "ai", "content": script_text})
-
-                # 5️⃣ 페이지 전환: 챗봇 화면
-                st.session_state.page = "chatbot"
-                st.experimental_rerun()
+                # 3️⃣ 방어 스크립트 생성 작업 등록 (세션 값은 여기서 읽어 작업에 넘김)
+                session_values = {
+                    "session_id": st.session_state.session_id,
+                    "consultant_name": st.session_state.get('user_name', '상담원'),
+                    "selected_points": selected_points,
+                }
+                if submit_job("script", lambda: get_script_response(
+                    name, situation, cancel_strength, regenerate=regenerate, **session_values
+                )):
+                    st.experimental_rerun()
             else:
                 st.warning("고객 이름과 해지 요청 내용을 모두 입력해 주세요.")
 
+    # 4️⃣ 생성 중인 스크립트를 토큰 단위로 출력, 끝나면 결과를 세션에 반영하고 챗봇 화면으로 전환
+    if script_jobs:
+        for job in script_jobs:
+            display_streaming_message(follow_job(job), URLS["ai_avatar"])
+        st.experimental_rerun()
+
 # ----------------- 챗봇 화면 -------------------
 elif st.session_state.page == "chatbot":
         
@@ -549,92 +791,70 @@ elif st.session_state.page == "chatbot":
     messages = st.session_state.get("message_list", [])
 
     if isinstance(messages, list):
-        for message in messages:
-            if isinstance(message, dict) and "role" in message and "content" in message:
-                role = message["role"]
-                content = message["content"]
-                avatar = user_avatar if role == "user" else ai_avatar
-                display_message(role, content, avatar)
-            else:
-                st.warning("⚠️ 불러온 메시지 형식이 잘못되었습니다.")
+        render_transcript(messages, user_avatar, ai_avatar)
     else:
         st.error("❌ 메시지 리스트가 손상되었습니다. 다시 불러와 주세요.")
 
-    if user_question := st.chat_input("청철 상담 관련 질문을 자유롭게 입력해 주세요."):
-        st.session_state.message_list.append({"role": "user", "content": user_question})
-        display_message("user", user_question, user_avatar)
+    # 답변이 생성되는 동안에는 질문 순서가 섞이지 않도록 입력을 잠시 막음
+    answer_jobs = job_runner.active(st.session_state.session_id, "chatbot")
+    if user_question := st.chat_input("청철 상담 관련 질문을 자유롭게 입력해 주세요.", disabled=bool(answer_jobs)):
+        script_context = st.session_state['script_context']
+        session_id = st.session_state.session_id
+        if submit_job("chatbot", lambda: get_chatbot_response(user_question, script_context, session_id),
+                      question=user_question):
+            st.experimental_rerun()
 
-        with st.spinner("답변을 준비 중입니다..."):
-            ai_response = get_chatbot_response(user_question, st.session_state['script_context'])
-            formatted_response = format_markdown("".join(ai_response))
-            st.session_state.message_list.append({"role": "ai", "content": formatted_response})
-            display_message("ai", formatted_response, ai_avatar)
+    # 답변 중인 질문과 생성 중인 답변을 이어서 출력, 끝나면 둘 다 대화에 추가
+    if answer_jobs:
+        for job in answer_jobs:
+            render_messages([make_message("user", job.payload["question"])], user_avatar, ai_avatar)
+            display_streaming_message(follow_job(job), ai_avatar)
+        st.experimental_rerun()
 
     # 👉 버튼 영역: 두 개의 버튼을 나란히 배치
     col1, col2 = st.columns([1, 1])
+    kakao_jobs = job_runner.active(st.session_state.session_id, "kakao")
     
     with col1:                
-        if st.button("💬 카카오톡 발송용 문자 생성하기", use_container_width=True):
+        if st.button("💬 카카오톡 발송용 문자 생성하기", use_container_width=True, disabled=bool(kakao_jobs)):
             if not st.session_state.get('script_context'):
                 st.warning("⚠️ 상담 스크립트가 없습니다. 먼저 스크립트를 생성해 주세요.")
             else:
-                with st.spinner("카카오톡 문자를 생성 중입니다..."):
-                    kakao_message = get_kakao_response(
-                        script_context = st.session_state['script_context'],
-                        message_list = st.session_state['message_list']
-                    )
-                    st.session_state['kakao_text'] = "".join(kakao_message)
-                    
-            # ✅ 안내 문구 출력
-            st.info("✅ 카카오톡 문자가 생성되었습니다! 계속해서 추가 질문을 이어가실 수 있습니다.")
+                # 대화가 그대로면 저장된 문자를 바로 표시
+                submit_kakao_job()
                             
     with col2:
         if st.button("💾 대화 저장하기", use_container_width=True):
-            user_path = f"/data/{CHATBOT_TYPE}/history/{st.session_state['user_folder']}"
-            if not os.path.exists(user_path):
-                os.makedirs(user_path)
             if st.session_state.message_list:
-                # 1️⃣ 고객 이름 확보
-                customer_name = st.session_state.get('customer_name', '고객명미입력')
-
-                # 2️⃣ 기존 파일명 여부 확인
-                if st.session_state.get('current_file'):
-                    # 기존 파일명에서 고객 이름 유지, 시간만 갱신
-                    KST = timezone(timedelta(hours=9))
-                    new_filename = f"{customer_name}_{datetime.now(KST).strftime('%y%m%d-%H%M%S')}.json"
-                    
-                    # 기존 파일 삭제 (덮어쓰기 효과)
-                    old_file = f"{user_path}/{st.session_state['current_file']}"
-                    if os.path.exists(old_file):
-                        os.remove(old_file)
+                # 대화는 매 턴 자동 저장되므로, 수동 저장은 로그를 한 파일로 원자적으로 압축
+                saved_file = autosave_conversation(compact=True)
+                if saved_file:
+                    st.success(f"대화가 저장되었습니다! ({saved_file})")
                 else:
-                    # 새로운 저장이라면
-                    KST = timezone(timedelta(hours=9))
-                    new_filename = f"{customer_name}_{datetime.now(KST).strftime('%y%m%d-%H%M%S')}.json"
-
-                # 3️⃣ 데이터 저장
-                data_to_save = {
-                    "customer_name": customer_name,
-                    "cancel_strength": st.session_state.get('cancel_strength', ''),
-                    "customer_situation": st.session_state.get('customer_situation', ''),
-                    "script_context": st.session_state.get('script_context', ''),
-                    "message_list": st.session_state.message_list
-                }
-
-                with open(f"{user_path}/{new_filename}", "w", encoding="utf-8") as f:
-                    json.dump(data_to_save, f, ensure_ascii=False, indent=4)
-
-                # 4️⃣ 파일명 업데이트
-                st.session_state['current_file'] = new_filename
-
-                st.success(f"대화가 저장되었습니다! ({new_filename})")
+                    st.error("❌ 대화 저장 중 오류가 발생했습니다. 콘솔 로그를 확인해 주세요.")
             else:
                 st.warning("저장할 대화가 없습니다.")
     
     # 👉 생성된 카카오톡 문자 출력 (있을 때만 표시)
-    if st.session_state.get('kakao_text'):
+    if st.session_state.get('kakao_text') or kakao_jobs:
         st.markdown("### 📩 카카오톡 발송용 문자")
-        st.text_area("아래 내용을 수정 또는 복사해 사용하세요.", value=st.session_state['kakao_text'], height=400)
+        kakao_area = st.empty()
+
+        if kakao_jobs:
+            for job in kakao_jobs:
+                kakao_text = ""
+                for chunk in follow_job(job):
+                    kakao_text += chunk
+                    kakao_area.text(kakao_text)
+            st.experimental_rerun()
+
+        if st.session_state.pop('kakao_notice', False):
+            # ✅ 안내 문구 출력 (생성 직후 한 번)
+            st.info("✅ 카카오톡 문자가 생성되었습니다! 계속해서 추가 질문을 이어가실 수 있습니다.")
+
+        kakao_area.text_area("아래 내용을 수정 또는 복사해 사용하세요.", value=st.session_state['kakao_text'], height=400)
+        if st.button("🔄 새로 생성", help="저장된 문자를 사용하지 않고 다시 작성합니다.", disabled=bool(kakao_jobs)):
+            submit_kakao_job(regenerate=True)
         
 # 이미지 URL
 bottom_image_url = URLS["bottom_image"]
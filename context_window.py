@@ -0,0 +1,127 @@
+import os
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from conversation_summary import extract_suggestions
+
+# ======================== 설정 ========================
+# 추가 질문 1회에 LLM으로 보내는 프롬프트 전체의 토큰 예산
+CHATBOT_CONTEXT_BUDGET = int(os.getenv("CHATBOT_CONTEXT_BUDGET", "6000"))
+# 요약하지 않고 원문 그대로 유지할 최근 대화(질문+답변) 수
+CHATBOT_RECENT_TURNS = int(os.getenv("CHATBOT_RECENT_TURNS", "4"))
+SUMMARY_QUOTE_CHARS = 200
+
+# tiktoken이 설치되어 있으면 정확히 세고, 없으면 문자 수 기반 근사치를 사용
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    # 한글 등 비 ASCII 문자는 약 1자 1토큰, ASCII는 약 4자 1토큰
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + ascii_chars // 4 + 1
+
+
+def count_message_tokens(messages) -> int:
+    # 메시지마다 역할/구분자 오버헤드(약 4토큰)를 더함
+    return sum(count_tokens(message.content) + 4 for message in messages)
+
+
+# ======================== 대화 요약 ========================
+def summarize_turn(question: str, answer: str) -> list:
+    # 오래된 대화는 상담원 질문과 제안 멘트(> 인용문)만 남겨 한두 줄로 접음
+    lines = [f"- 상담원 질문: {question.strip()}"]
+    suggestions = extract_suggestions(answer)
+    if suggestions:
+        lines.append(f"  - 제안 멘트: {suggestions[0][:SUMMARY_QUOTE_CHARS]}")
+    return lines
+
+
+def split_turns(messages, script_context=""):
+    # 스크립트 생성 대화(고객 정보 + 스크립트)는 시스템 영역에 한 번만 넣으므로 제외
+    script = script_context.strip()
+    turns = []
+    pending = None
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            pending = message
+        elif isinstance(message, AIMessage):
+            if script and message.content.strip() == script:
+                pending = None
+                continue
+            turns.append((pending, message))
+            pending = None
+    return turns
+
+
+# ======================== 컨텍스트 윈도우 ========================
+class ContextWindow:
+    """토큰 예산 안에서 최근 대화는 원문, 오래된 대화는 요약으로 구성하는 컨텍스트 관리자."""
+
+    def __init__(self, budget=CHATBOT_CONTEXT_BUDGET, recent_turns=CHATBOT_RECENT_TURNS):
+        self.budget = budget
+        self.recent_turns = recent_turns
+
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "last_prompt_tokens": 0, "total_prompt_tokens": 0, "folded_turns": 0}
+
+    def build(self, system_prompt: str, script_context: str, question: str, history_messages):
+        turns = split_turns(history_messages, script_context)
+        fixed_tokens = count_tokens(system_prompt) + count_tokens(script_context) + count_tokens(question) + 12
+        remaining = self.budget - fixed_tokens
+
+        # 최신 대화부터 예산과 개수 제한 안에서 원문 유지
+        kept = []
+        for question_message, answer_message in reversed(turns):
+            if len(kept) >= self.recent_turns:
+                break
+            pair = [m for m in (question_message, answer_message) if m is not None]
+            cost = count_message_tokens(pair)
+            if cost > remaining:
+                break
+            kept.insert(0, pair)
+            remaining -= cost
+
+        # 나머지는 요약으로 접고, 예산을 넘으면 가장 오래된 요약부터 제외
+        folded = turns[:len(turns) - len(kept)]
+        summary_lines = []
+        for question_message, answer_message in folded:
+            summary_lines.extend(summarize_turn(
+                question_message.content if question_message is not None else "",
+                answer_message.content,
+            ))
+        while summary_lines and count_tokens("\n".join(summary_lines)) > remaining:
+            summary_lines.pop(0)
+        conversation_summary = "\n".join(summary_lines)
+
+        chat_history = [message for pair in kept for message in pair]
+        prompt_tokens = (
+            fixed_tokens
+            + count_message_tokens(chat_history)
+            + count_tokens(conversation_summary)
+        )
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["last_prompt_tokens"] = prompt_tokens
+            self._stats["total_prompt_tokens"] += prompt_tokens
+            self._stats["folded_turns"] += len(folded)
+
+        return {
+            "chat_history": chat_history,
+            "conversation_summary": conversation_summary or "(없음)",
+            "prompt_tokens": prompt_tokens,
+            "kept_turns": len(kept),
+            "folded_turns": len(folded),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
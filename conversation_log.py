@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+
+# ======================== 설정 ========================
+CONVERSATION_LOG_SUFFIX = ".jsonl"
+META_FIELDS = ("customer_name", "cancel_strength", "customer_situation", "script_context", "selected_points")
+
+
+# 파일 경로별 잠금: 호출할 때마다 ConversationLog를 새로 만들어도 같은 파일의 append와 compact(교체)가 겹치지 않게 함
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+
+def _lock_for(path):
+    # 프로세스 안에서만 직렬화 (같은 대화 파일을 여러 프로세스가 동시에 쓰지는 않는다고 가정)
+    key = os.path.abspath(path)
+    with _path_locks_lock:
+        lock = _path_locks.get(key)
+        if lock is None:
+            lock = _path_locks[key] = threading.Lock()
+        return lock
+
+
+def _fsync_directory(directory):
+    # 새 파일 생성/교체가 디렉터리 항목까지 디스크에 반영되도록 함 (지원하지 않는 파일시스템은 무시)
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def meta_record(data) -> dict:
+    return {"type": "meta", **{field: data.get(field, [] if field == "selected_points" else "") for field in META_FIELDS}}
+
+
+def message_record(message) -> dict:
+    record = {"type": "message", "role": message["role"], "content": message["content"]}
+    if "summary" in message:
+        # 카카오톡용 대화 요약 줄도 함께 저장해 불러올 때 다시 추출하지 않음
+        record["summary"] = message["summary"]
+    return record
+
+
+# ======================== 대화 로그 ========================
+class ConversationLog:
+    """대화 한 건을 JSONL로 기록하는 추가 전용(append-only) 로그.
+
+    한 줄이 하나의 레코드이며, meta 레코드(고객 정보/스크립트)는 마지막 값이 유효하고
+    message 레코드는 순서대로 대화를 구성합니다 (summary가 있으면 그 메시지의 요약 줄).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = _lock_for(path)
+
+    def append(self, records) -> None:
+        # 새 레코드만 한 번에 이어 쓰고 fsync (대화 길이와 무관한 비용)
+        if not records:
+            return
+        payload = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+        with self._lock:
+            created = not os.path.exists(self.path)
+            with open(self.path, "a+b") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    # 이전 기록이 중간에 잘렸다면 새 레코드가 그 줄에 붙지 않도록 줄을 바꿈
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        payload = b"\n" + payload
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            if created:
+                _fsync_directory(os.path.dirname(self.path))
+
+    def compact(self, data) -> None:
+        # 최신 meta 1건 + 메시지 전체로 다시 쓴 임시 파일을 원자적으로 교체
+        records = [meta_record(data)] + [message_record(m) for m in data.get("message_list", [])]
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            _fsync_directory(os.path.dirname(self.path))
+
+    def read(self) -> dict:
+        # 로그를 처음부터 재생해 대화를 복원 (기록 중 중단되어 잘린 마지막 줄은 건너뜀)
+        data = {field: [] if field == "selected_points" else "" for field in META_FIELDS}
+        data["message_list"] = []
+        meta_count = 0
+        damaged = False
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    damaged = True
+                    continue
+                if record.get("type") == "meta":
+                    meta_count += 1
+                    data.update({field: record[field] for field in META_FIELDS if field in record})
+                elif record.get("type") == "message":
+                    message = {"role": record["role"], "content": record["content"]}
+                    if "summary" in record:
+                        message["summary"] = record["summary"]
+                    data["message_list"].append(message)
+        # 손상된 줄이나 중복 meta가 있으면 불러온 뒤 압축하도록 표시
+        data["needs_compaction"] = damaged or meta_count > 1
+        return data
+
+
+def load_conversation(path):
+    # .jsonl 로그와 예전 형식(.json 스냅샷)을 모두 읽음
+    if path.endswith(CONVERSATION_LOG_SUFFIX):
+        return ConversationLog(path).read()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
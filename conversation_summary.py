@@ -0,0 +1,60 @@
+import re
+
+# ======================== 설정 ========================
+# 제안 멘트(> 인용문) 한 줄: 앞 공백, 목록 기호(-, *, •, 1.), 중첩 인용(>>, > >)을 모두 허용
+SUGGESTION_LINE = re.compile(r"^\s*(?:(?:[-*•]|\d+[.)])\s+)?(?:>\s*)+(.*)$")
+# 멘트 앞뒤에 붙는 따옴표·강조 기호
+QUOTE_CHARS = "\"'“”‘’* "
+# 프롬프트의 형식 예시가 그대로 나온 경우는 멘트로 보지 않음
+PLACEHOLDER_SUGGESTIONS = {"여기에 실제 상담 멘트를 작성하세요."}
+
+
+# ======================== 멘트 추출 ========================
+def extract_suggestions(text: str) -> list:
+    # "👉 보완 멘트 예시" 등 제목 문구와 무관하게 인용문(>)으로 제안된 멘트를 순서대로 추출
+    suggestions = []
+    for line in (text or "").splitlines():
+        match = SUGGESTION_LINE.match(line)
+        if not match:
+            continue
+        suggestion = match.group(1).strip().strip(QUOTE_CHARS).strip()
+        if suggestion and suggestion not in PLACEHOLDER_SUGGESTIONS:
+            suggestions.append(suggestion)
+    return suggestions
+
+
+def summarize_message(message) -> list:
+    # 메시지 한 건의 요약 줄 (메시지에 저장해 두고 재사용, 대화 로그에도 함께 기록됨)
+    if not isinstance(message, dict):
+        return []
+    if "summary" not in message:
+        if message.get("role") == "user":
+            message["summary"] = [f"- 상담원 요청: {message.get('content', '')}"]
+        elif message.get("role") == "ai":
+            message["summary"] = [f"- 제안 멘트: {s}" for s in extract_suggestions(message.get("content", ""))]
+        else:
+            message["summary"] = []
+    return message["summary"]
+
+
+# ======================== 누적 요약 ========================
+def new_summary() -> dict:
+    # text: 지금까지의 요약, count: 요약에 반영한 메시지 수
+    return {"text": "", "count": 0}
+
+
+def update_summary(summary: dict, message_list) -> str:
+    # 마지막으로 반영한 뒤 추가된 메시지만 요약에 덧붙임 (턴마다 새 메시지만큼의 일)
+    if summary["count"] > len(message_list):
+        # 대화가 통째로 바뀌었으면 처음부터 다시
+        summary.update(new_summary())
+    for message in message_list[summary["count"]:]:
+        lines = summarize_message(message)
+        if lines:
+            summary["text"] += ("\n" if summary["text"] else "") + "\n".join(lines)
+    summary["count"] = len(message_list)
+    return summary["text"]
+
+
+def build_summary(message_list) -> str:
+    return update_summary(new_summary(), message_list)
@@ -0,0 +1,141 @@
+import os
+import threading
+
+import httpx
+import streamlit as st
+
+from conversation_summary import build_summary
+
+# ======================== 설정 ========================
+# LLM 게이트웨이(llm_gateway.py) 주소: 지정하면 화면은 LLM을 직접 부르지 않고 게이트웨이의 얇은 클라이언트로 동작
+LLM_GATEWAY_URL = os.getenv("LLM_GATEWAY_URL", "")
+# 게이트웨이 연결 풀 (화면 프로세스 하나가 여는 연결 수)
+GATEWAY_MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "20"))
+GATEWAY_CONNECT_TIMEOUT = float(os.getenv("GATEWAY_CONNECT_TIMEOUT", "5"))
+GATEWAY_READ_TIMEOUT = float(os.getenv("GATEWAY_READ_TIMEOUT", "180"))
+
+ERROR_TEXT = "❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."
+
+
+# ======================== HTTP 클라이언트 ========================
+_client_lock = threading.Lock()
+_client = None
+
+
+def get_gateway_client() -> httpx.Client:
+    # 프로세스 전체에서 keep-alive 연결을 재사용
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(
+                base_url=LLM_GATEWAY_URL,
+                limits=httpx.Limits(
+                    max_connections=GATEWAY_MAX_CONNECTIONS, max_keepalive_connections=GATEWAY_MAX_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(GATEWAY_READ_TIMEOUT, connect=GATEWAY_CONNECT_TIMEOUT),
+            )
+        return _client
+
+
+def _stream(path, payload, raise_errors=False):
+    # 게이트웨이가 보내는 텍스트 청크를 도착하는 대로 전달 (중간에 닫으면 연결도 닫혀 게이트웨이가 중계를 멈춤)
+    # raise_errors: 백그라운드 작업처럼 session_id를 직접 넘긴 호출은 오류 문구 대신 예외로 실패를 알림
+    try:
+        with get_gateway_client().stream("POST", path, json=payload) as response:
+            response.raise_for_status()
+            for chunk in response.iter_text():
+                if chunk:
+                    yield chunk
+    except httpx.HTTPError as e:
+        print(f"🔥 LLM 게이트웨이 요청 실패 ({path}):", e)
+        if raise_errors:
+            raise
+        yield ERROR_TEXT
+
+
+def _post(path, payload):
+    response = get_gateway_client().post(path, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+# ======================== 진입점 (llm_prev와 같은 모양) ========================
+def get_script_response(name, situation, cancel_strength, regenerate=False,
+                        session_id=None, consultant_name=None, selected_points=None):
+    # 세션 값은 화면 쪽에서 읽어 요청에 담음 (게이트웨이에는 st.session_state가 없음)
+    raise_errors = session_id is not None
+    if session_id is None:
+        session_id = st.session_state.session_id
+    if consultant_name is None:
+        consultant_name = st.session_state.get('user_name', '상담원')
+    if selected_points is None:
+        selected_points = st.session_state.get('selected_points', [])
+    return _stream("/v1/script", {
+        "name": name,
+        "situation": situation,
+        "cancel_strength": cancel_strength,
+        "regenerate": regenerate,
+        "session_id": session_id,
+        "consultant_name": consultant_name,
+        "selected_points": list(selected_points or []),
+    }, raise_errors)
+
+
+def get_chatbot_response(user_message, script_context="", session_id=None):
+    raise_errors = session_id is not None
+    if session_id is None:
+        session_id = st.session_state.session_id
+    return _stream("/v1/chatbot", {
+        "user_message": user_message,
+        "script_context": script_context,
+        "session_id": session_id,
+    }, raise_errors)
+
+
+def get_kakao_response(script_context, message_list=None, mode=None, session_id=None, regenerate=False,
+                       conversation_summary=None):
+    # 대화 전체 대신 요약만 보냄
+    raise_errors = session_id is not None
+    if session_id is None:
+        session_id = st.session_state.session_id
+    if conversation_summary is None:
+        conversation_summary = build_summary(message_list or [])
+    return _stream("/v1/kakao", {
+        "script_context": script_context,
+        "conversation_summary": conversation_summary,
+        "mode": mode,
+        "session_id": session_id,
+        "regenerate": regenerate,
+    }, raise_errors)
+
+
+def get_random_cancel_info():
+    try:
+        return _post("/v1/scenarios", {"count": 1})[0]
+    except (httpx.HTTPError, ValueError, IndexError) as e:
+        print("🔥 LLM 게이트웨이 랜덤 상황 요청 실패:", e)
+        st.error("🔥 랜덤 청철 상황을 불러오지 못했습니다. 잠시 후 다시 시도해 주세요.")
+        return {}
+
+
+def restore_session_history(session_id, messages):
+    # 화면이 불러온 대화를 게이트웨이의 세션 히스토리로 교체
+    roles = {"human": "user", "ai": "ai"}
+    _post("/v1/sessions/restore", {
+        "session_id": session_id,
+        "messages": [{"role": roles.get(m.type, m.type), "content": m.content} for m in messages],
+    })
+
+
+def release_session(session_id):
+    try:
+        _post("/v1/sessions/release", {"session_id": session_id})
+    except httpx.HTTPError as e:
+        # 로그아웃/새 상담은 막지 않음 (게이트웨이 쪽 히스토리는 유휴 TTL(STORE_IDLE_TTL)로 정리됨)
+        print("⚠️ LLM 게이트웨이 세션 해제 실패:", e)
+
+
+def get_gateway_stats() -> dict:
+    response = get_gateway_client().get("/v1/stats")
+    response.raise_for_status()
+    return response.json()
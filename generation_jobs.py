@@ -0,0 +1,207 @@
+import contextvars
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ======================== 설정 ========================
+# 동시에 LLM 생성을 실행하는 작업 스레드 수
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+# 실행을 기다릴 수 있는 작업 수 (넘으면 새 요청을 받지 않음)
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+# 세션 하나가 동시에 걸어 둘 수 있는 작업 수
+JOB_SESSION_LIMIT = int(os.getenv("JOB_SESSION_LIMIT", "2"))
+# 화면에 전달되지 않은 결과를 보관하는 시간(초), 탭을 닫은 세션의 결과는 이후 정리
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "600"))
+
+QUEUED, RUNNING, DONE, FAILED, DISCARDED = "queued", "running", "done", "failed", "discarded"
+
+
+class JobQueueFull(Exception):
+    """대기열(전체 또는 세션별)이 가득 차 작업을 받을 수 없음."""
+
+
+# ======================== 작업 ========================
+class Job:
+    """백그라운드에서 실행되는 LLM 생성 한 건: 받은 청크를 모아 두고, 화면은 rerun과 무관하게 이어서 읽음."""
+
+    def __init__(self, session_id, kind, payload):
+        self.id = uuid.uuid4().hex[:8]
+        self.session_id = session_id
+        self.kind = kind
+        # 결과를 화면 상태에 반영할 때 필요한 값 (질문 원문, 고객 정보 등)
+        self.payload = payload
+        self.status = QUEUED
+        self.error = None
+        self.created_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self._cond = threading.Condition()
+        self._chunks = []
+        self._future = None
+
+    @property
+    def text(self):
+        with self._cond:
+            return "".join(self._chunks)
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, DISCARDED)
+
+    def elapsed(self):
+        end = self.finished_at or time.monotonic()
+        return end - (self.started_at or self.created_at)
+
+    def wait(self, seen, timeout):
+        # 청크가 seen개보다 많아지거나 끝날 때까지 최대 timeout초 대기 → (현재 텍스트, 청크 수, 종료 여부)
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._chunks) > seen or self.finished, timeout)
+            return "".join(self._chunks), len(self._chunks), self.finished
+
+    def _set_status(self, status, error=None):
+        with self._cond:
+            if self.status == DISCARDED:
+                return
+            self.status = status
+            self.error = error
+            if status == RUNNING:
+                self.started_at = time.monotonic()
+            elif status in (DONE, FAILED, DISCARDED):
+                self.finished_at = time.monotonic()
+            self._cond.notify_all()
+
+    def _run(self, produce):
+        self._set_status(RUNNING)
+        stream = None
+        try:
+            # 호출 자체가 실패하는 생산자도 FAILED로 끝나도록 try 안에서 생성
+            stream = produce()
+            for chunk in stream:
+                if self.status == DISCARDED:
+                    break
+                with self._cond:
+                    self._chunks.append(chunk)
+                    self._cond.notify_all()
+            self._set_status(DONE)
+        except Exception as e:
+            print(f"🔥 백그라운드 작업 실패 ({self.kind}, {self.id}):", e)
+            self._set_status(FAILED, e)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+
+# ======================== 작업 실행기 ========================
+class JobRunner:
+    """세션별로 LLM 생성 작업을 받아 스레드 풀에서 실행하는 실행기.
+
+    작업은 Streamlit 스크립트 스레드 밖에서 끝까지 실행되므로, 생성 중에 위젯을 눌러 rerun이 일어나도
+    결과가 버려지지 않습니다. 화면은 매 실행마다 세션의 작업을 조회해 진행 상황을 이어서 보여 주고,
+    끝난 결과를 한 번만 가져갑니다(take). 대기 작업 수는 전체/세션별로 제한됩니다.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, queue_size=JOB_QUEUE_SIZE,
+                 session_limit=JOB_SESSION_LIMIT, result_ttl=JOB_RESULT_TTL):
+        self.queue_size = queue_size
+        self.session_limit = session_limit
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-job")
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._counters = {"submitted": 0, "rejected": 0, "delivered": 0, "expired": 0, "discarded": 0}
+
+    def submit(self, session_id, kind, produce, **payload):
+        # produce: 청크를 내보내는 제너레이터 함수 (Streamlit API·st.session_state를 쓰지 않아야 함)
+        with self._lock:
+            self._prune()
+            jobs = self._jobs.get(session_id, [])
+            active = [job for job in jobs if not job.finished]
+            queued = sum(
+                job.status == QUEUED for session_jobs in self._jobs.values() for job in session_jobs
+            )
+            if len(active) >= self.session_limit or queued >= self.queue_size:
+                self._counters["rejected"] += 1
+                raise JobQueueFull(
+                    f"진행 중인 작업이 너무 많습니다 (세션 {len(active)}/{self.session_limit}, "
+                    f"대기 {queued}/{self.queue_size})"
+                )
+            job = Job(session_id, kind, payload)
+            self._jobs.setdefault(session_id, []).append(job)
+            self._counters["submitted"] += 1
+
+        # 요청한 쪽의 컨텍스트(지표 구간 등)를 작업 스레드로 이어 받음
+        context = contextvars.copy_context()
+        job._future = self._executor.submit(context.run, job._run, produce)
+        return job
+
+    def jobs(self, session_id, kind=None):
+        # 아직 화면이 가져가지 않은 세션 작업 (요청 순서대로)
+        with self._lock:
+            return [job for job in self._jobs.get(session_id, []) if kind is None or job.kind == kind]
+
+    def active(self, session_id, kind=None):
+        return [job for job in self.jobs(session_id, kind) if not job.finished]
+
+    def take(self, job):
+        # 끝난 작업을 목록에서 빼서 한 번만 전달되게 함
+        with self._lock:
+            jobs = self._jobs.get(job.session_id, [])
+            if job not in jobs:
+                return False
+            jobs.remove(job)
+            if not jobs:
+                del self._jobs[job.session_id]
+            self._counters["delivered"] += 1
+            return True
+
+    def position(self, job):
+        # 대기 중인 작업 앞에 남은 대기 작업 수
+        with self._lock:
+            return sum(
+                other.status == QUEUED and other.created_at < job.created_at
+                for session_jobs in self._jobs.values() for other in session_jobs
+            )
+
+    def discard(self, session_id):
+        # 로그아웃·새 상황·다른 대화 불러오기: 대기 작업은 취소, 실행 중 작업은 결과를 버림
+        with self._lock:
+            jobs = self._jobs.pop(session_id, [])
+            self._counters["discarded"] += len(jobs)
+        for job in jobs:
+            if job._future is not None:
+                job._future.cancel()
+            job._set_status(DISCARDED)
+
+    def _prune(self):
+        # 오래 전달되지 않은 결과 정리 (lock 안에서 호출)
+        now = time.monotonic()
+        for session_id in list(self._jobs):
+            kept = [
+                job for job in self._jobs[session_id]
+                if not job.finished or now - job.finished_at < self.result_ttl
+            ]
+            self._counters["expired"] += len(self._jobs[session_id]) - len(kept)
+            if kept:
+                self._jobs[session_id] = kept
+            else:
+                del self._jobs[session_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [job.status for jobs in self._jobs.values() for job in jobs]
+            return {
+                "workers": self._workers,
+                "queued": statuses.count(QUEUED),
+                "running": statuses.count(RUNNING),
+                "undelivered": statuses.count(DONE) + statuses.count(FAILED),
+                "sessions": len(self._jobs),
+                **self._counters,
+            }
+
+
+job_runner = JobRunner()
@@ -0,0 +1,369 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from conversation_log import load_conversation
+
+# ======================== 설정 ========================
+# 상담원별 카탈로그는 저장 파일에서 언제든 다시 만들 수 있으므로 로컬 디스크에 둠 (NFS 위 SQLite 잠금 회피)
+HISTORY_CATALOG_DIR = os.getenv("HISTORY_CATALOG_DIR", "/tmp/stayon/catalog")
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+# 사이드바 목록 캐시: 폴더 mtime 확인 최소 간격(초)과 검색어별 결과 보관 수
+MANIFEST_STAT_INTERVAL = float(os.getenv("MANIFEST_STAT_INTERVAL", "1.0"))
+MANIFEST_MAX_RESULTS = int(os.getenv("MANIFEST_MAX_RESULTS", "8"))
+
+# 검색 순위 가중치 (고객명 > 상황 > 스크립트)
+RANK_WEIGHTS = (10.0, 3.0, 1.0)
+SAVED_AT_PATTERN = re.compile(r"_(\d{6}-\d{6})\.jsonl?$")
+
+
+def parse_saved_at(filename: str) -> str:
+    # 파일명 끝의 yymmdd-HHMMSS (없으면 가장 오래된 것으로 정렬)
+    match = SAVED_AT_PATTERN.search(filename)
+    return match.group(1) if match else ""
+
+
+def build_match_query(keyword: str) -> str:
+    # 공백으로 나눈 각 단어를 접두 검색으로 묶고, FTS 문법 문자는 따옴표로 무력화
+    terms = [term.replace('"', '""') for term in keyword.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+# ======================== 대화 기록 카탈로그 ========================
+class HistoryCatalog:
+    """상담원 한 명의 저장 대화 목록을 색인해 두고 검색/페이지 조회를 제공하는 SQLite(FTS5) 카탈로그."""
+
+    def __init__(self, user_path, path):
+        self.user_path = user_path
+        self.path = path
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "filename TEXT PRIMARY KEY, customer_name TEXT NOT NULL, cancel_strength TEXT NOT NULL, "
+            "situation TEXT NOT NULL, script_context TEXT NOT NULL, saved_at TEXT NOT NULL, "
+            "file_stat TEXT NOT NULL DEFAULT '')"
+        )
+        # 예전 카탈로그에는 file_stat이 없으므로 추가 (기존 행은 다음 sync에서 모두 다시 색인됨)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(history)")}
+        migrated = "file_stat" not in columns
+        if migrated:
+            conn.execute("ALTER TABLE history ADD COLUMN file_stat TEXT NOT NULL DEFAULT ''")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_saved_at ON history (saved_at)")
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+            "customer_name, situation, script_context, tokenize='unicode61')"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        # 카탈로그를 처음 만들었거나 지워졌다면 기존 저장 파일로 한 번 채움
+        # 카탈로그는 프로세스보다 오래 남으므로, 꺼져 있는 동안 폴더가 바뀌었어도(마지막으로 맞춘 mtime과 다름) 다시 맞춤
+        synced = conn.execute("SELECT 1 FROM catalog_meta WHERE key = 'synced'").fetchone() is not None
+        if not synced or migrated or self._stored_mtime() != self._folder_mtime():
+            self.sync()
+
+    def _folder_mtime(self) -> str:
+        try:
+            return str(os.stat(self.user_path).st_mtime_ns)
+        except OSError:
+            return ""
+
+    def _stored_mtime(self) -> str:
+        row = self._connection().execute("SELECT value FROM catalog_meta WHERE key = 'folder_mtime'").fetchone()
+        return row[0] if row is not None else None
+
+    def mark_synced(self, mtime=None) -> None:
+        # 카탈로그가 폴더와 맞춰진 시점의 폴더 mtime을 기록 (다음 프로세스 시작 시 비교)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('folder_mtime', ?)",
+            (self._folder_mtime() if mtime is None else str(mtime),),
+        )
+
+    def _file_stat(self, filename) -> str:
+        # 파일 내용이 바뀌었는지 판단하는 값 (mtime_ns:크기) — 제자리 추가(append)·덮어쓰기도 잡아냄
+        try:
+            stat = os.stat(os.path.join(self.user_path, filename))
+        except OSError:
+            return ""
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- 저장 / 삭제 경로에서 갱신 ----------
+    def upsert(self, filename: str, data, saved_at=None, file_stat=None) -> None:
+        # saved_at(yymmdd-HHMMSS)을 주면 파일명 대신 마지막 저장 시각으로 정렬
+        # file_stat을 주지 않으면 지금 파일 상태를 기록 (sync에서 바뀐 파일을 다시 색인하는 기준)
+        if file_stat is None:
+            file_stat = self._file_stat(filename)
+        if not isinstance(data, dict):
+            # 예전 형식(메시지 리스트만 저장된 파일)
+            data = {"customer_name": filename.split("_")[0]}
+        row = (
+            str(data.get("customer_name") or filename.split("_")[0]),
+            str(data.get("cancel_strength") or ""),
+            str(data.get("customer_situation") or ""),
+            str(data.get("script_context") or ""),
+        )
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete(conn, filename)
+            cursor = conn.execute(
+                "INSERT INTO history (filename, customer_name, cancel_strength, situation, script_context, saved_at, "
+                "file_stat) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (filename, *row, saved_at or parse_saved_at(filename), file_stat),
+            )
+            conn.execute(
+                "INSERT INTO history_fts (rowid, customer_name, situation, script_context) VALUES (?, ?, ?, ?)",
+                (cursor.lastrowid, row[0], row[2], row[3]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def remove(self, filename: str) -> None:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete(conn, filename)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _delete(self, conn, filename):
+        row = conn.execute("SELECT rowid FROM history WHERE filename = ?", (filename,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM history_fts WHERE rowid = ?", (row[0],))
+            conn.execute("DELETE FROM history WHERE rowid = ?", (row[0],))
+
+    def sync(self) -> int:
+        # 디렉터리와 카탈로그를 맞춤 (누락·내용이 바뀐 파일 색인, 사라진 파일 제거) — 최초 1회, 폴더 변경 시 또는 수동 복구용
+        with self._lock:
+            # 목록을 읽기 전의 mtime을 기록해, 읽는 도중 바뀐 경우는 다음 확인에서 다시 맞추도록 함
+            mtime = self._folder_mtime()
+            files = {
+                name for name in (os.listdir(self.user_path) if os.path.isdir(self.user_path) else [])
+                if name.endswith((".json", ".jsonl"))
+            }
+            indexed = {
+                filename: (file_stat, saved_at)
+                for filename, file_stat, saved_at in self._connection().execute(
+                    "SELECT filename, file_stat, saved_at FROM history"
+                )
+            }
+            for filename in indexed.keys() - files:
+                self.remove(filename)
+            changed = 0
+            for filename in sorted(files):
+                file_stat = self._file_stat(filename)
+                previous_stat, saved_at = indexed.get(filename, ("", None))
+                if previous_stat == file_stat:
+                    continue
+                try:
+                    # 읽기 전의 상태를 기록해, 읽는 도중 바뀐 파일은 다음 sync에서 다시 색인
+                    # 이미 색인된 파일은 기존 정렬 시각(saved_at)을 유지
+                    self.upsert(filename, load_conversation(os.path.join(self.user_path, filename)),
+                                saved_at=saved_at, file_stat=file_stat)
+                    changed += 1
+                except (OSError, ValueError) as e:
+                    print(f"🔥 대화 기록 색인 실패 ({filename}):", e)
+            self._connection().execute(
+                "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('synced', '1')"
+            )
+            self.mark_synced(mtime)
+            return changed
+
+    # ---------- 조회 ----------
+    def has_entries(self) -> bool:
+        return self._connection().execute("SELECT 1 FROM history LIMIT 1").fetchone() is not None
+
+    def page(self, keyword="", page=0, page_size=HISTORY_PAGE_SIZE):
+        # 한 페이지 + 1건만 읽어 다음 페이지 존재 여부를 판단 (저장 파일 수와 무관한 비용)
+        keyword = keyword.strip()
+        offset = max(page, 0) * page_size
+        conn = self._connection()
+        if not keyword:
+            rows = conn.execute(
+                "SELECT filename, customer_name, cancel_strength, situation, saved_at FROM history "
+                "ORDER BY saved_at DESC LIMIT ? OFFSET ?",
+                (page_size + 1, offset),
+            ).fetchall()
+        else:
+            # 본문은 FTS 순위(bm25, 낮을수록 적합)로, 고객명은 부분 일치도 최상위로 포함
+            rows = conn.execute(
+                "WITH hits (id, score) AS ("
+                "  SELECT rowid, bm25(history_fts, ?, ?, ?) FROM history_fts WHERE history_fts MATCH ?"
+                "  UNION ALL"
+                "  SELECT rowid, -1000000.0 FROM history WHERE instr(lower(customer_name), lower(?)) > 0"
+                ") "
+                "SELECT h.filename, h.customer_name, h.cancel_strength, h.situation, h.saved_at "
+                "FROM hits JOIN history h ON h.rowid = hits.id "
+                "GROUP BY h.rowid ORDER BY MIN(hits.score), h.saved_at DESC LIMIT ? OFFSET ?",
+                (*RANK_WEIGHTS, build_match_query(keyword), keyword, page_size + 1, offset),
+            ).fetchall()
+
+        entries = [
+            {"filename": r[0], "customer_name": r[1], "cancel_strength": r[2], "situation": r[3], "saved_at": r[4]}
+            for r in rows[:page_size]
+        ]
+        return entries, len(rows) > page_size
+
+
+# ======================== 사이드바 목록 캐시 ========================
+class HistoryManifest:
+    """rerun마다 파일시스템과 카탈로그를 조회하지 않도록 사이드바 목록을 캐시하는 상담원별 manifest.
+
+    폴더 mtime이 바뀌었을 때(다른 워커의 저장/삭제)만 카탈로그를 폴더와 다시 맞추고,
+    이 프로세스의 저장/삭제는 invalidate()로 직접 알립니다.
+    NFS는 디렉터리 속성을 캐시하므로 다른 호스트의 변경은 마운트 옵션(acdirmin)만큼 늦게 보일 수 있습니다.
+    """
+
+    def __init__(self, user_path, catalog, stat_interval=MANIFEST_STAT_INTERVAL, max_results=MANIFEST_MAX_RESULTS):
+        self.user_path = user_path
+        self.catalog = catalog
+        self.stat_interval = stat_interval
+        self.max_results = max_results
+
+        self._lock = threading.Lock()
+        # 폴더 생성은 manifest를 처음 만들 때 한 번만
+        os.makedirs(user_path, exist_ok=True)
+        self._mtime = self._stat()
+        self._checked = time.monotonic()
+        self._results = OrderedDict()   # (keyword, page, page_size) -> (entries, has_next)
+        self._has_entries = None
+        self._counters = {"reruns": 0, "hits": 0, "misses": 0, "refreshes": 0, "invalidations": 0}
+
+    def _stat(self):
+        try:
+            return os.stat(self.user_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _check_directory(self):
+        # 최소 간격마다 stat 한 번만 수행하고, mtime이 바뀐 경우에만 폴더를 다시 읽음
+        now = time.monotonic()
+        if now - self._checked < self.stat_interval:
+            return
+        self._checked = now
+        mtime = self._stat()
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self.catalog.sync()
+            self._results.clear()
+            self._has_entries = None
+            self._counters["refreshes"] += 1
+
+    # ---------- 저장 / 삭제 경로 ----------
+    def invalidate(self):
+        # 카탈로그는 호출 측에서 이미 갱신했으므로 결과 캐시만 비우고 현재 mtime을 기준으로 삼음
+        with self._lock:
+            self._results.clear()
+            self._has_entries = None
+            self._mtime = self._stat()
+            # 다음 프로세스가 시작할 때 이 변경 때문에 다시 맞추지 않도록 함께 기록
+            self.catalog.mark_synced()
+            self._checked = time.monotonic()
+            self._counters["invalidations"] += 1
+
+    def record_saved(self, filename, data, saved_at=None, replaced=None):
+        if replaced and replaced != filename:
+            self.catalog.remove(replaced)
+        self.catalog.upsert(filename, data, saved_at=saved_at)
+        self.invalidate()
+
+    def record_deleted(self, filename):
+        self.catalog.remove(filename)
+        self.invalidate()
+
+    # ---------- 조회 ----------
+    def has_entries(self) -> bool:
+        with self._lock:
+            self._check_directory()
+            if self._has_entries is None:
+                self._has_entries = self.catalog.has_entries()
+            return self._has_entries
+
+    def page(self, keyword="", page=0, page_size=HISTORY_PAGE_SIZE):
+        keyword = keyword.strip()
+        with self._lock:
+            self._counters["reruns"] += 1
+            self._check_directory()
+            entries, has_next = self._lookup(keyword, page, page_size)
+        return [dict(entry) for entry in entries], has_next
+
+    def _lookup(self, keyword, page, page_size):
+        key = (keyword, page, page_size)
+        if key in self._results:
+            self._results.move_to_end(key)
+            self._counters["hits"] += 1
+            return self._results[key]
+
+        # 이어 입력한 검색어도 FTS로 다시 조회 (메모리에서 좁히면 토큰 접두 일치·순위가 FTS와 달라짐, 한 페이지라 비용도 작음)
+        result = self.catalog.page(keyword, page, page_size)
+        self._counters["misses"] += 1
+
+        self._results[key] = result
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            reruns = self._counters["reruns"]
+            return {
+                **self._counters,
+                "cached_results": len(self._results),
+                "hit_ratio": self._counters["hits"] / reruns if reruns else 0.0,
+            }
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_history_catalog(user_folder: str, user_path: str) -> HistoryCatalog:
+    # 상담원 폴더마다 프로세스당 하나의 카탈로그 객체를 재사용
+    with _catalogs_lock:
+        if user_folder not in _catalogs:
+            _catalogs[user_folder] = HistoryCatalog(
+                user_path, os.path.join(HISTORY_CATALOG_DIR, f"{user_folder}.db")
+            )
+        return _catalogs[user_folder]
+
+
+_manifests = {}
+
+
+def get_history_manifest(user_folder: str, user_path: str) -> HistoryManifest:
+    with _catalogs_lock:
+        manifest = _manifests.get(user_folder)
+    if manifest is None:
+        manifest = HistoryManifest(user_path, get_history_catalog(user_folder, user_path))
+        with _catalogs_lock:
+            manifest = _manifests.setdefault(user_folder, manifest)
+    return manifest
+
+
+def get_manifest_stats() -> dict:
+    # 상담원별 사이드바 캐시 적중 현황
+    with _catalogs_lock:
+        manifests = dict(_manifests)
+    return {user_folder: manifest.stats() for user_folder, manifest in manifests.items()}
@@ -0,0 +1,326 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_community.chat_message_histories import ChatMessageHistory
+
+# ======================== 설정 ========================
+# 0 이하로 지정하면 해당 제한을 사용하지 않음
+STORE_MAX_SESSIONS = int(os.getenv("STORE_MAX_SESSIONS", "500"))
+STORE_MAX_BYTES = int(os.getenv("STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+STORE_IDLE_TTL = int(os.getenv("STORE_IDLE_TTL", str(4 * 60 * 60)))
+
+# memory: 프로세스 내 저장소 / sqlite: 같은 호스트의 여러 워커가 공유하는 SQLite 파일
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "memory")
+# WAL 모드는 로컬 디스크에서만 안전하므로 NFS(/data)가 아닌 로컬 경로를 사용
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "/tmp/stayon/chat_history.db")
+
+
+def estimate_history_bytes(history: BaseChatMessageHistory) -> int:
+    # 메시지 본문 문자열의 메모리 크기를 합산한 근사치
+    return sum(sys.getsizeof(message.content) for message in history.messages)
+
+
+# ======================== 세션 저장소 ========================
+class SessionStore:
+    """LRU + 유휴 TTL 기반으로 세션별 대화 히스토리를 보관하는 저장소."""
+
+    def __init__(self, max_sessions=STORE_MAX_SESSIONS, max_bytes=STORE_MAX_BYTES,
+                 idle_ttl=STORE_IDLE_TTL, history_factory=ChatMessageHistory):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.history_factory = history_factory
+
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()   # session_id -> history (오래된 순)
+        self._last_access = {}
+        self._sizes = {}
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "released": 0}
+
+    # ---------- dict 호환 인터페이스 ----------
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._entries
+
+    def __getitem__(self, session_id):
+        with self._lock:
+            if session_id not in self._entries:
+                raise KeyError(session_id)
+            return self._touch(session_id)
+
+    def __setitem__(self, session_id, history):
+        with self._lock:
+            self._entries[session_id] = history
+            self._touch(session_id)
+            self._enforce_limits()
+
+    def __delitem__(self, session_id):
+        with self._lock:
+            self._drop(session_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    # ---------- 조회 / 생성 ----------
+    def get_or_create(self, session_id: str) -> BaseChatMessageHistory:
+        with self._lock:
+            self._expire_idle()
+            if session_id in self._entries:
+                self._counters["hits"] += 1
+                return self._touch(session_id)
+
+            self._counters["misses"] += 1
+            self._entries[session_id] = self.history_factory()
+            history = self._touch(session_id)
+            self._enforce_limits()
+            return history
+
+    def release(self, session_id: str) -> int:
+        # 로그아웃/새 상담 시 해당 세션과 파생 세션({session_id}_* 형태)을 모두 해제
+        with self._lock:
+            targets = [
+                key for key in self._entries
+                if key == session_id or key.startswith(f"{session_id}_")
+            ]
+            for key in targets:
+                self._drop(key)
+            self._counters["released"] += len(targets)
+            return len(targets)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "live_sessions": len(self._entries),
+                "approx_bytes": sum(self._sizes.values()),
+            }
+
+    # ---------- 내부 처리 ----------
+    def _touch(self, session_id):
+        history = self._entries[session_id]
+        self._entries.move_to_end(session_id)
+        self._last_access[session_id] = time.monotonic()
+        # RunnableWithMessageHistory는 반환 이후에 메시지를 추가하므로 접근 시점마다 크기를 갱신
+        self._sizes[session_id] = estimate_history_bytes(history)
+        return history
+
+    def _drop(self, session_id):
+        self._entries.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+        self._sizes.pop(session_id, None)
+
+    def _expire_idle(self):
+        if self.idle_ttl <= 0:
+            return
+        deadline = time.monotonic() - self.idle_ttl
+        # 가장 오래 접근하지 않은 항목부터 확인하므로 만료되지 않은 항목을 만나면 중단
+        for session_id in list(self._entries):
+            if self._last_access[session_id] > deadline:
+                break
+            self._drop(session_id)
+            self._counters["expired"] += 1
+
+    def _enforce_limits(self):
+        # 방금 접근한 세션(가장 최근 항목)은 축출하지 않음
+        while len(self._entries) > 1 and (
+            (self.max_sessions > 0 and len(self._entries) > self.max_sessions)
+            or (self.max_bytes > 0 and sum(self._sizes.values()) > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._counters["evictions"] += 1
+
+
+# ======================== SQLite 히스토리 ========================
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """SQLite 파일에 저장되는 세션 단위 대화 히스토리."""
+
+    def __init__(self, session_id: str, db: "SQLiteSessionStore"):
+        self.session_id = session_id
+        self.db = db
+
+    @property
+    def messages(self):
+        rows = self.db.execute(
+            "SELECT message FROM chat_messages WHERE session_id = ? ORDER BY id",
+            (self.session_id,),
+        ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+    def add_messages(self, messages) -> None:
+        # 질문/응답 한 쌍을 하나의 트랜잭션으로 묶어서 기록
+        rows = [
+            (self.session_id, json.dumps(message_to_dict(message), ensure_ascii=False))
+            for message in messages
+        ]
+        if not rows:
+            return
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO chat_messages (session_id, message) VALUES (?, ?)", rows
+            )
+            conn.execute(
+                "UPDATE chat_sessions SET last_access = ? WHERE session_id = ?",
+                (time.time(), self.session_id),
+            )
+
+    def clear(self) -> None:
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (self.session_id,))
+
+
+class SQLiteSessionStore:
+    """여러 Streamlit 워커가 공유하는 SQLite(WAL) 기반 세션 저장소."""
+
+    PRUNE_INTERVAL = 60
+
+    def __init__(self, path=HISTORY_DB_PATH, idle_ttl=STORE_IDLE_TTL):
+        self.path = path
+        self.idle_ttl = idle_ttl
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "released": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "session_id TEXT PRIMARY KEY, last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, message TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages (session_id, id)"
+            )
+
+    # ---------- 연결 관리 ----------
+    def _connection(self):
+        # sqlite3 연결은 스레드 간 공유할 수 없으므로 스레드마다 하나씩 유지
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql, params=()):
+        return self._connection().execute(sql, params)
+
+    def transaction(self):
+        return _Transaction(self._connection())
+
+    # ---------- SessionStore와 같은 인터페이스 ----------
+    def __contains__(self, session_id):
+        row = self.execute(
+            "SELECT 1 FROM chat_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row is not None
+
+    def __getitem__(self, session_id):
+        if session_id not in self:
+            raise KeyError(session_id)
+        return SQLiteChatMessageHistory(session_id, self)
+
+    def __len__(self):
+        return self.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+
+    def get_or_create(self, session_id: str) -> BaseChatMessageHistory:
+        self._prune_idle()
+        with self.transaction() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO chat_sessions (session_id, last_access) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_access = excluded.last_access",
+                (session_id, time.time()),
+            )
+        with self._lock:
+            self._counters["hits" if exists else "misses"] += 1
+        return SQLiteChatMessageHistory(session_id, self)
+
+    def release(self, session_id: str) -> int:
+        prefix = f"{session_id}_"
+        with self.transaction() as conn:
+            targets = [
+                row[0] for row in conn.execute(
+                    "SELECT session_id FROM chat_sessions "
+                    "WHERE session_id = ? OR substr(session_id, 1, ?) = ?",
+                    (session_id, len(prefix), prefix),
+                )
+            ]
+            self._delete(conn, targets)
+        with self._lock:
+            self._counters["released"] += len(targets)
+        return len(targets)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "live_sessions": len(self),
+            "approx_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    # ---------- 내부 처리 ----------
+    def _delete(self, conn, session_ids):
+        for session_id in session_ids:
+            conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+
+    def _prune_idle(self):
+        if self.idle_ttl <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < self.PRUNE_INTERVAL:
+                return
+            self._last_prune = now
+        with self.transaction() as conn:
+            expired = [
+                row[0] for row in conn.execute(
+                    "SELECT session_id FROM chat_sessions WHERE last_access < ?",
+                    (now - self.idle_ttl,),
+                )
+            ]
+            self._delete(conn, expired)
+        with self._lock:
+            self._counters["expired"] += len(expired)
+
+
+class _Transaction:
+    # autocommit 연결 위에서 BEGIN IMMEDIATE ~ COMMIT 구간을 관리
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def create_session_store(backend=HISTORY_BACKEND):
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "memory":
+        return SessionStore()
+    raise ValueError(f"지원하지 않는 HISTORY_BACKEND 입니다: {backend}")
@@ -0,0 +1,398 @@
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+import llm_prev
+from model_routes import describe_routes
+from telemetry import telemetry
+
+# ======================== 설정 ========================
+# 여러 Streamlit 프로세스가 함께 쓰는 로컬 LLM 게이트웨이 주소 (화면 쪽은 LLM_GATEWAY_URL로 지정)
+#   python llm_gateway.py  또는  uvicorn llm_gateway:app --host 127.0.0.1 --port 8100
+# 세션 히스토리·응답 캐시·rate limit·동일 요청 합류가 게이트웨이 한 곳에 모이므로 워커는 하나로 실행
+GATEWAY_HOST = os.getenv("GATEWAY_HOST", "127.0.0.1")
+GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", "8100"))
+# 동시에 중계할 수 있는 생성 스트림 수 (스트림마다 작업 스레드 하나를 사용)
+GATEWAY_WORKERS = int(os.getenv("GATEWAY_WORKERS", "64"))
+# 랜덤 상황 요청을 모으는 시간(초): 이 사이에 들어온 요청은 풀에서 한 번에 꺼냄
+GATEWAY_SCENARIO_BATCH_WINDOW = float(os.getenv("GATEWAY_SCENARIO_BATCH_WINDOW", "0.02"))
+GATEWAY_MAX_BODY_BYTES = int(os.getenv("GATEWAY_MAX_BODY_BYTES", str(1024 * 1024)))
+
+SCENARIO_MAX_COUNT = 20
+
+
+class BadRequest(Exception):
+    """요청 본문이 잘못되어 처리할 수 없음 (400)."""
+
+
+# ======================== 스트림 중계 ========================
+class StreamRelay:
+    """동기 진입점 스트림을 작업 스레드에서 실행하며 청크가 도착하는 즉시 이벤트 루프로 넘기는 중계기."""
+
+    _DONE = object()
+
+    def __init__(self, workers=GATEWAY_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gateway-stream")
+        self._lock = threading.Lock()
+        self._stats = {"streams": 0, "active": 0, "cancelled": 0}
+
+    async def iterate(self, produce):
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:
+                # 게이트웨이 종료로 이벤트 루프가 닫힘
+                cancelled.set()
+
+        def pump():
+            # 클라이언트가 끊으면 스트림을 닫음 (진행 중인 생성은 single-flight로 다른 구독자가 이어 받음)
+            stream = produce()
+            try:
+                for chunk in stream:
+                    put(chunk)
+                    if cancelled.is_set():
+                        break
+            except BaseException as e:
+                put(e)
+            finally:
+                stream.close()
+                put(self._DONE)
+
+        with self._lock:
+            self._stats["streams"] += 1
+            self._stats["active"] += 1
+        self._executor.submit(contextvars.copy_context().run, pump)
+        finished = False
+        try:
+            while True:
+                item = await chunks.get()
+                if item is self._DONE:
+                    finished = True
+                    return
+                if isinstance(item, BaseException):
+                    finished = True
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+            with self._lock:
+                self._stats["active"] -= 1
+                if not finished:
+                    self._stats["cancelled"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+# ======================== 랜덤 상황 묶음 처리 ========================
+class ScenarioBatcher:
+    """잠깐(window) 동안 동시에 들어온 랜덤 상황 요청을 모아 상황 풀에서 한 번에 꺼내는 묶음 처리기.
+
+    이벤트 루프 안에서만 사용하므로 잠금이 필요 없습니다.
+    """
+
+    def __init__(self, take, window=GATEWAY_SCENARIO_BATCH_WINDOW):
+        # take(count) -> 상황 dict 리스트
+        self.take = take
+        self.window = window
+        self._pending = []
+        self._scheduled = False
+        self._stats = {"requests": 0, "batches": 0, "largest_batch": 0}
+
+    async def get(self, count=1) -> list:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((count, future))
+        self._stats["requests"] += 1
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_later(self.window, lambda: asyncio.ensure_future(self._flush()))
+        return await future
+
+    async def _flush(self):
+        pending, self._pending = self._pending, []
+        self._scheduled = False
+        total = sum(count for count, _ in pending)
+        self._stats["batches"] += 1
+        self._stats["largest_batch"] = max(self._stats["largest_batch"], len(pending))
+        try:
+            scenarios = await asyncio.to_thread(self.take, total)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for count, future in pending:
+            part, scenarios = scenarios[:count], scenarios[count:]
+            if not future.done():
+                future.set_result(part)
+
+    def stats(self) -> dict:
+        return {**self._stats, "pending": len(self._pending)}
+
+
+stream_relay = StreamRelay()
+scenario_batcher = ScenarioBatcher(llm_prev.get_random_cancel_info_batch)
+
+
+# ======================== 요청 처리 ========================
+def _field(payload, name, kind=str, default=None, required=False):
+    value = payload.get(name, default)
+    if value is None:
+        if required:
+            raise BadRequest(f"'{name}' 항목이 필요합니다.")
+        return value
+    if not isinstance(value, kind):
+        raise BadRequest(f"'{name}' 항목의 형식이 잘못되었습니다.")
+    return value
+
+
+def script_stream(payload):
+    # 게이트웨이에는 st.session_state가 없으므로 세션 값은 모두 요청에 담겨 옴
+    name = _field(payload, "name", required=True)
+    situation = _field(payload, "situation", required=True)
+    cancel_strength = _field(payload, "cancel_strength", required=True)
+    session_values = {
+        "session_id": _field(payload, "session_id", required=True),
+        "consultant_name": _field(payload, "consultant_name", default="상담원"),
+        "selected_points": _field(payload, "selected_points", list, default=[]),
+    }
+    regenerate = _field(payload, "regenerate", bool, default=False)
+    return lambda: llm_prev.get_script_response(name, situation, cancel_strength, regenerate=regenerate, **session_values)
+
+
+def chatbot_stream(payload):
+    user_message = _field(payload, "user_message", required=True)
+    script_context = _field(payload, "script_context", default="")
+    session_id = _field(payload, "session_id", required=True)
+    return lambda: llm_prev.get_chatbot_response(user_message, script_context, session_id)
+
+
+def kakao_stream(payload):
+    script_context = _field(payload, "script_context", required=True)
+    conversation_summary = _field(payload, "conversation_summary", default="")
+    session_id = _field(payload, "session_id", required=True)
+    mode = _field(payload, "mode")
+    regenerate = _field(payload, "regenerate", bool, default=False)
+    return lambda: llm_prev.get_kakao_response(
+        script_context, mode=mode, session_id=session_id, regenerate=regenerate,
+        conversation_summary=conversation_summary,
+    )
+
+
+async def scenarios(payload):
+    count = _field(payload, "count", int, default=1)
+    if not 1 <= count <= SCENARIO_MAX_COUNT:
+        raise BadRequest(f"'count'는 1~{SCENARIO_MAX_COUNT} 사이여야 합니다.")
+    return await scenario_batcher.get(count)
+
+
+async def restore_session(payload):
+    # 저장된 대화를 불러온 화면이 게이트웨이의 세션 히스토리를 통째로 교체
+    session_id = _field(payload, "session_id", required=True)
+    messages = []
+    for message in _field(payload, "messages", list, default=[]):
+        if not isinstance(message, dict) or not isinstance(message.get("content"), str):
+            raise BadRequest("'messages' 항목의 형식이 잘못되었습니다.")
+        if message.get("role") == "user":
+            messages.append(HumanMessage(content=message["content"]))
+        elif message.get("role") == "ai":
+            messages.append(AIMessage(content=message["content"]))
+    await asyncio.to_thread(llm_prev.restore_session_history, session_id, messages)
+    return {"session_id": session_id, "messages": len(messages)}
+
+
+async def release_session(payload):
+    session_id = _field(payload, "session_id", required=True)
+    await asyncio.to_thread(llm_prev.release_session, session_id)
+    return {"session_id": session_id}
+
+
+async def gateway_stats(payload):
+    return {
+        "streams": stream_relay.stats(),
+        "scenario_batches": scenario_batcher.stats(),
+        "scenario_pool": llm_prev.scenario_pool.stats(),
+        "single_flight": llm_prev.get_single_flight_stats(),
+        "rate_limit": llm_prev.get_rate_limit_stats(),
+        "context_window": llm_prev.get_context_window_stats(),
+        "response_cache": await asyncio.to_thread(llm_prev.response_cache.stats),
+    }
+
+
+async def health(payload):
+    return {"status": "ok"}
+
+
+async def latency(payload):
+    return telemetry.latency_report()
+
+
+# 경로 → 스트림 요청 (응답은 텍스트 청크 스트림)
+STREAM_ROUTES = {
+    "/v1/script": script_stream,
+    "/v1/chatbot": chatbot_stream,
+    "/v1/kakao": kakao_stream,
+}
+# (메서드, 경로) → JSON 요청
+JSON_ROUTES = {
+    ("POST", "/v1/scenarios"): scenarios,
+    ("POST", "/v1/sessions/restore"): restore_session,
+    ("POST", "/v1/sessions/release"): release_session,
+    ("GET", "/v1/stats"): gateway_stats,
+    ("GET", "/v1/latency"): latency,
+    ("GET", "/healthz"): health,
+}
+
+
+# ======================== ASGI 앱 ========================
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if len(body) > GATEWAY_MAX_BODY_BYTES:
+            raise BadRequest("요청 본문이 너무 큽니다.")
+        if not message.get("more_body"):
+            return body
+
+
+def _parse_payload(scope, body):
+    if scope["method"] == "GET":
+        return {key: values[-1] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise BadRequest("요청 본문이 JSON이 아닙니다.")
+    if not isinstance(payload, dict):
+        raise BadRequest("요청 본문은 JSON 객체여야 합니다.")
+    return payload
+
+
+async def _send_json(send, status, data):
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_stream(send, receive, produce):
+    # 청크를 받는 즉시 내보냄 (버퍼링 프록시가 모아 보내지 않도록 헤더로 표시)
+    # 헤더는 첫 청크와 함께 보내, 생성 전에 실패하면 오류 상태 코드로 알림
+    started = False
+
+    async def start():
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+
+    disconnected = asyncio.ensure_future(receive())
+    chunks = stream_relay.iterate(produce)
+    try:
+        async for chunk in chunks:
+            if disconnected.done():
+                return
+            if not started:
+                await start()
+                started = True
+            await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+        if not started:
+            await start()
+        await send({"type": "http.response.body", "body": b""})
+    except Exception as e:
+        print("🔥 게이트웨이 생성 실패:", e)
+        if started:
+            # 이미 보낸 본문은 되돌릴 수 없으므로 응답을 끝맺지 않고 연결을 끊어 화면이 실패로 처리하게 함
+            raise
+        await _send_json(send, 502, {"error": "생성 중 오류가 발생했습니다."})
+    finally:
+        await chunks.aclose()
+        disconnected.cancel()
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # 지표 서버 (게이트웨이 프로세스당 하나, TELEMETRY_PORT)
+            telemetry.serve()
+            print(f"🛰️ LLM 게이트웨이 시작: 모델 경로 {describe_routes(llm_prev.MODEL_ROUTES)}")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"]
+    stream_route = STREAM_ROUTES.get(path) if method == "POST" else None
+    json_route = JSON_ROUTES.get((method, path))
+    if stream_route is None and json_route is None:
+        await _send_json(send, 404, {"error": f"알 수 없는 경로입니다: {method} {path}"})
+        return
+
+    try:
+        body = await _read_body(receive)
+        if body is None:
+            return
+        payload = _parse_payload(scope, body)
+        if stream_route is not None:
+            produce = stream_route(payload)
+        else:
+            result = await json_route(payload)
+    except BadRequest as e:
+        await _send_json(send, 400, {"error": str(e)})
+        return
+    except Exception as e:
+        print(f"🔥 게이트웨이 요청 처리 실패 ({path}):", e)
+        await _send_json(send, 500, {"error": "게이트웨이 내부 오류"})
+        return
+
+    if stream_route is not None:
+        await _send_stream(send, receive, produce)
+    else:
+        await _send_json(send, 200, result)
+
+
+# ======================== 실행 ========================
+def main():
+    try:
+        import uvicorn
+    except ImportError:
+        print("⚠️ uvicorn이 설치되어 있지 않습니다. `pip install uvicorn` 후 다시 실행해 주세요.")
+        sys.exit(1)
+    # 상태(세션·캐시·합류)를 프로세스 안에 두므로 워커는 하나, 동시성은 이벤트 루프와 중계 스레드로 처리
+    uvicorn.run(app, host=GATEWAY_HOST, port=GATEWAY_PORT, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,28 @@
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
 from langchain_community.chat_models import ChatOpenAI
 from functools import lru_cache
+from history_store import create_session_store
+from context_window import ContextWindow, count_tokens
+from conversation_summary import build_summary
+from response_cache import ResponseCache, make_cache_key, normalize_text
+from scenario_pool import ScenarioPool
+from single_flight import SingleFlight
+from model_routes import ROUTE_ENTRY_POINTS, load_routes
+from telemetry import (
+    annotate_span, mark_span_error, telemetry, traced_acall, traced_astream, traced_call, traced_stream,
+)
+from llm_runtime import (
+    LLM_COMPLETION_TOKENS_ESTIMATE, AsyncUsageRecordingCompletions, UsageRecordingCompletions,
+    acquire_blocking, get_async_http_client, get_http_client, rate_limiter, runtime, usage_recorder,
+)
 import streamlit as st
+import asyncio
+import openai
 import os
 from dotenv import load_dotenv
 
@@ -15,7 +32,15 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 
 # ======================== 전역 저장소 ========================
-store = {}
+# HISTORY_BACKEND=memory(기본): LRU + 유휴 TTL로 축출되는 프로세스 내 저장소 (STORE_* 환경변수로 조정)
+# HISTORY_BACKEND=sqlite: 같은 호스트의 여러 워커가 공유하는 SQLite(WAL) 저장소 (HISTORY_DB_PATH)
+store = create_session_store()
+
+# 같은 세션의 동일한 요청이 진행 중이면 새로 호출하지 않고 합류 (더블 클릭, 요청 중 rerun)
+single_flight = SingleFlight()
+
+# 스크립트 등 LLM 응답 디스크 캐시 (RESPONSE_CACHE_* 환경변수로 조정)
+response_cache = ResponseCache()
 
 # ======================== 전역 프롬프트 ========================
 SYSTEM_PROMPT_SCRIPT = (
@@ -99,245 +124,471 @@ SYSTEM_PROMPT_CHATBOT = (
 
 
 # ======================== 모델 호출 ========================
-@lru_cache(maxsize=1)
-def get_llm(model='gpt-4.1-mini'):
-    return ChatOpenAI(model=model)
+# 진입점(경로)별 모델과 파라미터 (LLM_MODEL, LLM_ROUTES, LLM_ROUTES_FILE 환경변수로 조정)
+MODEL_ROUTES = load_routes()
+
+
+@lru_cache(maxsize=None)
+def get_llm(model='gpt-4.1-mini', temperature=None, max_tokens=None, timeout=None):
+    # 모델·파라미터 조합마다 클라이언트를 하나씩 캐시 (경로 수만큼만 생기므로 번갈아 써도 다시 만들지 않음)
+    # 동기/비동기 모두 프로세스 공용 연결 풀(keep-alive)을 사용하고, 호출마다 캐시 적중 토큰을 기록
+    params = {}
+    if temperature is not None:
+        params["temperature"] = temperature
+    if max_tokens is not None:
+        params["max_tokens"] = max_tokens
+    if timeout is not None:
+        params["request_timeout"] = timeout
+    return ChatOpenAI(
+        model=model,
+        client=UsageRecordingCompletions(
+            openai.OpenAI(http_client=get_http_client()).chat.completions, usage_recorder
+        ),
+        async_client=AsyncUsageRecordingCompletions(
+            openai.AsyncOpenAI(http_client=get_async_http_client()).chat.completions, usage_recorder
+        ),
+        **params,
+    )
+
+
+def get_route_llm(route):
+    # route: scenario / script / chatbot / kakao
+    return get_llm(**MODEL_ROUTES[route])
+
+def estimate_request_tokens(*texts):
+    # rate limiter에 예약할 토큰 수 (프롬프트 + 예상 응답)
+    return sum(count_tokens(text) for text in texts) + LLM_COMPLETION_TOKENS_ESTIMATE
 
 # ======================== 세션 관리 ========================
 def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
+    return store.get_or_create(session_id)
+
+def restore_session_history(session_id: str, messages):
+    # 저장된 대화를 불러올 때 현재 백엔드의 히스토리를 통째로 교체
+    history = get_session_history(session_id)
+    history.clear()
+    history.add_messages(messages)
+    return history
+
+def release_session(session_id: str):
+    # 로그아웃/새 상담 시 세션 히스토리와 카카오 히스토리를 함께 해제
+    return store.release(session_id)
 
 # ======================== 랜덤 청철 상황 생성 ========================
-def get_random_cancel_info():
-    prompt_template = ChatPromptTemplate.from_messages([
-        ("system", """
-        당신은 보험과 관련된 가상의 철회 또는 해지 상황을 생성하는 AI 어시스턴트입니다.
+SCENARIO_BATCH_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    당신은 보험과 관련된 가상의 철회 또는 해지 상황을 생성하는 AI 어시스턴트입니다.
 
-        [출력 지침]
-        실제 상담 현장에서 자주 발생하는 상황을 반영하여, 청약 철회 또는 해지 요청 상황을 현실적이고 다양하게 구성하세요.
+    [출력 지침]
+    실제 상담 현장에서 자주 발생하는 상황을 반영하여, 청약 철회 또는 해지 요청 상황을 현실적이고 다양하게 구성하세요.
 
-        다음 조건을 반드시 포함해 랜덤 상황을 생성하세요:
+    각 상황은 다음 조건을 반드시 포함하세요:
 
-        - 고객 이름: 자연스러운 한글 이름으로 구성하세요.
-        - 해지 요청 내용: 아래 예시 유형 중 하나 이상을 포함해, 구체적인 이유와 배경을 묘사하세요.
-            ① 타 보험 설계사의 제안을 받고 해지를 고민함 (예: 조건, 혜택, 설계 차이)
-            ② 보험박람회, 온라인 플랫폼 등에서 더 좋은 조건을 접함
-            ③ 사은품이나 경품 혜택 등으로 인해 해지 후 재가입을 검토함
-            ④ 지인 설계사를 통해 가입하려는 상황
-            ⑤ 기존 보장이나 상품구성이 기대와 다르다고 느껴 변경을 고려함
-            ⑥ 보험료 부담, 납입기간, 해지 환급금 등 일반적인 경제적 이유
+    - 고객 이름: 자연스러운 한글 이름으로 구성하세요. 상황마다 서로 다른 이름을 사용하세요.
+    - 해지 요청 내용: 지정된 사유 유형을 중심으로, 구체적인 이유와 배경을 묘사하세요.
+        ① 타 보험 설계사의 제안을 받고 해지를 고민함 (예: 조건, 혜택, 설계 차이)
+        ② 보험박람회, 온라인 플랫폼 등에서 더 좋은 조건을 접함
+        ③ 사은품이나 경품 혜택 등으로 인해 해지 후 재가입을 검토함
+        ④ 지인 설계사를 통해 가입하려는 상황
+        ⑤ 기존 보장이나 상품구성이 기대와 다르다고 느껴 변경을 고려함
+        ⑥ 보험료 부담, 납입기간, 해지 환급금 등 일반적인 경제적 이유
 
-        - 해지 강도: 하 / 중 / 상 중 하나
-            - 하: 설득 여지 있음
-            - 중: 고민 중
-            - 상: 이미 결정한 상태 (매우 완고)
+    - 해지 강도: 하 / 중 / 상 중 지정된 값
+        - 하: 설득 여지 있음
+        - 중: 고민 중
+        - 상: 이미 결정한 상태 (매우 완고)
 
-        [출력 형식]
-        반드시 아래 형식을 따르세요:
+    [출력 형식]
+    반드시 아래 키를 가진 JSON 객체의 배열만 출력하세요. 다른 설명은 출력하지 마세요.
+    [{{"name": "고객 이름", "situation": "해지 요청 내용", "cancel_strength": "하|중|상", "reason_type": 1~6 사이 정수}}]
+    """),
+    ("human", "아래 조합마다 하나씩, 총 {count}개의 랜덤 청약 철회/해지 요청 상황을 생성해 주세요.\n{combos}")
+])
 
-        고객 이름: (이름)  
-        해지 요청 내용: (내용)  
-        해지 강도: (하 / 중 / 상 중 하나)
-        """),
-        ("human", "랜덤 청약 철회/해지 요청 상황을 생성해 주세요.")
-    ])
 
-    chain = prompt_template | get_llm() | StrOutputParser()
-    result = chain.invoke({})
+@lru_cache(maxsize=1)
+def get_scenario_chain():
+    return SCENARIO_BATCH_PROMPT | get_route_llm("scenario") | JsonOutputParser()
+
+
+@traced_call("scenario_batch")
+def generate_scenario_batch(combos):
+    # LLM 한 번 호출로 여러 상황을 JSON 배열로 생성
+    annotate_span(model=get_model_name("scenario"))
+    combo_lines = "\n".join(
+        f"- 사유 유형 {reason_type}번, 해지 강도 {strength}" for reason_type, strength in combos
+    )
+    acquire_blocking(estimate_request_tokens(combo_lines) + LLM_COMPLETION_TOKENS_ESTIMATE * 2)
+    result = get_scenario_chain().invoke({"count": len(combos), "combos": combo_lines})
+    if isinstance(result, dict):
+        result = result.get("scenarios", [result])
+    return result if isinstance(result, list) else []
+
+
+# 미리 생성해 둔 상황 풀 (SCENARIO_POOL_* 환경변수로 조정)
+scenario_pool = ScenarioPool(generate_scenario_batch)
+
 
-    # 결과 파싱
-    lines = result.splitlines()
-    info = {}
-    for line in lines:
-        if line.startswith("고객 이름:"):
-            info['name'] = line.replace("고객 이름:", "").strip()
-        elif line.startswith("해지 요청 내용:"):
-            info['situation'] = line.replace("해지 요청 내용:", "").strip()
-        elif line.startswith("해지 강도:"):
-            info['cancel_strength'] = line.replace("해지 강도:", "").strip()
+@traced_call("random_cancel_info")
+def get_random_cancel_info():
+    # 풀에서 즉시 꺼내고, 부족해지면 백그라운드에서 다시 채움
+    return scenario_pool.pop()
+
+@traced_call("random_cancel_info")
+def get_random_cancel_info_batch(count):
+    # 동시에 들어온 여러 요청을 한 번에 꺼냄 (풀이 비어 있어도 생성은 모자란 만큼만 한 번)
+    return scenario_pool.pop_many(count)
 
-    return info
+@traced_acall("random_cancel_info")
+async def aget_random_cancel_info():
+    # 풀이 비어 있으면 동기 생성이 일어날 수 있으므로 이벤트 루프 밖의 스레드에서 꺼냄
+    return await asyncio.to_thread(scenario_pool.pop)
 
 # ======================== 스크립트 생성 ========================
-def get_script_response(name, situation, cancel_strength):
-    try:
-        # 입력 정보를 LLM에게 전달할 포맷으로 구성
-        complaint_info = (
-            f"- 고객 이름: {name}\n"
-            f"- 해지 요청 내용: {situation}\n"
-            f"- 해지 의사 강도: {cancel_strength}"
-        )
+def get_model_name(route="script"):
+    llm = get_route_llm(route)
+    return getattr(llm, "model_name", None) or getattr(llm, "model", "")
+
+def get_script_cache_key(name, situation, cancel_strength, selected_points, consultant_name):
+    return make_cache_key(
+        name=normalize_text(name),
+        situation=normalize_text(situation),
+        cancel_strength=normalize_text(cancel_strength),
+        selected_points=sorted(selected_points or []),
+        consultant_name=normalize_text(consultant_name),
+        model=get_model_name("script"),
+    )
+
+# 강조 포인트별 설명 정의
+POINT_DESCRIPTIONS = {
+    "굿리치의 신뢰도와 브랜드 공신력 강조": "굿리치는 국내 상위 10위권 보험대리점으로, 5,000명 이상의 상담 인력과 700만 명 이상의 앱 가입자를 보유한 신뢰도 높은 플랫폼입니다. 최근 방영된 '보험의 바른이치, 굿리치' CF를 통해 브랜드 공신력 또한 입증된 만큼, 고객님께 더욱 믿음을 드릴 수 있는 회사임을 강조해 주세요.",
+    "타사 설계와의 비교 설명": "고객님께서 이전에 타사 설계사로부터 받은 설계 내용을 바탕으로, 굿리치의 제안서가 어떤 점에서 더 유리한지를 구체적으로 비교 설명해 주세요. 이후 2차 분석을 통해 보장 구조를 한 단계 더 업그레이드할 수 있다는 점도 함께 강조해 주세요.",
+    "가입 당시 상황 다시 리마인드": "고객님이 보험에 가입하실 당시 어떤 고민이나 필요가 있었는지를 다시 상기시켜 드리면서, 그 상황에 맞춰 설계가 이루어졌다는 점을 설명해 주세요. 현재 해지를 고려하는 이유와 비교해 설득할 수 있도록 자연스럽게 연결해 주세요.",
+    "전담컨설턴트 관리시스템 강조": "굿리치의 전담 컨설턴트 관리 시스템은 보험 설계뿐만 아니라 사후관리까지 책임지는 맞춤형 서비스입니다. 특히 보험금 청구 지원, 굿리치 앱을 통한 실시간 관리 등 실제 고객이 체감할 수 있는 장점을 중심으로 설명해 주세요.",
+    "가족보험관리 서비스 강조": "굿리치는 고객 본인뿐 아니라 가족 구성원의 보험까지 함께 관리할 수 있는 서비스를 제공합니다. 가족의 라이프스타일에 맞춰 통합적으로 보장을 점검하고 조정할 수 있다는 점에서, 장기적으로 매우 유용하다는 메시지를 전달해 주세요."
+}
+
+# 공급자 프롬프트 캐시는 앞부분이 완전히 같아야 적중하므로
+# 고정 지침(SCRIPT_STATIC_PROMPT)을 먼저 두고 요청별 정보(SCRIPT_REQUEST_PROMPT)는 뒤에 둠
+SCRIPT_STATIC_PROMPT = """
+    당신은 고객의 보험 청약 철회 및 해지 요청에 대응하는 전문 AI 상담 도우미입니다.  
+    상담원이 입력한 고객 상황과 해지 의사 강도(약 / 중 / 강)를 바탕으로,  
+    고객의 감정을 진정시키고 신뢰를 회복할 수 있도록 **설득력 있는 맞춤형 응대 스크립트**를 작성하세요.  
+    응대 스크립트와 상담TIP 사이 구분선을 추가해서 내용을 구분해주세요.
+    고객 이름과 상담원 이름을 혼동하지 말고, 반드시 각 정보에 맞게 사용하세요.
+
+    ⚠️ 절대 지침
+    - 상담원 이름은 반드시 뒤에 주어지는 [상담원 정보]의 이름만 사용하세요.
+    - 상담원 이름을 임의로 생성하거나 변경하지 마세요.
+    - 고객 이름은 반드시 뒤에 주어지는 [고객 정보]의 이름만 사용하세요.
+    - 다른 이름, 가상의 이름을 절대 생성하지 마세요.
+    - 스크립트의 시작 부분에서는 상담원이 본인의 이름을 말하며 정중히 인사하도록 작성하세요.
+    - [선택된 강조 포인트]가 주어지면 스크립트 흐름에 맞게 자연스럽게 반영하세요. 억지로 나열하지 말고, 설득을 강화하는 맥락에서 필요할 때 활용하세요.
+""" + SYSTEM_PROMPT_SCRIPT
+
+SCRIPT_REQUEST_PROMPT = """
+    [상담원 정보]
+    - 상담원 이름: {consultant_name}
+    - 인사 예시: "안녕하세요, 저는 굿리치 상담사 **{consultant_name}**입니다."
+
+    [고객 정보]
+    {complaint_info}
+    {emphasis_section}
+"""
+
+EMPHASIS_SECTION_HEADER = """
+    [선택된 강조 포인트]
+    상담원이 강조하고자 선택한 항목은 다음과 같습니다.
+
+    """
+
+
+def build_emphasis_section(selected_points):
+    # 선택된 설명들을 텍스트로 결합 (선택이 없으면 빈 문자열)
+    selected_descriptions = "\n".join(
+        f"- {POINT_DESCRIPTIONS[point]}" for point in selected_points if point in POINT_DESCRIPTIONS
+    )
+    return EMPHASIS_SECTION_HEADER + selected_descriptions if selected_descriptions else ""
+
 
+@lru_cache(maxsize=1)
+def get_script_chain():
+    # 프롬프트 → LLM → 파서 + 히스토리 래핑은 프로세스당 한 번만 구성
+    return RunnableWithMessageHistory(
+        ChatPromptTemplate.from_messages([
+            ("system", SCRIPT_STATIC_PROMPT),
+            ("system", SCRIPT_REQUEST_PROMPT),
+            MessagesPlaceholder("chat_history"),
+            ("human", "{complaint_info}")
+        ]) | get_route_llm("script") | StrOutputParser(),
+        get_session_history,
+        input_messages_key="complaint_info",
+        history_messages_key="chat_history",
+    )
+
+
+def build_script_request(name, situation, cancel_strength, session_id=None,
+                         consultant_name=None, selected_points=None):
+    # 동기/비동기 경로가 공유하는 스크립트 요청 구성 (세션 값은 호출 스레드에서 미리 읽음)
+    if session_id is None:
+        session_id = st.session_state.session_id
+    if consultant_name is None:
         # ⭐ 상담원 이름 불러오기
         consultant_name = st.session_state.get('user_name', '상담원')
-        
+    if selected_points is None:
         # 선택된 강조 포인트 리스트
         selected_points = st.session_state.get('selected_points', [])
-        
-        # 강조 포인트별 설명 정의
-        point_descriptions = {
-            "굿리치의 신뢰도와 브랜드 공신력 강조": "굿리치는 국내 상위 10위권 보험대리점으로, 5,000명 이상의 상담 인력과 700만 명 이상의 앱 가입자를 보유한 신뢰도 높은 플랫폼입니다. 최근 방영된 '보험의 바른이치, 굿리치' CF를 통해 브랜드 공신력 또한 입증된 만큼, 고객님께 더욱 믿음을 드릴 수 있는 회사임을 강조해 주세요.",
-            "타사 설계와의 비교 설명": "고객님께서 이전에 타사 설계사로부터 받은 설계 내용을 바탕으로, 굿리치의 제안서가 어떤 점에서 더 유리한지를 구체적으로 비교 설명해 주세요. 이후 2차 분석을 통해 보장 구조를 한 단계 더 업그레이드할 수 있다는 점도 함께 강조해 주세요.",
-            "가입 당시 상황 다시 리마인드": "고객님이 보험에 가입하실 당시 어떤 고민이나 필요가 있었는지를 다시 상기시켜 드리면서, 그 상황에 맞춰 설계가 이루어졌다는 점을 설명해 주세요. 현재 해지를 고려하는 이유와 비교해 설득할 수 있도록 자연스럽게 연결해 주세요.",
-            "전담컨설턴트 관리시스템 강조": "굿리치의 전담 컨설턴트 관리 시스템은 보험 설계뿐만 아니라 사후관리까지 책임지는 맞춤형 서비스입니다. 특히 보험금 청구 지원, 굿리치 앱을 통한 실시간 관리 등 실제 고객이 체감할 수 있는 장점을 중심으로 설명해 주세요.",
-            "가족보험관리 서비스 강조": "굿리치는 고객 본인뿐 아니라 가족 구성원의 보험까지 함께 관리할 수 있는 서비스를 제공합니다. 가족의 라이프스타일에 맞춰 통합적으로 보장을 점검하고 조정할 수 있다는 점에서, 장기적으로 매우 유용하다는 메시지를 전달해 주세요."
-        }
-
-        
-        # 선택된 설명들을 텍스트로 결합
-        selected_descriptions = "\n".join(
-            f"- {point_descriptions[point]}" for point in selected_points if point in point_descriptions
-        )
-
-        # ⭐ dynamic_prompt 생성
-        dynamic_prompt = f"""
-        당신은 고객의 보험 청약 철회 및 해지 요청에 대응하는 전문 AI 상담 도우미입니다.  
-        상담원이 입력한 고객 상황과 해지 의사 강도(약 / 중 / 강)를 바탕으로,  
-        고객의 감정을 진정시키고 신뢰를 회복할 수 있도록 **설득력 있는 맞춤형 응대 스크립트**를 작성하세요.  
-        응대 스크립트와 상담TIP 사이 구분선을 추가해서 내용을 구분해주세요.
-        고객 이름과 상담원 이름을 혼동하지 말고, 반드시 각 정보에 맞게 사용하세요.
-
-        ⚠️ 절대 지침
-        - 상담원 이름은 반드시 아래 [상담원 정보]의 이름만 사용하세요.
-        - 상담원 이름을 임의로 생성하거나 변경하지 마세요.
-        - 고객 이름은 반드시 [고객 정보]의 이름만 사용하세요.
-        - 다른 이름, 가상의 이름을 절대 생성하지 마세요.
-
-        [상담원 정보]
-        - 상담원 이름: {consultant_name}
-
-        [고객 정보]
-        {complaint_info}
-
-        - 스크립트의 시작 부분에서는 상담원이 본인의 이름을 말하며 정중히 인사하도록 작성하세요.
-        - 예시: "안녕하세요, 저는 굿리치 상담사 **{consultant_name}**입니다."
-        """
-        
-        # 선택 포인트가 있다면 설명을 추가
-        if selected_descriptions:
-            dynamic_prompt += f"""
 
-        [선택된 강조 포인트]
-        상담원이 강조하고자 선택한 항목은 다음과 같습니다.
-        스크립트 흐름에 맞게 아래 내용을 자연스럽게 반영해 주세요. 억지로 나열하지 말고, 설득을 강화하는 맥락에서 필요할 때 활용하세요.
+    # 입력 정보를 LLM에게 전달할 포맷으로 구성
+    complaint_info = (
+        f"- 고객 이름: {name}\n"
+        f"- 해지 요청 내용: {situation}\n"
+        f"- 해지 의사 강도: {cancel_strength}"
+    )
+    emphasis_section = build_emphasis_section(selected_points)
+    annotate_span(session_id=session_id, model=get_model_name("script"))
+
+    return {
+        "session_id": session_id,
+        "complaint_info": complaint_info,
+        "cache_key": get_script_cache_key(name, situation, cancel_strength, selected_points, consultant_name),
+        "chain": get_script_chain(),
+        "inputs": {
+            "consultant_name": consultant_name,
+            "complaint_info": complaint_info,
+            "emphasis_section": emphasis_section,
+        },
+        "config": {"configurable": {"session_id": session_id}},
+        "tokens": estimate_request_tokens(SCRIPT_STATIC_PROMPT, SCRIPT_REQUEST_PROMPT, complaint_info, emphasis_section),
+    }
+
+
+def get_cached_script(request, regenerate=False):
+    # 💾 동일한 입력이면 캐시된 스크립트를 즉시 반환 ('새로 생성' 요청 시 건너뜀)
+    if regenerate:
+        response_cache.record_bypass()
+        return None
+    cached_script = response_cache.get("script", request["cache_key"])
+    if cached_script is not None:
+        annotate_span(outcome="cache_hit")
+        # 추가 질문이 이어지도록 캐시 적중 시에도 세션 히스토리를 채워 둠
+        get_session_history(request["session_id"]).add_messages([
+            HumanMessage(content=request["complaint_info"]),
+            AIMessage(content=cached_script),
+        ])
+    return cached_script
+
+
+def store_script(request, script_text):
+    # 끝까지 정상 생성된 스크립트만 캐시에 저장
+    if script_text.strip():
+        response_cache.put("script", request["cache_key"], script_text)
+
+
+def produce_script(request, regenerate=False):
+    # single-flight 생산자: 캐시 확인(적중 시 히스토리 채우기), 히스토리 기록과 캐시 저장은 여기서 한 번만 일어남
+    cached_script = get_cached_script(request, regenerate)
+    if cached_script is not None:
+        yield cached_script
+        return
+
+    acquire_blocking(request["tokens"])
+    script_text = ""
+    for chunk in request["chain"].stream(request["inputs"], config=request["config"]):
+        script_text += chunk
+        yield chunk
+    store_script(request, script_text)
+
+
+@traced_stream("script")
+def get_script_response(name, situation, cancel_strength, regenerate=False, **session_values):
+    # 백그라운드 작업에서 호출할 때는 session_id 등을 직접 넘김 (st.session_state는 스크립트 스레드 전용)
+    try:
+        request = build_script_request(name, situation, cancel_strength, **session_values)
 
-        {selected_descriptions}
-        """
-        
-        # 스크립트 작성 지침 추가
-        dynamic_prompt += f"\n{SYSTEM_PROMPT_SCRIPT}"
-
-        # 3️⃣ 체인 호출
-        chain = RunnableWithMessageHistory(
-            ChatPromptTemplate.from_messages([
-                ("system", dynamic_prompt),
-                MessagesPlaceholder("chat_history"),
-                ("human", "{complaint_info}")
-            ]) | get_llm() | StrOutputParser(),
-            get_session_history,
-            input_messages_key="complaint_info",
-            history_messages_key="chat_history",
-        )
-
-        result = chain.invoke(
-            {"complaint_info": complaint_info},
-            config={"configurable": {"session_id": st.session_state.session_id}}
-        )
-        return iter([result])
-    
+        # 토큰 단위 스트리밍 (완성된 메시지는 스트림 종료 시 히스토리에 기록됨)
+        # 더블 클릭으로 같은 요청이 겹쳐도 캐시 적중 시의 히스토리 채우기까지 한 번만 일어남
+        key = ("script", request["session_id"], request["cache_key"])
+        yield from single_flight.stream(key, lambda: produce_script(request, regenerate))
 
     except Exception as e:
-        st.error("🔥 청철 방어 스크립트 생성 중 오류가 발생했습니다. 콘솔 로그를 확인해 주세요.")
+        mark_span_error(e)
         print("🔥 예외:", e)
-        return iter(["❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."])
+        if session_values.get("session_id") is not None:
+            # 백그라운드 작업/게이트웨이: 오류 문구를 결과로 넘기지 않고 호출한 쪽에 실패를 알림 (작업은 FAILED)
+            raise
+        st.error("🔥 청철 방어 스크립트 생성 중 오류가 발생했습니다. 콘솔 로그를 확인해 주세요.")
+        yield "❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."
+
+
+@traced_astream("script")
+def aget_script_response(name, situation, cancel_strength, regenerate=False, **session_values):
+    # 비동기 스트림 반환 (Streamlit 밖에서 호출할 때는 session_id 등을 직접 넘김)
+    try:
+        request = build_script_request(name, situation, cancel_strength, **session_values)
+    except Exception as e:
+        return _aerror("🔥 청철 방어 스크립트 요청 구성 중 예외:", e)
+
+    async def generate():
+        try:
+            cached_script = await asyncio.to_thread(get_cached_script, request, regenerate)
+            if cached_script is not None:
+                yield cached_script
+                return
+
+            await rate_limiter.acquire(request["tokens"])
+            script_text = ""
+            async for chunk in request["chain"].astream(request["inputs"], config=request["config"]):
+                script_text += chunk
+                yield chunk
+
+            await asyncio.to_thread(store_script, request, script_text)
+
+        except Exception as e:
+            mark_span_error(e)
+            print("🔥 예외:", e)
+            yield "❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."
+
+    # 호출한 쪽 루프와 무관하게 limiter 대기·모델 스트림은 runtime 루프에서 실행
+    return runtime.relay(generate())
+
+
+async def _aerror(label, error):
+    mark_span_error(error)
+    print(label, error)
+    yield "❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."
 
 # ======================== 대화 챗봇 ========================
+# 고정 지침 → 세션 동안 변하지 않는 스크립트 → 최근 대화 → 매번 바뀌는 요약 순으로 배치해
+# 같은 상담 안의 추가 질문이 공급자 프롬프트 캐시를 최대한 재사용하도록 함
+CHATBOT_CONTEXT_PROMPT = (
+    "[주의] 아래 상담 스크립트 내용을 반드시 참고하여 상담원의 요청에 답변하세요.\n\n"
+    "[현재 상담 스크립트]\n"
+    "{script_context}"
+)
+CHATBOT_SUMMARY_PROMPT = (
+    "[이전 대화 요약]\n"
+    "{conversation_summary}"
+)
+
+# 추가 질문용 토큰 예산 관리자 (CHATBOT_CONTEXT_BUDGET, CHATBOT_RECENT_TURNS)
+context_window = ContextWindow()
+
+
+def apply_context_window(inputs):
+    # 전체 히스토리 대신 예산 안의 최근 대화 + 오래된 대화 요약만 프롬프트에 전달
+    window = context_window.build(
+        SYSTEM_PROMPT_CHATBOT,
+        inputs.get("script_context", ""),
+        inputs["input"],
+        inputs.get("chat_history", []),
+    )
+    return {
+        **inputs,
+        "chat_history": window["chat_history"],
+        "conversation_summary": window["conversation_summary"],
+    }
+
+
+@lru_cache(maxsize=1)
 def get_chatbot_chain():
     prompt = ChatPromptTemplate.from_messages([
         ("system", SYSTEM_PROMPT_CHATBOT),
+        ("system", CHATBOT_CONTEXT_PROMPT),
         MessagesPlaceholder("chat_history"),
+        ("system", CHATBOT_SUMMARY_PROMPT),
         ("human", "{input}")
     ])
-    return prompt | get_llm() | StrOutputParser()
-
-
-def get_chatbot_response(user_message, script_context=""):
+    # 히스토리에는 상담원의 실제 질문만 저장되고, 스크립트는 시스템 영역에 한 번만 들어감
+    return RunnableWithMessageHistory(
+        RunnableLambda(apply_context_window) | prompt | get_route_llm("chatbot") | StrOutputParser(),
+        get_session_history,
+        input_messages_key="input",
+        history_messages_key="chat_history",
+    )
+
+
+def build_chatbot_request(user_message, script_context="", session_id=None):
+    if session_id is None:
+        session_id = st.session_state.session_id
+    annotate_span(session_id=session_id, model=get_model_name("chatbot"))
+
+    return {
+        "chain": get_chatbot_chain(),
+        "inputs": {"input": user_message, "script_context": script_context},
+        "config": {"configurable": {"session_id": session_id}},
+        "tokens": estimate_request_tokens(SYSTEM_PROMPT_CHATBOT, script_context, user_message),
+    }
+
+
+@traced_stream("chatbot")
+def get_chatbot_response(user_message, script_context="", session_id=None):
     try:
-        full_input = (
-            "[주의] 아래 상담 스크립트 내용을 반드시 참고하여 상담원의 요청에 답변하세요.\n\n"
-            "[현재 상담 스크립트]\n"
-            f"{script_context}\n\n"
-            "[상담원의 질문]\n"
-            f"{user_message}"
-        )
-
-        chain = RunnableWithMessageHistory(
-            get_chatbot_chain(),
-            get_session_history,
-            input_messages_key="input",
-            history_messages_key="chat_history",
-        )
-
-        result = chain.invoke(
-            {"input": full_input},
-            config={"configurable": {"session_id": st.session_state.session_id}}
-
-        )
-        return iter([result])
+        request = build_chatbot_request(user_message, script_context, session_id)
+        acquire_blocking(request["tokens"])
+        for chunk in request["chain"].stream(request["inputs"], config=request["config"]):
+            yield chunk
 
     except Exception as e:
-        st.error("🔥 추가 질문 처리 중 오류가 발생했습니다. 콘솔 로그를 확인해 주세요.")
+        mark_span_error(e)
         print(f"🔥 예외 발생 - 입력 내용: {user_message}")
         print(f"🔥 예외 상세: {e}")
-        return iter(["❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."])
-
-# ======================== 카카오톡 문자 발송 ========================
-def generate_conversation_summary(message_list):
-    summary_points = []
-    for message in message_list:
-        if message['role'] == 'user':
-            summary_points.append(f"- 상담원 요청: {message['content']}")
-        elif message['role'] == 'ai' and "👉 상담 멘트 예시" in message['content']:
-            lines = message['content'].split('\n')
-            for line in lines:
-                if line.startswith("> "):
-                    summary_points.append(f"- 제안 멘트: {line[2:]}")
-    return "\n".join(summary_points)
-    
-def get_kakao_response(script_context, message_list):
-    try:
-        conversation_summary = generate_conversation_summary(message_list)
+        if session_id is not None:
+            # 백그라운드 작업/게이트웨이: 호출한 쪽에 실패를 알림
+            raise
+        st.error("🔥 추가 질문 처리 중 오류가 발생했습니다. 콘솔 로그를 확인해 주세요.")
+        yield "❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."
 
-        dynamic_prompt = f"""
-        [청철 방어어 상담 요약]
-        {script_context}
 
-        [추가 대화 요약]
-        {conversation_summary}
+@traced_astream("chatbot")
+def aget_chatbot_response(user_message, script_context="", session_id=None):
+    try:
+        request = build_chatbot_request(user_message, script_context, session_id)
+    except Exception as e:
+        return _aerror("🔥 추가 질문 요청 구성 중 예외:", e)
 
-        ⚠️ 반드시 위 **청철 방어 상담 요약**과 **추가 대화 요약**을 반영하여, 고객에게 발송할 카카오톡 메시지를 작성하세요.
-        - 당신은 보험 해지 요청 고객에게 상담을 진행한 보험사 상담사입니다.
-        - 상담 이후, 고객에게 신뢰를 회복하고 다시 고려할 수 있는 여지를 남기기 위한 **안내 메시지 3종류**를 작성하세요.
-        - 각각의 메시지는 **표현 방식은 다르되, 공통적으로 고객 존중, 신뢰 회복, 정보 제공, 후속 문의 유도**를 담고 있어야 합니다.
+    async def generate():
+        try:
+            await rate_limiter.acquire(request["tokens"])
+            async for chunk in request["chain"].astream(request["inputs"], config=request["config"]):
+                yield chunk
 
-        [출력 형식]
-        각 메시지는 아래 3가지 유형으로 작성하세요.
+        except Exception as e:
+            mark_span_error(e)
+            print(f"🔥 예외 발생 - 입력 내용: {user_message}")
+            print(f"🔥 예외 상세: {e}")
+            yield "❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."
 
-        ### 1️⃣ 믿음형 + 굿리치 신뢰 강조형
-        - 굿리치라는 회사의 안정성, 고객 대응의 진정성, 지속 관리 의지를 중심으로 작성하세요.
-        - 고객이 선택한 회사가 **믿을 수 있는 선택이었다는 인상**을 주는 데 집중하세요.
+    # 호출한 쪽 루프와 무관하게 limiter 대기·모델 스트림은 runtime 루프에서 실행
+    return runtime.relay(generate())
 
-        ### 2️⃣ 보험전문가형
-        - 전문적인 용어를 활용하되 고객이 이해할 수 있도록 쉽게 풀어 설명하세요.
+# ======================== 카카오톡 문자 발송 ========================
+def generate_conversation_summary(message_list):
+    # 대화 전체를 한 번에 요약 (화면은 턴마다 누적한 요약을 conversation_summary로 넘김)
+    return build_summary(message_list)
+
+
+# 세 가지 문자 유형 (제목, 작성 방향)
+KAKAO_VARIANTS = [
+    (
+        "1️⃣ 믿음형 + 굿리치 신뢰 강조형",
+        """- 굿리치라는 회사의 안정성, 고객 대응의 진정성, 지속 관리 의지를 중심으로 작성하세요.
+        - 고객이 선택한 회사가 **믿을 수 있는 선택이었다는 인상**을 주는 데 집중하세요.""",
+    ),
+    (
+        "2️⃣ 보험전문가형",
+        """- 전문적인 용어를 활용하되 고객이 이해할 수 있도록 쉽게 풀어 설명하세요.
         - 해지 시 예상되는 불이익, 대안 보장 방식, 상담원이 전달한 핵심 내용을 체계적으로 정리하세요.
-        - 전문가다운 신중함과 정보력으로 고객의 재고를 유도하세요.
-
-        ### 3️⃣ 신뢰형 + 실제사례 활용형
-        - 실제 유사 사례(예: 다른 고객의 해지 후 후회 경험 등)를 언급해 설득력 있게 전달하세요.
-        - 지나치게 감정적인 표현은 피하되, **현실감 있는 상황 묘사와 비교 중심**으로 설득하세요.
-
+        - 전문가다운 신중함과 정보력으로 고객의 재고를 유도하세요.""",
+    ),
+    (
+        "3️⃣ 신뢰형 + 실제사례 활용형",
+        """- 실제 유사 사례(예: 다른 고객의 해지 후 후회 경험 등)를 언급해 설득력 있게 전달하세요.
+        - 지나치게 감정적인 표현은 피하되, **현실감 있는 상황 묘사와 비교 중심**으로 설득하세요.""",
+    ),
+]
+
+KAKAO_RULES = """
         [작성 지침]
         1. 각 메시지는 **15문장 내외**로 작성하세요.
         2. 문장은 **문장 단위로 줄바꿈**하여 가독성을 높이세요.
@@ -350,26 +601,278 @@ def get_kakao_response(script_context, message_list):
         9. 모든 유형에서 고객을 존중하는 어투와 배려 깊은 표현을 유지하세요.
         """
 
-        chain = RunnableWithMessageHistory(
-            ChatPromptTemplate.from_messages([
-                ("system", dynamic_prompt),
-                MessagesPlaceholder("chat_history"),
-                ("human", "{input}")
-            ]) | get_llm() | StrOutputParser(),
-            get_session_history,
-            input_messages_key="input",
-            history_messages_key="chat_history",
-        )
-        
-        kakao_session_id = f"{st.session_state.session_id}_kakao"
-        
-        result = chain.invoke(
-            {"input": "카카오톡 메시지를 생성해 주세요."},
-            config={"configurable": {"session_id": kakao_session_id}}
-        )
-        return iter([result])
+# parallel: 유형별로 동시에 생성해 완료되는 순서대로 표시 / combined: 한 번의 요청으로 3종 생성
+KAKAO_GENERATION_MODE = os.getenv("KAKAO_GENERATION_MODE", "parallel")
+KAKAO_MAX_CONCURRENCY = int(os.getenv("KAKAO_MAX_CONCURRENCY", "3"))
+
+
+# 고정 지침과 작성 규칙을 앞에, 유형별 형식과 상담 내용은 뒤에 두어 프롬프트 캐시 접두부를 공유
+KAKAO_STATIC_PROMPT = """
+        - 당신은 보험 해지 요청 고객에게 상담을 진행한 보험사 상담사입니다.
+        ⚠️ 반드시 뒤에 주어지는 **청철 방어 상담 요약**과 **추가 대화 요약**을 반영하여, 고객에게 발송할 카카오톡 메시지를 작성하세요.
+        - 상담 이후, 고객에게 신뢰를 회복하고 다시 고려할 수 있는 여지를 남기기 위한 안내 메시지를 작성하세요.
+        - 메시지는 고객 존중, 신뢰 회복, 정보 제공, 후속 문의 유도를 담고 있어야 합니다.
+""" + KAKAO_RULES
+
+KAKAO_CONTEXT_PROMPT = """
+        [청철 방어어 상담 요약]
+        {script_context}
+
+        [추가 대화 요약]
+        {conversation_summary}
+        """
+
+KAKAO_INPUT = "카카오톡 메시지를 생성해 주세요."
+
+
+def build_kakao_combined_format():
+    variant_sections = "\n".join(
+        f"""
+        ### {title}
+        {guide}
+""" for title, guide in KAKAO_VARIANTS
+    )
+    return f"""
+        - **안내 메시지 3종류**를 작성하세요.
+        - 각각의 메시지는 **표현 방식은 다르되, 공통적으로 고객 존중, 신뢰 회복, 정보 제공, 후속 문의 유도**를 담고 있어야 합니다.
+
+        [출력 형식]
+        각 메시지는 아래 3가지 유형으로 작성하세요.
+{variant_sections}"""
+
+
+def build_kakao_variant_format(title, guide):
+    return f"""
+        - **안내 메시지 1개**를 작성하세요.
+
+        [출력 형식]
+        아래 유형의 메시지 하나만 작성하고, 첫 줄은 반드시 "### {title}" 제목으로 시작하세요.
+
+        ### {title}
+        {guide}
+"""
+
+
+KAKAO_COMBINED_FORMAT = build_kakao_combined_format()
+KAKAO_VARIANT_FORMATS = [build_kakao_variant_format(title, guide) for title, guide in KAKAO_VARIANTS]
+
+
+def build_kakao_prompt_messages():
+    # 이전에 생성한 문자는 프롬프트에 넣지 않음 (스크립트와 대화 요약만으로 매번 새로 작성)
+    return ChatPromptTemplate.from_messages([
+        ("system", KAKAO_STATIC_PROMPT),
+        ("system", "{format_prompt}"),
+        ("system", KAKAO_CONTEXT_PROMPT),
+        ("human", "{input}"),
+    ])
+
+
+@lru_cache(maxsize=1)
+def get_kakao_chain():
+    # 통합/유형별 생성이 같은 체인을 사용 (형식은 format_prompt로 구분)
+    return build_kakao_prompt_messages() | get_route_llm("kakao") | StrOutputParser()
+
+
+def build_kakao_variant_inputs(script_context, conversation_summary):
+    return [
+        {
+            "format_prompt": format_prompt,
+            "script_context": script_context,
+            "conversation_summary": conversation_summary,
+            "input": KAKAO_INPUT,
+        }
+        for format_prompt in KAKAO_VARIANT_FORMATS
+    ]
+
+
+def estimate_kakao_tokens(inputs):
+    return estimate_request_tokens(
+        KAKAO_STATIC_PROMPT, inputs["format_prompt"], inputs["script_context"], inputs["conversation_summary"]
+    )
+
+
+def stream_kakao_variants(script_context, conversation_summary):
+    # 세 유형을 각각 별도 요청으로 동시에 보내고, 끝나는 순서대로 한 덩어리씩 반환
+    inputs = build_kakao_variant_inputs(script_context, conversation_summary)
+    for variant_inputs in inputs:
+        acquire_blocking(estimate_kakao_tokens(variant_inputs))
+    chain = get_kakao_chain()
+    for _, result in chain.batch_as_completed(
+        inputs, config={"max_concurrency": KAKAO_MAX_CONCURRENCY}, return_exceptions=True
+    ):
+        if isinstance(result, Exception):
+            raise result
+        yield result.strip() + "\n\n"
+
+
+async def astream_kakao_variants(script_context, conversation_summary):
+    inputs = build_kakao_variant_inputs(script_context, conversation_summary)
+    chain = get_kakao_chain()
+    semaphore = asyncio.Semaphore(KAKAO_MAX_CONCURRENCY)
+
+    async def generate(variant_inputs):
+        async with semaphore:
+            await rate_limiter.acquire(estimate_kakao_tokens(variant_inputs))
+            return await chain.ainvoke(variant_inputs)
+
+    for task in asyncio.as_completed([generate(variant_inputs) for variant_inputs in inputs]):
+        yield (await task).strip() + "\n\n"
+
+
+def get_kakao_cache_key(script_context, conversation_summary, mode):
+    # 같은 스크립트·대화 요약·생성 방식·모델이면 같은 문자 (세션과 무관)
+    return make_cache_key(
+        script_context=normalize_text(script_context),
+        conversation_summary=normalize_text(conversation_summary),
+        mode=mode,
+        model=get_model_name("kakao"),
+    )
+
+
+def build_kakao_request(script_context, message_list, session_id=None, mode=None, conversation_summary=None):
+    if session_id is None:
+        session_id = st.session_state.session_id
+    mode = mode or KAKAO_GENERATION_MODE
+    annotate_span(session_id=session_id, model=get_model_name("kakao"))
+    if conversation_summary is None:
+        conversation_summary = generate_conversation_summary(message_list or [])
+    inputs = {
+        "format_prompt": KAKAO_COMBINED_FORMAT,
+        "script_context": script_context,
+        "conversation_summary": conversation_summary,
+        "input": KAKAO_INPUT,
+    }
+
+    return {
+        "session_id": session_id,
+        "mode": mode,
+        "script_context": script_context,
+        "conversation_summary": conversation_summary,
+        "cache_key": get_kakao_cache_key(script_context, conversation_summary, mode),
+        "chain": get_kakao_chain(),
+        "inputs": inputs,
+        "tokens": estimate_kakao_tokens(inputs) + LLM_COMPLETION_TOKENS_ESTIMATE * 2,
+    }
+
+
+def get_cached_kakao(request, regenerate=False):
+    # 💾 대화가 그대로면 이전에 만든 문자를 즉시 반환 ('새로 생성' 요청 시 건너뜀)
+    if regenerate:
+        response_cache.record_bypass()
+        return None
+    cached_kakao = response_cache.get("kakao", request["cache_key"])
+    if cached_kakao is not None:
+        annotate_span(outcome="cache_hit")
+    return cached_kakao
+
+
+def store_kakao(request, kakao_text):
+    if kakao_text.strip():
+        response_cache.put("kakao", request["cache_key"], kakao_text)
+
+
+def produce_kakao(request):
+    # single-flight 생산자: 캐시 저장은 여기서 한 번만 일어남 (먼저 온 호출자의 지표 구간을 이어 받아 실행)
+    if request["mode"] == "parallel":
+        stream = stream_kakao_variants(request["script_context"], request["conversation_summary"])
+    else:
+        acquire_blocking(request["tokens"])
+        stream = request["chain"].stream(request["inputs"])
+    kakao_text = ""
+    for chunk in stream:
+        kakao_text += chunk
+        yield chunk
+    store_kakao(request, kakao_text)
+
+
+@traced_stream("kakao")
+def get_kakao_response(script_context, message_list=None, mode=None, session_id=None, regenerate=False,
+                       conversation_summary=None):
+    try:
+        request = build_kakao_request(script_context, message_list, session_id, mode, conversation_summary)
+        cached_kakao = get_cached_kakao(request, regenerate)
+        if cached_kakao is not None:
+            yield cached_kakao
+            return
+
+        # 다른 세션의 같은 요청도 결과가 같으므로 세션 구분 없이 합류
+        yield from single_flight.stream(("kakao", request["cache_key"]), lambda: produce_kakao(request))
 
     except Exception as e:
-        st.error("🔥 카카오톡 메시지 생성 중 오류가 발생했습니다. 콘솔 로그를 확인해 주세요.")
+        mark_span_error(e)
         print("🔥 예외:", e)
-        return iter(["❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."])
+        if session_id is not None:
+            # 백그라운드 작업/게이트웨이: 호출한 쪽에 실패를 알림
+            raise
+        st.error("🔥 카카오톡 메시지 생성 중 오류가 발생했습니다. 콘솔 로그를 확인해 주세요.")
+        yield "❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."
+
+
+@traced_astream("kakao")
+def aget_kakao_response(script_context, message_list=None, mode=None, session_id=None, regenerate=False,
+                        conversation_summary=None):
+    try:
+        request = build_kakao_request(script_context, message_list, session_id, mode, conversation_summary)
+    except Exception as e:
+        return _aerror("🔥 카카오톡 요청 구성 중 예외:", e)
+
+    async def generate():
+        try:
+            cached_kakao = await asyncio.to_thread(get_cached_kakao, request, regenerate)
+            if cached_kakao is not None:
+                yield cached_kakao
+                return
+
+            kakao_text = ""
+            if request["mode"] == "parallel":
+                async for block in astream_kakao_variants(request["script_context"], request["conversation_summary"]):
+                    kakao_text += block
+                    yield block
+            else:
+                await rate_limiter.acquire(request["tokens"])
+                async for chunk in request["chain"].astream(request["inputs"]):
+                    kakao_text += chunk
+                    yield chunk
+
+            await asyncio.to_thread(store_kakao, request, kakao_text)
+
+        except Exception as e:
+            mark_span_error(e)
+            print("🔥 예외:", e)
+            yield "❌ 오류가 발생했습니다. 관리자에게 문의해 주세요."
+
+    # 호출한 쪽 루프와 무관하게 limiter 대기·모델 스트림은 runtime 루프에서 실행
+    return runtime.relay(generate())
+
+
+# ======================== 호출 대기 현황 ========================
+def get_rate_limit_stats():
+    # 공용 rate limiter의 대기열 길이와 대기 시간
+    return rate_limiter.stats()
+
+
+def get_single_flight_stats():
+    # 진행 중인 동일 요청에 합류해 LLM 호출을 생략한 횟수(coalesced)
+    return single_flight.stats()
+
+
+def get_context_window_stats():
+    # 추가 질문 프롬프트 토큰(마지막/누적)과 요약으로 접은 턴 수
+    return context_window.stats()
+
+
+def get_route_stats():
+    # 경로별 설정된 모델·파라미터와 진입점·모델별 지연 요약 (모델을 바꿔 가며 비교할 때 사용)
+    report = telemetry.latency_report()
+    return {
+        route: {
+            **params,
+            "latency": [entry for entry in report if entry["entry_point"] in ROUTE_ENTRY_POINTS[route]],
+        }
+        for route, params in MODEL_ROUTES.items()
+    }
+
+
+def get_prompt_cache_stats():
+    # 공급자 프롬프트 캐시에서 재사용된 토큰 수 (누적 + 최근 호출별)
+    return {**usage_recorder.stats(), "recent": usage_recorder.recent()}
@@ -0,0 +1,371 @@
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import httpx
+
+from telemetry import current_span, telemetry
+
+# ======================== 설정 ========================
+# 프로세스 전체에서 공유하는 OpenAI 연결 풀
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+
+# 공급자 한도에 맞춘 프로세스 전체 요청/토큰 한도 (0 이하이면 제한하지 않음)
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+# 요청 시점에는 응답 길이를 모르므로 응답 토큰을 이 값으로 예약
+LLM_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "1500"))
+# 프롬프트 캐시 적중 기록을 보관할 최근 호출 수
+LLM_USAGE_HISTORY = int(os.getenv("LLM_USAGE_HISTORY", "200"))
+
+
+# ======================== HTTP 클라이언트 ========================
+_http_lock = threading.Lock()
+_http_clients = {}
+
+
+def _http_options():
+    return {
+        "limits": httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    with _http_lock:
+        if "sync" not in _http_clients:
+            _http_clients["sync"] = httpx.Client(**_http_options())
+        return _http_clients["sync"]
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    # 비동기 클라이언트는 runtime 이벤트 루프에서만 사용
+    with _http_lock:
+        if "async" not in _http_clients:
+            _http_clients["async"] = httpx.AsyncClient(**_http_options())
+        return _http_clients["async"]
+
+
+# ======================== 토큰 사용량 ========================
+def _field(obj, name, default=None):
+    # OpenAI 응답 객체와 dict 모두에서 값을 읽음
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+class UsageRecorder:
+    """호출마다 프롬프트 토큰과 공급자 프롬프트 캐시에서 재사용된 토큰 수를 기록."""
+
+    def __init__(self, history=LLM_USAGE_HISTORY):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=history)
+        self._totals = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+
+    def record(self, usage, model=""):
+        # OpenAI usage(prompt_tokens_details.cached_tokens)와
+        # LangChain usage_metadata(input_token_details.cache_read) 형식을 모두 지원
+        if usage is None:
+            return None
+        if _field(usage, "input_tokens") is not None:
+            prompt_tokens = _field(usage, "input_tokens", 0) or 0
+            completion_tokens = _field(usage, "output_tokens", 0) or 0
+            cached_tokens = _field(_field(usage, "input_token_details"), "cache_read", 0) or 0
+        else:
+            prompt_tokens = _field(usage, "prompt_tokens", 0) or 0
+            completion_tokens = _field(usage, "completion_tokens", 0) or 0
+            cached_tokens = _field(_field(usage, "prompt_tokens_details"), "cached_tokens", 0) or 0
+
+        entry = {
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+        }
+        with self._lock:
+            self._recent.append(entry)
+            self._totals["calls"] += 1
+            self._totals["prompt_tokens"] += prompt_tokens
+            self._totals["cached_tokens"] += cached_tokens
+            self._totals["completion_tokens"] += completion_tokens
+        # 진입점 구간 안에서 호출되었다면 그 구간의 사용량으로도 합산
+        span = current_span()
+        if span is not None:
+            span.add_usage(entry)
+        return entry
+
+    def recent(self) -> list:
+        with self._lock:
+            return list(self._recent)
+
+    def stats(self) -> dict:
+        with self._lock:
+            totals = dict(self._totals)
+        prompt_tokens = totals["prompt_tokens"]
+        return {**totals, "cache_hit_ratio": totals["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0}
+
+
+class UsageRecordingCompletions:
+    """chat.completions 래퍼: 스트리밍에도 usage를 요청하고, 응답의 usage를 recorder에 기록."""
+
+    def __init__(self, completions, recorder):
+        self._completions = completions
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+    def create(self, **kwargs):
+        started = time.perf_counter()
+        model = kwargs.get("model", "")
+        if not kwargs.get("stream"):
+            try:
+                response = self._completions.create(**kwargs)
+            finally:
+                telemetry.observe_request(model, time.perf_counter() - started)
+            self._recorder.record(_field(response, "usage"), model)
+            return response
+        # 스트림 마지막 청크(choices 없음)에 usage가 담겨 옴
+        kwargs.setdefault("stream_options", {"include_usage": True})
+        return self._iterate(self._completions.create(**kwargs), model, started)
+
+    def _iterate(self, stream, model, started):
+        try:
+            for chunk in stream:
+                if _field(chunk, "usage") is not None:
+                    self._recorder.record(_field(chunk, "usage"), model)
+                yield chunk
+        finally:
+            # 요청 소요 시간은 스트림을 끝까지 받은 시점까지
+            telemetry.observe_request(model, time.perf_counter() - started)
+
+
+class AsyncUsageRecordingCompletions(UsageRecordingCompletions):
+    async def create(self, **kwargs):
+        started = time.perf_counter()
+        model = kwargs.get("model", "")
+        if not kwargs.get("stream"):
+            try:
+                response = await self._completions.create(**kwargs)
+            finally:
+                telemetry.observe_request(model, time.perf_counter() - started)
+            self._recorder.record(_field(response, "usage"), model)
+            return response
+        kwargs.setdefault("stream_options", {"include_usage": True})
+        return self._aiterate(await self._completions.create(**kwargs), model, started)
+
+    async def _aiterate(self, stream, model, started):
+        try:
+            async for chunk in stream:
+                if _field(chunk, "usage") is not None:
+                    self._recorder.record(_field(chunk, "usage"), model)
+                yield chunk
+        finally:
+            telemetry.observe_request(model, time.perf_counter() - started)
+
+
+# ======================== 토큰 버킷 ========================
+class TokenBucketLimiter:
+    """분당 요청 수와 분당 토큰 수를 함께 제한하고, 한도를 넘으면 실패 대신 순서대로 대기시키는 limiter."""
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        self._request_budget = float(max(requests_per_minute, 0))
+        self._token_budget = float(max(tokens_per_minute, 0))
+        self._updated = time.monotonic()
+        self._queue_lock = None
+        self._loop = None
+
+        self._stats_lock = threading.Lock()
+        self._waiting = 0
+        self._stats = {"acquired": 0, "delayed": 0, "total_wait": 0.0, "max_wait": 0.0, "last_wait": 0.0}
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute > 0:
+            self._request_budget = min(
+                self.requests_per_minute,
+                self._request_budget + elapsed * self.requests_per_minute / 60,
+            )
+        if self.tokens_per_minute > 0:
+            self._token_budget = min(
+                self.tokens_per_minute,
+                self._token_budget + elapsed * self.tokens_per_minute / 60,
+            )
+
+    def _required_wait(self, tokens):
+        waits = [0.0]
+        if self.requests_per_minute > 0 and self._request_budget < 1:
+            waits.append((1 - self._request_budget) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute > 0 and self._token_budget < tokens:
+            waits.append((tokens - self._token_budget) * 60 / self.tokens_per_minute)
+        return max(waits)
+
+    async def acquire(self, tokens=0):
+        if self.tokens_per_minute > 0:
+            # 한도보다 큰 요청이 영원히 대기하지 않도록 상한을 둠
+            tokens = min(tokens, self.tokens_per_minute)
+        if self._queue_lock is None:
+            self._queue_lock = asyncio.Lock()
+            self._loop = asyncio.get_running_loop()
+        elif asyncio.get_running_loop() is not self._loop:
+            # 다른 루프에서 같은 Lock을 기다리면 서로 깨우지 못해 멈춤 → runtime.relay()/acquire_blocking()을 거칠 것
+            raise RuntimeError("rate_limiter.acquire()는 runtime 이벤트 루프에서만 호출할 수 있습니다.")
+
+        start = time.monotonic()
+        with self._stats_lock:
+            self._waiting += 1
+        try:
+            # asyncio.Lock은 먼저 기다린 호출자부터 깨우므로 도착 순서대로 처리됨
+            async with self._queue_lock:
+                while True:
+                    self._refill()
+                    wait = self._required_wait(tokens)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                if self.requests_per_minute > 0:
+                    self._request_budget -= 1
+                if self.tokens_per_minute > 0:
+                    self._token_budget -= tokens
+        finally:
+            waited = time.monotonic() - start
+            with self._stats_lock:
+                self._waiting -= 1
+                self._stats["acquired"] += 1
+                self._stats["delayed"] += 1 if waited > 0.01 else 0
+                self._stats["total_wait"] += waited
+                self._stats["max_wait"] = max(self._stats["max_wait"], waited)
+                self._stats["last_wait"] = waited
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            acquired = self._stats["acquired"]
+            return {
+                **self._stats,
+                "queue_depth": self._waiting,
+                "avg_wait": self._stats["total_wait"] / acquired if acquired else 0.0,
+            }
+
+
+# ======================== 이벤트 루프 ========================
+class AsyncLLMRuntime:
+    """모든 비동기 LLM 호출을 실행하는 프로세스 단일 이벤트 루프 (백그라운드 스레드)."""
+
+    _DONE = object()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+
+    @property
+    def loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-runtime", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        # 동기 코드(Streamlit 스크립트 스레드)에서 코루틴 결과를 기다림
+        return self.submit(coro).result(timeout)
+
+    def iterate(self, async_iterable):
+        # 비동기 스트림을 동기 제너레이터로 변환 (청크가 도착하는 즉시 전달)
+        items = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in async_iterable:
+                    items.put(item)
+            except BaseException as e:
+                items.put(e)
+            finally:
+                items.put(self._DONE)
+
+        self.submit(pump())
+        while True:
+            item = items.get()
+            if item is self._DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    async def relay(self, async_iterable):
+        # 다른 이벤트 루프(asyncio.run 등)에서 받는 비동기 스트림도 실행은 runtime 루프에서
+        # (rate limiter의 asyncio.Lock과 공용 httpx.AsyncClient는 runtime 루프에서만 사용)
+        caller = asyncio.get_running_loop()
+        if caller is self.loop:
+            async for item in async_iterable:
+                yield item
+            return
+
+        items = asyncio.Queue()
+        tasks = []
+
+        def put(item):
+            try:
+                caller.call_soon_threadsafe(items.put_nowait, item)
+            except RuntimeError:
+                # 받는 쪽 루프가 이미 닫힘
+                pass
+
+        async def pump():
+            try:
+                async for item in async_iterable:
+                    put(item)
+            except BaseException as e:
+                put(e)
+            finally:
+                put(self._DONE)
+
+        # 호출한 쪽의 컨텍스트(진입점 계측 구간 등)를 이어 받아 runtime 루프에서 실행
+        self.loop.call_soon_threadsafe(
+            lambda: tasks.append(self.loop.create_task(pump())), context=contextvars.copy_context()
+        )
+        try:
+            while True:
+                item = await items.get()
+                if item is self._DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # 받는 쪽이 중간에 그만두면 runtime 루프의 작업도 취소
+            self.loop.call_soon_threadsafe(lambda: [task.cancel() for task in tasks])
+
+
+runtime = AsyncLLMRuntime()
+rate_limiter = TokenBucketLimiter()
+usage_recorder = UsageRecorder()
+
+
+def acquire_blocking(tokens=0):
+    # 동기 호출 경로도 같은 limiter 대기열을 거치도록 runtime 루프에서 대기
+    if threading.current_thread().name == "llm-runtime":
+        raise RuntimeError("runtime 이벤트 루프 안에서는 rate_limiter.acquire()를 await 하세요.")
+    runtime.run(rate_limiter.acquire(tokens))
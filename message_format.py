@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# ======================== 설정 ========================
+# 내용 해시 → 렌더링 결과를 보관할 최대 메시지 수 (불러온 대화 재사용)
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "2048"))
+# 대화 화면에 항상 펼쳐 보여줄 최근 질문 수, 그보다 오래된 질문을 묶는 단위
+TRANSCRIPT_RECENT_TURNS = int(os.getenv("TRANSCRIPT_RECENT_TURNS", "5"))
+TRANSCRIPT_GROUP_SIZE = int(os.getenv("TRANSCRIPT_GROUP_SIZE", "10"))
+
+TITLE_PATTERN = re.compile(r"^(▶️|✅|📌|❗|📝|📍)\s*[^:：]+[:：]?")
+TITLE_COLON_PATTERN = re.compile(r"[:：]\s*$")
+BOLD_BULLET_PATTERN = re.compile(r"^[-•]\s*\*\*.*\*\*")
+BULLET_PATTERN = re.compile(r"^[-•]\s*")
+
+
+# ----------------- 마크다운 자동 정리 함수 -------------------
+def format_markdown(text: str) -> str:
+    lines = text.strip().splitlines()
+    formatted_lines = []
+    indent_next = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            formatted_lines.append("")
+            indent_next = False
+            continue
+
+        if TITLE_PATTERN.match(line):
+            title = TITLE_COLON_PATTERN.sub("", line)
+            formatted_lines.append(f"**{title}**\n")
+            indent_next = False
+            continue
+
+        bullet = BULLET_PATTERN.match(line)
+        if bullet:
+            item = "- " + line[bullet.end():]
+            if BOLD_BULLET_PATTERN.match(line):
+                formatted_lines.append(item)
+                indent_next = True
+            elif indent_next:
+                formatted_lines.append("    " + item)
+            else:
+                formatted_lines.append(item)
+            continue
+
+        formatted_lines.append(line)
+        indent_next = False
+
+    return "\n".join(formatted_lines).strip() + "\n"
+
+
+# ----------------- 렌더링 캐시 -------------------
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+_render_stats = {"hits": 0, "misses": 0}
+
+
+def render_markdown(content: str) -> str:
+    # 같은 내용은 한 번만 서식 처리 (내용 해시 기준 LRU)
+    key = hashlib.sha1(content.encode("utf-8")).hexdigest()
+    with _render_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            _render_stats["hits"] += 1
+            return _render_cache[key]
+        _render_stats["misses"] += 1
+
+    rendered = format_markdown(content)
+    with _render_lock:
+        _render_cache[key] = rendered
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return rendered
+
+
+def make_message(role: str, content: str) -> dict:
+    # 원문(content)과 화면용 서식(rendered)을 함께 보관 — 서식 처리는 메시지 생성 시 한 번만
+    message = {"role": role, "content": content}
+    if role == "ai":
+        message["rendered"] = render_markdown(content)
+    return message
+
+
+def ensure_rendered(message: dict) -> str:
+    # 불러온 대화처럼 rendered가 없는 메시지는 캐시를 거쳐 한 번 채움
+    if message.get("role") != "ai":
+        return message["content"]
+    if "rendered" not in message:
+        message["rendered"] = render_markdown(message["content"])
+    return message["rendered"]
+
+
+def get_render_stats() -> dict:
+    with _render_lock:
+        return {**_render_stats, "cached": len(_render_cache)}
+
+
+# ----------------- 대화 화면 구간 나누기 -------------------
+def _role(message):
+    return message.get("role") if isinstance(message, dict) else None
+
+
+def split_transcript(messages, recent_turns=TRANSCRIPT_RECENT_TURNS, group_size=TRANSCRIPT_GROUP_SIZE):
+    """대화를 (스크립트, 접어 둘 이전 구간 목록, 최근 메시지)로 나눈다.
+
+    한 턴은 사용자 질문과 그 뒤의 답변이다. 이전 구간은 1번째 질문부터 group_size개씩 고정된 경계로
+    묶으므로 대화가 길어져도 이미 만들어진 구간의 내용은 바뀌지 않는다.
+    구간은 (첫 질문 번호, 마지막 질문 번호, 메시지 목록) 형태이다.
+    """
+    lead = list(messages[:1]) if messages and _role(messages[0]) == "ai" else []
+    turns = []
+    for message in messages[len(lead):]:
+        if _role(message) == "user" or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+
+    split = max(len(turns) - max(recent_turns, 0), 0)
+    older, recent = turns[:split], turns[split:]
+    groups = []
+    for start in range(0, len(older), max(group_size, 1)):
+        chunk = older[start:start + group_size]
+        groups.append((start + 1, start + len(chunk), [m for turn in chunk for m in turn]))
+    return lead, groups, [m for turn in recent for m in turn]
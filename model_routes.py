@@ -0,0 +1,69 @@
+import json
+import os
+
+# ======================== 설정 ========================
+# 경로(route)를 따로 지정하지 않았을 때 쓰는 기본 모델
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4.1-mini")
+# 경로별 모델/파라미터 덮어쓰기: LLM_ROUTES(JSON 문자열) 또는 LLM_ROUTES_FILE(JSON 파일), 둘 다 있으면 LLM_ROUTES 우선
+#   예) LLM_ROUTES='{"scenario": {"model": "gpt-4.1-nano", "max_tokens": 800}, "kakao": {"temperature": 0.5}}'
+LLM_ROUTES = os.getenv("LLM_ROUTES", "")
+LLM_ROUTES_FILE = os.getenv("LLM_ROUTES_FILE", "")
+
+# 경로 → 모델 파라미터 (None이면 ChatOpenAI/연결 풀 기본값 사용)
+#   scenario: 랜덤 청철 상황 생성, script: 방어 스크립트, chatbot: 추가 질문, kakao: 카카오톡 문자
+ROUTE_NAMES = ("scenario", "script", "chatbot", "kakao")
+ROUTE_FIELDS = {"model": str, "temperature": float, "max_tokens": int, "timeout": float}
+
+# 경로별 지연 지표가 기록되는 진입점 이름
+ROUTE_ENTRY_POINTS = {
+    "scenario": ("scenario_batch", "random_cancel_info"),
+    "script": ("script",),
+    "chatbot": ("chatbot",),
+    "kakao": ("kakao",),
+}
+
+
+def _default_route():
+    return {"model": LLM_MODEL, "temperature": None, "max_tokens": None, "timeout": None}
+
+
+def _read_overrides():
+    if LLM_ROUTES:
+        return json.loads(LLM_ROUTES)
+    if LLM_ROUTES_FILE:
+        with open(LLM_ROUTES_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def load_routes(overrides=None) -> dict:
+    # 기본값 위에 경로별 설정을 덮어씀 (알 수 없는 경로/항목은 경고만 하고 무시)
+    if overrides is None:
+        try:
+            overrides = _read_overrides()
+        except (OSError, ValueError) as e:
+            print("⚠️ 모델 경로 설정을 읽을 수 없어 기본 모델을 사용합니다:", e)
+            overrides = {}
+
+    routes = {name: _default_route() for name in ROUTE_NAMES}
+    for name, params in overrides.items():
+        if name not in routes:
+            print(f"⚠️ 알 수 없는 모델 경로 무시: {name} (가능한 값: {', '.join(ROUTE_NAMES)})")
+            continue
+        if isinstance(params, str):
+            # {"scenario": "gpt-4.1-nano"}처럼 모델 이름만 줄 수도 있음
+            params = {"model": params}
+        for field, value in params.items():
+            if field not in ROUTE_FIELDS:
+                print(f"⚠️ 알 수 없는 모델 경로 항목 무시: {name}.{field}")
+                continue
+            routes[name][field] = None if value is None else ROUTE_FIELDS[field](value)
+    return routes
+
+
+def describe_routes(routes) -> str:
+    parts = []
+    for name, params in routes.items():
+        extras = ", ".join(f"{field}={value}" for field, value in params.items() if field != "model" and value is not None)
+        parts.append(f"{name}={params['model']}" + (f"({extras})" if extras else ""))
+    return " ".join(parts)
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# ======================== 설정 ========================
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "/tmp/stayon/response_cache.db")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", str(7 * 24 * 60 * 60)))
+
+
+def normalize_text(text) -> str:
+    # 공백/줄바꿈 차이만 있는 입력은 같은 키가 되도록 정리
+    return re.sub(r"\s+", " ", str(text or "")).strip()
+
+
+def make_cache_key(**fields) -> str:
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ======================== 응답 캐시 ========================
+class ResponseCache:
+    """정규화된 입력을 키로 LLM 응답을 저장하는 SQLite 디스크 캐시."""
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes=RESPONSE_CACHE_MAX_BYTES, max_age=RESPONSE_CACHE_MAX_AGE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "namespace TEXT NOT NULL, cache_key TEXT NOT NULL, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL, "
+            "PRIMARY KEY (namespace, cache_key))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_access ON response_cache (last_access)"
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    # ---------- 조회 / 저장 ----------
+    def get(self, namespace: str, cache_key: str):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, created_at FROM response_cache WHERE namespace = ? AND cache_key = ?",
+            (namespace, cache_key),
+        ).fetchone()
+        now = time.time()
+        if row is None or (self.max_age > 0 and now - row[1] > self.max_age):
+            self._count("misses")
+            return None
+
+        conn.execute(
+            "UPDATE response_cache SET last_access = ? WHERE namespace = ? AND cache_key = ?",
+            (now, namespace, cache_key),
+        )
+        self._count("hits")
+        return row[0]
+
+    def put(self, namespace: str, cache_key: str, value: str):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache "
+            "(namespace, cache_key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+            (namespace, cache_key, value, len(value.encode("utf-8")), now, now),
+        )
+        self._count("stores")
+        self._evict(now)
+
+    def record_bypass(self):
+        # 상담원이 '새로 생성'을 요청해 캐시를 건너뛴 횟수
+        self._count("bypassed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        entries, total_bytes = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()
+        return {**counters, "entries": entries, "bytes": total_bytes}
+
+    # ---------- 축출 ----------
+    def _evict(self, now):
+        conn = self._connection()
+        evicted = 0
+        if self.max_age > 0:
+            evicted += conn.execute(
+                "DELETE FROM response_cache WHERE created_at < ?", (now - self.max_age,)
+            ).rowcount
+
+        entries, total_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()
+        if (self.max_entries > 0 and entries > self.max_entries) or (
+            self.max_bytes > 0 and total_bytes > self.max_bytes
+        ):
+            # 가장 오래 사용되지 않은 항목부터 제한 안으로 들어올 때까지 삭제
+            for namespace, cache_key, size in conn.execute(
+                "SELECT namespace, cache_key, size FROM response_cache ORDER BY last_access"
+            ).fetchall():
+                if (self.max_entries <= 0 or entries <= self.max_entries) and (
+                    self.max_bytes <= 0 or total_bytes <= self.max_bytes
+                ):
+                    break
+                conn.execute(
+                    "DELETE FROM response_cache WHERE namespace = ? AND cache_key = ?",
+                    (namespace, cache_key),
+                )
+                entries -= 1
+                total_bytes -= size
+                evicted += 1
+
+        if evicted:
+            self._count("evictions", evicted)
@@ -0,0 +1,195 @@
+import json
+import os
+import random
+import threading
+
+# ======================== 설정 ========================
+SCENARIO_POOL_PATH = os.getenv("SCENARIO_POOL_PATH", "/tmp/stayon/scenario_pool.json")
+SCENARIO_POOL_TARGET = int(os.getenv("SCENARIO_POOL_TARGET", "36"))
+SCENARIO_POOL_LOW_WATER = int(os.getenv("SCENARIO_POOL_LOW_WATER", "12"))
+SCENARIO_BATCH_SIZE = int(os.getenv("SCENARIO_BATCH_SIZE", "12"))
+
+REASON_TYPES = {
+    1: "타 보험 설계사의 제안을 받고 해지를 고민함 (예: 조건, 혜택, 설계 차이)",
+    2: "보험박람회, 온라인 플랫폼 등에서 더 좋은 조건을 접함",
+    3: "사은품이나 경품 혜택 등으로 인해 해지 후 재가입을 검토함",
+    4: "지인 설계사를 통해 가입하려는 상황",
+    5: "기존 보장이나 상품구성이 기대와 다르다고 느껴 변경을 고려함",
+    6: "보험료 부담, 납입기간, 해지 환급금 등 일반적인 경제적 이유",
+}
+STRENGTHS = ["하", "중", "상"]
+
+# 풀이 비어 있고 생성도 실패했을 때 사용하는 기본 상황
+FALLBACK_SCENARIO = {
+    "name": "김민지",
+    "situation": "매달 내는 보험료가 부담된다며 해지 후 환급금을 받고 싶다고 요청함. 납입 기간이 길게 남은 점도 걱정하고 있음.",
+    "cancel_strength": "중",
+    "reason_type": 6,
+}
+
+
+def normalize_scenario(item):
+    # LLM 출력 한 건을 검증해 표준 형식으로 변환 (형식이 맞지 않으면 None)
+    if not isinstance(item, dict):
+        return None
+    name = str(item.get("name", "")).strip()
+    situation = str(item.get("situation", "")).strip()
+    strength = str(item.get("cancel_strength", "")).strip()[:1]
+    try:
+        reason_type = int(item.get("reason_type"))
+    except (TypeError, ValueError):
+        return None
+    if not name or not situation or strength not in STRENGTHS or reason_type not in REASON_TYPES:
+        return None
+    return {"name": name, "situation": situation, "cancel_strength": strength, "reason_type": reason_type}
+
+
+# ======================== 상황 풀 ========================
+class ScenarioPool:
+    """미리 생성해 둔 랜덤 청철 상황을 즉시 꺼내 주고, 부족하면 백그라운드에서 채우는 풀."""
+
+    def __init__(self, generate_batch, path=SCENARIO_POOL_PATH, target=SCENARIO_POOL_TARGET,
+                 low_water=SCENARIO_POOL_LOW_WATER, batch_size=SCENARIO_BATCH_SIZE):
+        # generate_batch(combos) -> 상황 dict 리스트, combos는 [(reason_type, strength), ...]
+        self.generate_batch = generate_batch
+        self.path = path
+        self.target = target
+        self.low_water = low_water
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        # 빈 풀을 직접 채우는 호출은 한 번에 하나만 (동시 호출이 각자 생성하지 않도록)
+        self._fill_lock = threading.Lock()
+        self._refilling = False
+        self._scenarios = self._load()
+        self._counters = {"pops": 0, "empty_pops": 0, "batches": 0, "generated": 0, "rejected": 0, "failures": 0}
+
+    # ---------- 꺼내기 ----------
+    def pop(self) -> dict:
+        return self.pop_many(1)[0]
+
+    def pop_many(self, count) -> list:
+        # 여러 요청을 한 번에 꺼냄 (게이트웨이가 동시에 들어온 요청을 모아 호출)
+        with self._lock:
+            scenarios = self._pop_some(count)
+            self._counters["pops"] += count
+
+        if len(scenarios) < count:
+            # 최초 실행 등 풀이 비어 있으면 모자란 만큼만 직접 채운 뒤 꺼냄 (나머지는 백그라운드)
+            # 동시에 빈 풀을 만난 호출은 앞선 생성이 끝나길 기다렸다가 그 결과에서 꺼냄
+            with self._fill_lock:
+                with self._lock:
+                    self._counters["empty_pops"] += 1
+                    scenarios += self._pop_some(count - len(scenarios))
+                missing = count - len(scenarios)
+                if missing:
+                    self.refill(max_batches=-(-missing // self.batch_size))
+                    with self._lock:
+                        scenarios += self._pop_some(missing)
+        else:
+            self._persist()
+
+        self.refill_async()
+        scenarios += [FALLBACK_SCENARIO] * (count - len(scenarios))
+        return [dict(scenario) for scenario in scenarios]
+
+    def _pop_some(self, count):
+        scenarios = []
+        while len(scenarios) < count:
+            scenario = self._pop_balanced()
+            if scenario is None:
+                break
+            scenarios.append(scenario)
+        return scenarios
+
+    def _pop_balanced(self):
+        if not self._scenarios:
+            return None
+        # 사유 유형과 강도 조합을 먼저 고른 뒤 그 안에서 꺼내 고르게 분포되도록 함
+        combos = sorted({(s["reason_type"], s["cancel_strength"]) for s in self._scenarios})
+        reason_type, strength = random.choice(combos)
+        candidates = [
+            i for i, s in enumerate(self._scenarios)
+            if s["reason_type"] == reason_type and s["cancel_strength"] == strength
+        ]
+        return self._scenarios.pop(random.choice(candidates))
+
+    # ---------- 채우기 ----------
+    def refill_async(self):
+        with self._lock:
+            if self._refilling or len(self._scenarios) >= self.low_water:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill_worker, name="scenario-pool-refill", daemon=True).start()
+
+    def _refill_worker(self):
+        try:
+            self._fill()
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def refill(self, max_batches=None):
+        self._fill(max_batches)
+
+    def _fill(self, max_batches=None):
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batches += 1
+            with self._lock:
+                missing = self.target - len(self._scenarios)
+                if missing <= 0:
+                    return
+                combos = self._next_combos(min(missing, self.batch_size))
+
+            try:
+                batch = self.generate_batch(combos)
+            except Exception as e:
+                print("🔥 랜덤 상황 풀 생성 실패:", e)
+                with self._lock:
+                    self._counters["failures"] += 1
+                return
+
+            valid = [s for s in map(normalize_scenario, batch or []) if s is not None]
+            with self._lock:
+                self._counters["batches"] += 1
+                self._counters["generated"] += len(valid)
+                self._counters["rejected"] += len(batch or []) - len(valid)
+                self._scenarios.extend(valid)
+            self._persist()
+            if not valid:
+                return
+
+    def _next_combos(self, count):
+        # 풀에 가장 적게 남은 (사유 유형, 강도) 조합부터 요청해 18개 조합을 모두 채움
+        counts = {(r, s): 0 for r in REASON_TYPES for s in STRENGTHS}
+        for scenario in self._scenarios:
+            counts[(scenario["reason_type"], scenario["cancel_strength"])] += 1
+        ordered = sorted(counts, key=lambda combo: (counts[combo], random.random()))
+        return [ordered[i % len(ordered)] for i in range(count)]
+
+    # ---------- 저장 ----------
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return [s for s in map(normalize_scenario, json.load(f)) if s is not None]
+        except (OSError, ValueError):
+            return []
+
+    def _persist(self):
+        with self._lock:
+            snapshot = list(self._scenarios)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print("🔥 랜덤 상황 풀 저장 실패:", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "available": len(self._scenarios), "refilling": self._refilling}
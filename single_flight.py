@@ -0,0 +1,94 @@
+import contextvars
+import threading
+
+from telemetry import annotate_span
+
+
+# ======================== 진행 중 요청 ========================
+class _Flight:
+    """진행 중인 스트림 한 건: 생산자가 받은 청크를 모아 두고, 구독자는 처음부터 다시 읽은 뒤 이어서 받음."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._chunks = []
+        self._done = False
+        self._error = None
+        self.subscribers = 0
+
+    def feed(self, produce):
+        try:
+            for chunk in produce():
+                with self._cond:
+                    self._chunks.append(chunk)
+                    self._cond.notify_all()
+        except BaseException as e:
+            with self._cond:
+                self._error = e
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def subscribe(self):
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self._chunks) and not self._done:
+                    self._cond.wait()
+                if index < len(self._chunks):
+                    chunk = self._chunks[index]
+                    index += 1
+                elif self._error is not None:
+                    raise self._error
+                else:
+                    return
+            yield chunk
+
+
+class SingleFlight:
+    """같은 키의 요청이 진행 중이면 새 LLM 호출 대신 진행 중인 결과에 합류시키는 single-flight.
+
+    생산자는 별도 스레드에서 끝까지 실행되므로 첫 호출자가 rerun으로 중단되어도 요청은 한 번만 완료되고,
+    세션 히스토리 기록·캐시 저장도 한 번만 일어납니다. 완료되면 키가 비워져 다음 요청은 새로 호출합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._counters = {"leaders": 0, "coalesced": 0}
+
+    def stream(self, key, produce):
+        # produce: 청크를 내보내는 제너레이터 함수 (Streamlit API를 호출하지 않아야 함)
+        with self._lock:
+            flight = self._inflight.get(key)
+            joined = flight is not None
+            if joined:
+                self._counters["coalesced"] += 1
+            else:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self._counters["leaders"] += 1
+            flight.subscribers += 1
+
+        if joined:
+            annotate_span(outcome="coalesced")
+        else:
+            # 호출한 쪽의 컨텍스트(지표 구간 등)를 그대로 이어 받아 실행
+            context = contextvars.copy_context()
+            threading.Thread(
+                target=context.run, args=(self._run, key, flight, produce),
+                name=f"single-flight-{key[0]}", daemon=True,
+            ).start()
+        return flight.subscribe()
+
+    def _run(self, key, flight, produce):
+        try:
+            flight.feed(produce)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "inflight": len(self._inflight)}
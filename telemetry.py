@@ -0,0 +1,427 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ======================== 설정 ========================
+# Prometheus 형식 지표를 제공할 로컬 주소 (TELEMETRY_PORT=0이면 끔)
+# 서버는 가져올 때가 아니라 실행 진입점(chatbot_prev.py, llm_gateway.py)에서 telemetry.serve()로 시작
+# 지표는 프로세스마다 따로 모이므로 워커를 여러 개 띄우면 워커마다 다른 포트를 지정 (같은 포트면 먼저 뜬 워커만 노출)
+TELEMETRY_HOST = os.getenv("TELEMETRY_HOST", "127.0.0.1")
+TELEMETRY_PORT = int(os.getenv("TELEMETRY_PORT", "9464"))
+# 호출마다 JSON 한 줄 로그를 표준 출력에 남길지 여부
+TELEMETRY_JSON_LOG = os.getenv("TELEMETRY_JSON_LOG", "1") == "1"
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+# 모델별 100만 토큰당 가격(USD): (입력, 캐시 적중 입력, 출력) — LLM_PRICES(JSON)로 덮어쓰기 가능
+MODEL_PRICES = {
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+MODEL_PRICES.update({model: tuple(prices) for model, prices in json.loads(os.getenv("LLM_PRICES", "{}")).items()})
+
+
+def estimate_cost(model, prompt_tokens, cached_tokens, completion_tokens) -> float:
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        # 날짜가 붙은 스냅샷 이름(gpt-4.1-mini-2025-04-14 등)은 가장 긴 접두어로 찾음
+        matches = [name for name in MODEL_PRICES if model.startswith(name)]
+        prices = MODEL_PRICES[max(matches, key=len)] if matches else (0.0, 0.0, 0.0)
+    input_price, cached_price, output_price = prices
+    return (
+        (prompt_tokens - cached_tokens) * input_price
+        + cached_tokens * cached_price
+        + completion_tokens * output_price
+    ) / 1_000_000
+
+
+# ======================== 지표 ========================
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, labels, amount=1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        # [버킷별 누적 개수..., 합계, 개수]
+        series = self._series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def quantile(self, labels, q):
+        # 버킷 안에서 선형 보간한 분위수 추정 (Prometheus histogram_quantile과 같은 방식)
+        series = self._series.get(labels)
+        if not series or not series[-1]:
+            return None
+        rank = q * series[-1]
+        lower, below = 0.0, 0
+        for bound, count in zip(self.buckets, series):
+            if count >= rank:
+                return lower + (bound - lower) * ((rank - below) / (count - below) if count > below else 0)
+            lower, below = bound, count
+        return self.buckets[-1]
+
+    def series(self):
+        return list(self._series)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_label_text(names, labels + (f'{bound:g}',))} {count}")
+            lines.append(f"{self.name}_bucket{_label_text(names, labels + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {series[-2]:g}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+# ======================== 호출 구간 ========================
+_current_span = contextvars.ContextVar("llm_call_span", default=None)
+
+
+class CallSpan:
+    """진입점 호출 한 번(스트림 끝까지)의 측정값. 그 안의 모든 OpenAI 요청 사용량이 합산됨."""
+
+    def __init__(self, entry_point):
+        self.entry_point = entry_point
+        self.session_id = ""
+        self.model = ""
+        self.outcome = None
+        self.error = None
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def mark_first_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def add_usage(self, entry):
+        with self._lock:
+            self.prompt_tokens += entry["prompt_tokens"]
+            self.cached_tokens += entry["cached_tokens"]
+            self.completion_tokens += entry["completion_tokens"]
+            if entry.get("model") and not self.model:
+                self.model = entry["model"]
+
+
+def current_span():
+    return _current_span.get()
+
+
+def annotate_span(**fields):
+    # 요청을 구성하는 쪽에서 세션/모델/결과를 현재 구간에 채움 (구간 밖이면 무시)
+    span = _current_span.get()
+    if span is not None:
+        for name, value in fields.items():
+            if value:
+                setattr(span, name, value)
+
+
+def mark_span_error(error):
+    # 진입점이 예외를 잡아 오류 메시지로 바꿔 반환할 때도 결과를 error로 기록
+    annotate_span(outcome="error", error=f"{type(error).__name__}: {error}")
+
+
+class Telemetry:
+    """LLM 호출 지표 저장소: Prometheus 텍스트 형식으로 노출하고 호출마다 JSON 로그를 남김."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._server = None
+        labels = ("entry_point", "model")
+        self.calls = Counter("stayon_llm_calls_total", "진입점 호출 수", labels + ("outcome",))
+        self.call_seconds = Histogram(
+            "stayon_llm_call_seconds", "진입점 호출 전체 소요 시간(초)", labels + ("outcome",), LATENCY_BUCKETS
+        )
+        self.ttft_seconds = Histogram(
+            "stayon_llm_time_to_first_token_seconds", "첫 청크까지 걸린 시간(초)", labels, LATENCY_BUCKETS
+        )
+        self.request_seconds = Histogram(
+            "stayon_llm_request_seconds", "OpenAI 요청 한 건의 소요 시간(초)", labels, LATENCY_BUCKETS
+        )
+        self.prompt_tokens = Histogram(
+            "stayon_llm_prompt_tokens", "호출당 프롬프트 토큰 수", labels, TOKEN_BUCKETS
+        )
+        self.completion_tokens = Histogram(
+            "stayon_llm_completion_tokens", "호출당 응답 토큰 수", labels, TOKEN_BUCKETS
+        )
+        self.tokens = Counter("stayon_llm_tokens_total", "누적 토큰 수", labels + ("kind",))
+        self.cost = Counter("stayon_llm_cost_usd_total", "추정 누적 비용(USD)", labels)
+
+    # ---------- 기록 ----------
+    def observe_request(self, model, seconds):
+        span = _current_span.get()
+        entry_point = span.entry_point if span is not None else "unknown"
+        if span is not None:
+            with span._lock:
+                span.requests += 1
+        with self._lock:
+            self.request_seconds.observe((entry_point, model or "unknown"), seconds)
+
+    def finish(self, span, outcome):
+        span.outcome = span.outcome or outcome
+        wall = time.perf_counter() - span.started
+        ttft = span.first_token - span.started if span.first_token is not None else None
+        model = span.model or "unknown"
+        labels = (span.entry_point, model)
+        cost = estimate_cost(model, span.prompt_tokens, span.cached_tokens, span.completion_tokens)
+
+        with self._lock:
+            self.calls.inc(labels + (span.outcome,))
+            self.call_seconds.observe(labels + (span.outcome,), wall)
+            if ttft is not None:
+                self.ttft_seconds.observe(labels, ttft)
+            if span.requests:
+                self.prompt_tokens.observe(labels, span.prompt_tokens)
+                self.completion_tokens.observe(labels, span.completion_tokens)
+            self.tokens.inc(labels + ("prompt",), span.prompt_tokens)
+            self.tokens.inc(labels + ("cached",), span.cached_tokens)
+            self.tokens.inc(labels + ("completion",), span.completion_tokens)
+            self.cost.inc(labels, cost)
+
+        if TELEMETRY_JSON_LOG:
+            print(json.dumps({
+                "event": "llm_call",
+                "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                "entry_point": span.entry_point,
+                "session_id": span.session_id,
+                "model": model,
+                "outcome": span.outcome,
+                "wall_ms": round(wall * 1000, 1),
+                "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+                "requests": span.requests,
+                "prompt_tokens": span.prompt_tokens,
+                "cached_tokens": span.cached_tokens,
+                "completion_tokens": span.completion_tokens,
+                "cost_usd": round(cost, 6),
+                "error": span.error,
+            }, ensure_ascii=False), flush=True)
+
+    # ---------- 노출 ----------
+    def latency_report(self) -> list:
+        # 진입점·모델별 정상 호출 지연 요약 (경로마다 가장 빠르면서 품질을 만족하는 모델을 고르는 데 사용)
+        with self._lock:
+            report = []
+            for labels in sorted(self.call_seconds.series()):
+                entry_point, model, outcome = labels
+                if outcome != "ok":
+                    continue
+                series = self.call_seconds._series[labels]
+                ttft = self.ttft_seconds.quantile((entry_point, model), 0.5)
+                report.append({
+                    "entry_point": entry_point,
+                    "model": model,
+                    "calls": series[-1],
+                    "mean_s": round(series[-2] / series[-1], 3),
+                    "p50_s": round(self.call_seconds.quantile(labels, 0.5), 3),
+                    "p95_s": round(self.call_seconds.quantile(labels, 0.95), 3),
+                    "ttft_p50_s": round(ttft, 3) if ttft is not None else None,
+                })
+            return report
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            for metric in (self.calls, self.call_seconds, self.ttft_seconds, self.request_seconds,
+                           self.prompt_tokens, self.completion_tokens, self.tokens, self.cost):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def serve(self, host=TELEMETRY_HOST, port=TELEMETRY_PORT):
+        # 프로세스당 한 번만 시작 (포트를 이미 다른 워커가 쓰고 있으면 JSON 로그만 남김)
+        with self._lock:
+            if self._server is not None or port <= 0:
+                return self._server
+            telemetry = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    path = self.path.split("?")[0]
+                    if path == "/metrics":
+                        body = telemetry.render().encode("utf-8")
+                        content_type = "text/plain; version=0.0.4; charset=utf-8"
+                    elif path == "/latency":
+                        # 진입점·모델별 지연 요약(JSON)
+                        body = json.dumps(telemetry.latency_report(), ensure_ascii=False).encode("utf-8")
+                        content_type = "application/json; charset=utf-8"
+                    else:
+                        self.send_error(404)
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            try:
+                self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError as e:
+                print(f"⚠️ 지표 엔드포인트를 열 수 없습니다 ({host}:{port}):", e)
+                self._server = False
+                return None
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="telemetry-http", daemon=True).start()
+            print(f"📈 LLM 지표: http://{host}:{self._server.server_address[1]}/metrics (경로별 지연 요약: /latency)")
+            return self._server
+
+
+telemetry = Telemetry()
+
+
+# ======================== 진입점 계측 ========================
+def traced_stream(entry_point):
+    """동기 제너레이터 진입점을 감싸 스트림이 끝날 때까지를 한 구간으로 기록."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            span = CallSpan(entry_point)
+            previous = _current_span.get()
+            _current_span.set(span)
+            outcome = "cancelled"
+            try:
+                for chunk in fn(*args, **kwargs):
+                    span.mark_first_token()
+                    yield chunk
+                outcome = "ok"
+            except Exception as e:
+                outcome = "error"
+                span.error = span.error or f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                # 제너레이터는 호출한 쪽의 컨텍스트에서 실행되므로 reset 대신 이전 값으로 되돌림
+                _current_span.set(previous)
+                telemetry.finish(span, outcome)
+        return wrapper
+    return decorator
+
+
+def traced_astream(entry_point):
+    """비동기 스트림을 반환하는 진입점용. 요청 구성(즉시 실행)과 스트림 소비를 같은 구간으로 기록."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            span = CallSpan(entry_point)
+            token = _current_span.set(span)
+            try:
+                stream = fn(*args, **kwargs)
+            finally:
+                _current_span.reset(token)
+
+            async def generate():
+                previous = _current_span.get()
+                _current_span.set(span)
+                outcome = "cancelled"
+                try:
+                    async for chunk in stream:
+                        span.mark_first_token()
+                        yield chunk
+                    outcome = "ok"
+                except Exception as e:
+                    outcome = "error"
+                    span.error = span.error or f"{type(e).__name__}: {e}"
+                    raise
+                finally:
+                    _current_span.set(previous)
+                    telemetry.finish(span, outcome)
+
+            return generate()
+        return wrapper
+    return decorator
+
+
+def traced_call(entry_point):
+    """일반 함수 진입점용 (반환 시점을 첫 토큰 시점으로 봄)."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            span = CallSpan(entry_point)
+            token = _current_span.set(span)
+            outcome = "error"
+            try:
+                result = fn(*args, **kwargs)
+                span.mark_first_token()
+                outcome = "ok"
+                return result
+            except Exception as e:
+                span.error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                _current_span.reset(token)
+                telemetry.finish(span, outcome)
+        return wrapper
+    return decorator
+
+
+def traced_acall(entry_point):
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            span = CallSpan(entry_point)
+            token = _current_span.set(span)
+            outcome = "error"
+            try:
+                result = await fn(*args, **kwargs)
+                span.mark_first_token()
+                outcome = "ok"
+                return result
+            except Exception as e:
+                span.error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                _current_span.reset(token)
+                telemetry.finish(span, outcome)
+        return wrapper
+    return decorator
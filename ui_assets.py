@@ -0,0 +1,89 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from functools import lru_cache
+
+from PIL import Image
+
+# ======================== 설정 ========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 원본 이미지는 image/에 두고, 화면 크기에 맞춘 사본을 Streamlit 정적 경로(static/)에 생성
+ASSET_SOURCE_DIR = os.path.join(BASE_DIR, "image")
+ASSET_STATIC_DIR = os.path.join(BASE_DIR, "static")
+
+# 이름 -> (원본 파일, 최대 가로 px) — 고해상도 화면을 위해 표시 크기의 2배로 축소
+ASSETS = {
+    "page_icon": ("logo.png", 128),
+    "logo": ("logo.png", 100),
+    "top_image": ("top_box.png", 2000),
+    "bottom_image": ("bottom_box.png", 2000),
+    "user_avatar": ("user_avatar.png", 100),
+    "ai_avatar": ("ai_avatar.png", 100),
+}
+
+_lock = threading.Lock()
+_urls = {}
+
+
+def _optimized_png(filename, max_width) -> bytes:
+    with Image.open(os.path.join(ASSET_SOURCE_DIR, filename)) as image:
+        if image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.convert("RGBA").resize((max_width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue()
+
+
+def _write_static(name, data) -> bool:
+    # 내용이 같으면 다시 쓰지 않음 (여러 워커가 동시에 시작해도 원자적으로 교체)
+    path = os.path.join(ASSET_STATIC_DIR, f"{name}.png")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return True
+    except OSError:
+        pass
+    try:
+        os.makedirs(ASSET_STATIC_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        print(f"🔥 정적 이미지 생성 실패 ({name}):", e)
+        return False
+
+
+def build_asset_urls(static_serving: bool) -> dict:
+    """화면 이미지 URL을 프로세스당 한 번만 만든다.
+
+    정적 서빙이 켜져 있으면 `app/static/{name}.png?v={내용 해시}`를 반환한다
+    (tornado가 v 인자가 있는 요청에 10년 Cache-Control을 붙이므로 브라우저는 다시 요청하지 않음).
+    꺼져 있거나 static/에 쓸 수 없으면 축소한 이미지를 data URI로 한 번 인코딩해 재사용한다.
+    """
+    with _lock:
+        if static_serving in _urls:
+            return _urls[static_serving]
+
+        urls = {}
+        for name, (filename, max_width) in ASSETS.items():
+            data = _optimized_png(filename, max_width)
+            if static_serving and _write_static(name, data):
+                version = hashlib.sha1(data).hexdigest()[:12]
+                urls[name] = f"app/static/{name}.png?v={version}"
+            else:
+                urls[name] = "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+        _urls[static_serving] = urls
+        return urls
+
+
+@lru_cache(maxsize=1)
+def page_icon_image():
+    # st.set_page_config는 PIL 이미지를 받아 미디어 파일로 제공
+    with Image.open(os.path.join(ASSET_SOURCE_DIR, ASSETS["page_icon"][0])) as image:
+        image.thumbnail((ASSETS["page_icon"][1], ASSETS["page_icon"][1]))
+        return image.copy()